@@ -1,387 +1,255 @@
 # app.py — AI Sourcing Assistant (Bright UI, AI-enabled)
 # Requirements (requirements.txt):
-# streamlit>=1.33
+# streamlit>=1.52
 # openai>=1.35.0
 
-import json
+import time
+_script_start = time.perf_counter()
+
+import io
+import itertools
 import os
-import re
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Dict, Any
 import streamlit as st
-
-try:
-    from openai import OpenAI  # Official OpenAI SDK (v1+)
-except Exception:
-    OpenAI = None  # App still works without AI; falls back to local heuristics
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from components.copy_bar import copy_bar
+from sourcing.companies import COMPANY_INDEX, segment_order
+from sourcing.company_search import CompanySegmentIndex, build_index as build_company_search_index
+from sourcing.core import (
+    IC_ONLY_NOT, unique_preserve, canonicalize, map_title_to_category, expand_titles,
+    env_size_qualifiers,
+)
+from sourcing.entities import POLICIES as COMPANY_POLICIES, fit_or_group
+from sourcing.export import (
+    FORMATS as EXPORT_FORMATS, VARIANT_LABELS as EXPORT_VARIANT_LABELS, VARIANTS as EXPORT_VARIANTS, export_bytes, export_part,
+)
+from sourcing.history import PackHistory, open_history
+from sourcing.docfreq import DocFreqStore, doc_fingerprint, open_store as open_docfreq_store
+from sourcing.jd import analyze_jd, iter_jd_lines, jd_terms
+from sourcing.llm import ProviderError, ProviderRouter, router_from_env
+from sourcing.memory import (
+    SizedLRU, deep_sizeof, process_caches, rss_mb, session_key_sizes, text_digest,
+    tracemalloc_start, tracemalloc_stop, tracemalloc_top,
+)
+from sourcing.pack import EXPORT_FIELDS, PackGraph
+from sourcing.ratelimit import BATCH, INTERACTIVE
+from sourcing.role_pack import (
+    SchemaError, fatal, fix_messages, parse_json_safely, role_pack_messages, trim_role_pack, validate_role_pack,
+)
+from sourcing.render import build_stylesheets, card_header_html, hero_html, hint_html
+from sourcing.startup import mark_first_render
+from sourcing.state_codec import (
+    SnapshotError, SnapshotStore, blob_token, decode_blob, decode_token, encode_blob, open_snapshot_store,
+)
+from sourcing.sweep import sweep_variants
+from sourcing.terms import EMPTY_IDS, TERMS
+from sourcing.usage import (
+    CALL, ERROR, FALLBACK, HIT, UsageLedger, budgets_from_env, open_ledger, over_budget, today as usage_today,
+)
+from sourcing.taxonomy import ROLE_LIB, SMART_NOT, METRO_COMPANIES
 
 st.set_page_config(page_title="AI Sourcing Assistant", layout="wide")
 
-# ============================ Role Library (fallback when AI is off/unavailable) ============================
-ROLE_LIB: Dict[str, Dict[str, List[str]]] = {
-    "swe": {
-        "titles": [
-            "Software Engineer", "Software Developer", "SDE", "SDE I", "SDE II",
-            "Senior Software Engineer", "Full Stack Engineer", "Backend Engineer",
-            "Frontend Engineer", "Platform Engineer"
-        ],
-        "must": ["python", "java", "go", "microservices", "distributed systems"],
-        "nice": ["kubernetes", "docker", "graphql", "gRPC", "aws"],
-    },
-    "ml": {
-        "titles": [
-            "Machine Learning Engineer", "ML Engineer", "ML Scientist",
-            "Applied Scientist", "Data Scientist", "AI Engineer"
-        ],
-        "must": ["python", "pytorch", "tensorflow", "mlops", "model deployment"],
-        "nice": ["sklearn", "xgboost", "feature store", "mlflow", "sagemaker"],
-    },
-    "sre": {
-        "titles": [
-            "Site Reliability Engineer", "SRE", "Reliability Engineer",
-            "DevOps Engineer", "Platform Reliability Engineer"
-        ],
-        "must": ["kubernetes", "terraform", "prometheus", "grafana", "incident response"],
-        "nice": ["golang", "python", "aws", "gcp", "oncall"],
-    },
-}
+# ============================ AI Layer ============================
+MODEL_DEFAULT = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-SMART_NOT = [
-    "intern", "internship", "fellow", "bootcamp", "student", "professor",
-    "sales", "marketing", "hr", "talent acquisition", "recruiter",
-    "customer support", "help desk", "desktop support", "qa tester", "graphic designer"
-]
-
-# ============================ Company Sets (seed lists; AI can add more) ============================
-COMPANY_SETS: Dict[str, List[str]] = {
-    "faang_plus": [
-        "Google", "Meta", "Apple", "Amazon", "Netflix", "Microsoft",
-        "NVIDIA", "Uber", "Airbnb", "Stripe", "Dropbox", "LinkedIn"
-    ],
-    "cloud_infra": [
-        "AWS", "Azure", "Google Cloud", "Cloudflare", "Snowflake", "Datadog",
-        "Fastly", "Akamai", "HashiCorp", "DigitalOcean", "Twilio", "MongoDB"
-    ],
-    "ai_first": [
-        "OpenAI", "Anthropic", "DeepMind", "Hugging Face", "Stability AI",
-        "Cohere", "Scale AI", "Character AI", "Perplexity AI", "xAI"
-    ],
-    "devtools_data": [
-        "Databricks", "Confluent", "Elastic", "Snyk", "GitHub", "GitLab",
-        "JetBrains", "CircleCI", "PagerDuty", "New Relic", "Grafana Labs", "Postman"
-    ],
-    "enterprise_saas": [
-        "Salesforce", "ServiceNow", "Workday", "Atlassian", "Slack",
-        "Notion", "Asana", "Zoom", "Box", "Dropbox"
-    ],
-    "consumer_social": [
-        "YouTube", "Instagram", "WhatsApp", "Snap", "TikTok", "Pinterest",
-        "Reddit", "Spotify", "Discord"
-    ],
-    "fintech": [
-        "Stripe", "Square", "Plaid", "Coinbase", "Robinhood", "Brex",
-        "Ramp", "Affirm", "Chime", "SoFi"
-    ],
-    "marketplaces": [
-        "Uber", "Lyft", "DoorDash", "Instacart", "Airbnb", "Etsy",
-        "Amazon Marketplace", "Shopify"
-    ],
-    "high_growth": [
-        "Rippling", "Figma", "Canva", "Retool", "Glean", "Snowflake",
-        "Databricks", "Cloudflare", "Notion", "Scale AI"
-    ],
-}
+class RolePackInvalid(Exception):
+    """Raised inside the cached call so empty/invalid packs are never cached."""
 
-METRO_COMPANIES: Dict[str, List[str]] = {
-    "Any": [],
-    "Bay Area": ["Google", "Meta", "Apple", "Netflix", "NVIDIA", "Airbnb", "Stripe", "Uber", "Databricks", "Snowflake", "DoorDash"],
-    "New York": ["Google", "Meta", "Amazon", "Spotify", "Datadog", "MongoDB", "Ramp", "Plaid", "Etsy"],
-    "Seattle": ["Amazon", "Microsoft", "AWS", "Azure", "Tableau"],
-    "Remote-first": ["GitLab", "Automattic", "Zapier", "Stripe", "Dropbox", "Doist"],
-}
+class AIBudgetExceeded(Exception):
+    """An AI budget cap is reached and no cached pack fits; the Build falls back to ROLE_LIB."""
 
-ROLE_TO_GROUPS: Dict[str, List[str]] = {
-    "swe": ["faang_plus", "devtools_data", "enterprise_saas", "cloud_infra", "consumer_social", "fintech", "marketplaces", "high_growth"],
-    "ml":  ["ai_first", "faang_plus", "cloud_infra", "devtools_data", "enterprise_saas", "consumer_social", "high_growth"],
-    "sre": ["cloud_infra", "faang_plus", "devtools_data", "enterprise_saas", "marketplaces", "high_growth"],
-}
+# USD caps per day / session / model-day (AI_BUDGET_DAY_USD, AI_BUDGET_SESSION_USD, AI_BUDGET_MODEL_DAY_USD)
+AI_BUDGETS = budgets_from_env()
 
-# ============================ Synonyms (canonicalization) ============================
-SYNONYMS: Dict[str, str] = {
-    "golang": "go",
-    "k8s": "kubernetes",
-    "llm": "large language model",
-    "tf": "tensorflow",
-    "py": "python",
-}
+@st.cache_resource(show_spinner=False)
+def usage_ledger() -> UsageLedger:
+    # Every AI lookup (call, cache hit, error, budget fallback) with tokens, latency and cost; shared by all sessions
+    return open_ledger()
 
-# ============================ Helpers ============================
-def unique_preserve(seq: List[str]) -> List[str]:
-    seen, out = set(), []
-    for x in seq:
-        x2 = (x or "").strip()
-        if not x2:
-            continue
-        key = x2.lower()
-        if key not in seen:
-            seen.add(key)
-            out.append(x2)
-    return out
-
-def canonicalize(tokens: List[str]) -> List[str]:
-    out, seen = [], set()
-    for t in tokens:
-        c = SYNONYMS.get((t or "").lower(), t or "").strip()
-        k = c.lower()
-        if k and k not in seen:
-            seen.add(k)
-            out.append(c)
-    return out
-
-def normalize_quotes(s: str) -> str:
-    return (s or "").replace("“", '"').replace("”", '"').replace("’", "'").replace("‘", "'")
-
-def safe_quote(token: str) -> str:
-    t = normalize_quotes((token or "").strip())
-    if not t:
-        return ""
-    t = t.replace('"', r'\"')  # escape embedded quotes
-    if re.search(r"\s|\(|\)|-", t):
-        return f'"{t}"'
-    return t
-
-def or_group(items: List[str]) -> str:
-    toks = [safe_quote(i) for i in items if i and i.strip()]
-    toks = unique_preserve([t for t in toks if t])
-    return f"({ ' OR '.join(toks) })" if toks else ""
-
-def not_group(items: List[str]) -> str:
-    toks = [safe_quote(i) for i in items if i and i.strip()]
-    toks = unique_preserve([t for t in toks if t])
-    return f"({ ' OR '.join(toks) })" if toks else ""
-
-def map_title_to_category(title: str) -> str:
-    s = (title or "").lower()
-    if any(t in s for t in ["sre", "site reliability", "reliab", "devops", "platform reliability", "production engineer"]):
-        return "sre"
-    if any(t in s for t in [
-        "machine learning", "ml engineer", "applied scientist", "data scientist", "ai engineer",
-        "genai", "llm", "deep learning", " ml ", "ml-", "ml/"
-    ]):
-        return "ml"
-    return "swe"
-
-def expand_titles(base_titles: List[str], cat: str) -> List[str]:
-    extra: List[str] = []
-    if cat == "swe":
-        extra = ["Software Eng", "Software Dev", "Full-Stack Engineer", "Backend Developer", "Frontend Developer"]
-    elif cat == "ml":
-        extra = ["ML Eng", "Machine Learning Specialist", "Applied ML Engineer", "ML Research Engineer"]
-    elif cat == "sre":
-        extra = ["Reliability Eng", "DevOps SRE", "Platform SRE", "Production Engineer"]
-    return unique_preserve(base_titles + extra)
-
-def build_keywords(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None) -> str:
-    core = or_group(unique_preserve(canonicalize(must) + canonicalize(nice) + canonicalize(qualifiers or [])))
-    if not core:
-        return ""
-    ng = not_group(unique_preserve(canonicalize(nots)))
-    return f"{core} NOT {ng}" if ng else core
-
-def build_keywords_two_tier(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None, min_must: int = 2) -> str:
-    must = canonicalize(must)
-    anchors, rest = must[:max(0, min_must)], must[max(0, min_must):]
-    left = " AND ".join(or_group([a]) for a in anchors) if anchors else ""
-    right = or_group(unique_preserve(rest + canonicalize(nice) + canonicalize(qualifiers or [])))
-    core = " AND ".join([p for p in [left, right] if p])
-    ng = not_group(unique_preserve(canonicalize(nots)))
-    return f"{core} NOT {ng}" if ng else core
-
-def jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
-    jd = normalize_quotes((jd_text or "").lower())
-    pool = {s.lower() for role in ROLE_LIB.values() for s in (role["must"] + role["nice"])}
-
-    def count_term(term: str) -> int:
-        if " " in term or "/" in term or "-" in term:
-            return jd.count(term)
-        return len(re.findall(rf"\b{re.escape(term)}\b", jd))
-
-    ranked = [t for t in sorted(pool, key=lambda x: count_term(x), reverse=True) if count_term(t) > 0]
-    must_ex, nice_ex = ranked[:8], ranked[8:16]
-    auto_not_terms = ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]
-    auto_not = [kw for kw in auto_not_terms if re.search(rf"\b{re.escape(kw)}\b", jd)]
-    return must_ex, nice_ex, auto_not
-
-def string_health_report(s: str) -> List[str]:
-    issues: List[str] = []
-    if not s:
-        return ["Keywords are empty — add must/nice skills."]
-    if len(s) > 900:
-        issues.append("Keywords look long (>900 chars); consider trimming.")
-    if s.count(" OR ") > 80:
-        issues.append("High OR count; remove niche/redundant terms.")
-    unquoted = re.sub(r'"[^"]*"', "", s)
-    depth = 0
-    ok = True
-    for ch in unquoted:
-        if ch == "(":
-            depth += 1
-        elif ch == ")":
-            depth -= 1
-            if depth < 0:
-                ok = False
-                break
-    if depth != 0 or not ok:
-        issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
-    return issues
-
-def string_health_grade(s: str) -> str:
-    if not s:
-        return "F"
-    score = 100
-    if len(s) > 900:
-        score -= 25
-    orc = s.count(" OR ")
-    if orc > 80:
-        score -= 25
-    if orc > 40:
-        score -= 15
-    if any("Unbalanced parentheses" in x for x in string_health_report(s)):
-        score -= 25
-    return "A" if score >= 90 else "B" if score >= 80 else "C" if score >= 70 else "D" if score >= 60 else "E" if score >= 50 else "F"
-
-def apply_seniority(titles: List[str], level: str) -> List[str]:
-    base = []
-    for t in titles:
-        b = t
-        for tok in ["Senior ", "Staff ", "Principal ", "Lead ", "Sr "]:
-            b = b.replace(tok, "")
-        base.append(b.strip())
-    out: List[str] = []
-    if level == "All":
-        out = titles + base
-    elif level == "Associate":
-        out = ["Junior " + b for b in base] + base
-    elif level == "Mid":
-        out = base
-    elif level == "Senior+":
-        out = ["Senior " + b for b in base] + base
-    else:
-        out = ["Staff " + b for b in base] + ["Principal " + b for b in base] + ["Lead " + b for b in base] + base
-    seen, res = set(), []
-    for x in out:
-        xl = x.lower()
-        if xl not in seen:
-            seen.add(xl)
-            res.append(x)
-    return res[:24]
+def session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
 
-# ============================ AI Layer ============================
-MODEL_DEFAULT = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+@st.cache_resource(show_spinner=False)
+def ai_pack_cache() -> SizedLRU:
+    # Process-wide and bounded (AI_CACHE_MAX_ENTRIES / AI_CACHE_MAX_BYTES); caps can be changed in the memory panel
+    return SizedLRU(int(os.getenv("AI_CACHE_MAX_ENTRIES", "512")), int(os.getenv("AI_CACHE_MAX_BYTES", str(32 << 20))))
+
+def _ai_key(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str) -> Tuple:
+    # Keyed on a digest of the JD, not its text, so keys stay small
+    return (title, location, text_digest(jd_text), level, env, size, model)
 
-@st.cache_data(show_spinner=False)
-def _ai_cached(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str) -> Dict[str, Any]:
-    payload = ai_generate_role_pack(title, location, jd_text, level, env, size, model)
-    return payload or {}
+def ai_pack_lookup(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """(role pack, note) answered without calling the model, or (None, "") when a call is needed.
 
-def get_openai_client():
-    if OpenAI is None:
-        return None, "OpenAI SDK not installed. Add `openai` to requirements."
+    The note explains a budget fallback; past a cap with no earlier pack for the title, raises AIBudgetExceeded.
+    """
+    cache = ai_pack_cache()
+    pack = cache.get(_ai_key(title, location, jd_text, level, env, size, model))
+    if pack is not None:
+        usage_ledger().record(model, HIT, session_id())
+        return pack, ""
+    reason = over_budget(usage_ledger(), AI_BUDGETS, model, session_id())
+    if reason:
+        usage_ledger().record(model, FALLBACK, session_id())
+        # Any earlier pack for this title (other JD, filters or model) beats the generic library
+        pack = cache.get(("title", title.lower()))
+        if pack is None:
+            raise AIBudgetExceeded(reason)
+        return pack, f"AI budget: {reason}; reused an earlier AI pack for this title."
+    return None, ""
+
+def ai_pack_fetch(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str, session: str) -> Dict[str, Any]:
+    """Call the model and cache a valid pack. Runs on the AI executor, so it writes no st.* output."""
+    payload = ai_generate_role_pack(title, location, jd_text, level, env, size, model, session)
+    # Only missing fields and wrong types reject the pack; item counts are trimmed or kept with a warning
+    payload, trimmed = trim_role_pack(payload)
+    issues = validate_role_pack(payload)
+    errors = fatal(issues)
+    if not payload or errors:
+        raise RolePackInvalid("; ".join(f"{e.field}: {e.message}" for e in errors[:5]))
+    warnings = trimmed + [e for e in issues if e.warning]
+    if warnings:
+        payload["schema_warnings"] = [f"{e.field}: {e.message}" for e in warnings]
+    # Cached even when it lands past the deadline, so the next Build of this title is instant
+    ai_pack_cache().put(_ai_key(title, location, jd_text, level, env, size, model), payload)
+    ai_pack_cache().put(("title", title.lower()), payload)
+    return payload
+
+def _openai_api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         try:
             api_key = st.secrets["OPENAI_API_KEY"]  # nicer error if missing
         except Exception:
             api_key = None
-    if not api_key:
-        return None, "Missing OPENAI_API_KEY (env var or st.secrets)."
-    try:
-        client = OpenAI(api_key=api_key)
-        return client, None
-    except Exception as e:
-        return None, f"OpenAI client error: {e}"
-
-def parse_json_safely(text: str) -> Dict[str, Any]:
-    if not text:
-        return {}
-    m = re.search(r"\{[\s\S]*\}", text)
-    raw = m.group(0) if m else text
+    return api_key or ""
+
+@st.cache_resource(show_spinner=False)
+def _llm_router(api_key: str) -> ProviderRouter:
+    # One router per process so provider latency/cost stats accumulate across sessions
+    return router_from_env(api_key or None, MODEL_DEFAULT)
+
+def get_llm_router() -> Tuple[Any, Any]:
     try:
-        return json.loads(raw)
-    except Exception:
-        raw2 = re.sub(r",\s*([}\]])", r"\1", raw)
-        try:
-            return json.loads(raw2)
-        except Exception:
-            return {}
+        return _llm_router(_openai_api_key()), None
+    except ProviderError as e:
+        return None, str(e)
 
-def call_llm_json(messages: List[Dict[str, str]], model: str = MODEL_DEFAULT) -> Dict[str, Any]:
-    client, err = get_openai_client()
+def call_llm_json(messages: List[Dict[str, str]], model: str = MODEL_DEFAULT, session: str = "",
+                  priority: int = INTERACTIVE) -> Dict[str, Any]:
+    router, err = get_llm_router()
     if err:
-        st.info(err)
-        return {}
-    # Chat Completions with JSON mode
+        raise ProviderError(err)
+    t0 = time.perf_counter()
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-            messages=[{"role": m.get("role", "user"), "content": m.get("content", "")} for m in messages],
-        )
-        txt = resp.choices[0].message.content
-        return parse_json_safely(txt)
-    except Exception:
-        pass
-    # Responses API fallback (defensive)
-    try:
-        resp2 = client.responses.create(
-            model=model,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-            input=[{"role": m.get("role", "user"), "content": m.get("content", "")} for m in messages],
-        )
-        txt = getattr(resp2, "output_text", None)
-        if not txt:
-            try:
-                parts = resp2.output[0].content  # type: ignore[attr-defined]
-                txt = "".join([p.text for p in parts if getattr(p, "type", "") == "output_text"])
-            except Exception:
-                txt = None
-        return parse_json_safely(txt or "")
-    except Exception as e:
-        st.error(f"AI request failed: {e}")
-        return {}
-
-def ai_generate_role_pack(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str) -> Dict[str, Any]:
-    system = (
-        "You are a senior technical sourcer. Given a role title and optional JD text, "
-        "output a compact JSON object to drive boolean sourcing. Focus on precision."
-    )
-    user = f"""
-Title: {title}
-Location: {location or ""}
-Seniority: {level}
-Work setting: {env}
-Company size: {size}
-
-Job description (optional):\n{(jd_text or '').strip()[:8000]}
-
-Return STRICT JSON with keys:
-- role_category: one of [eng, data, product, design, marketing, sales, ops, finance, hr, legal, it, healthcare, hardware, security, other]
-- titles: array of 10-24 synonyms/nearby titles (include seniority variants relevant to Seniority)
-- must_have: array of 6-12 anchor skills/keywords (technology or function-specific)
-- nice_to_have: array of 6-10 optional skills
-- negatives: array of 6-12 NOT terms (avoid overlap with target function)
-- qualifiers: array of optional keywords like industry or environment (e.g., remote, enterprise)
-- target_companies: array of 15-40 companies relevant to this role (mix of leaders + adjacent)
-- notes: short string with 2–3 tips on narrowing the search
-"""
-    messages = [
-        {"role": "system", "content": system},
-        {"role": "user", "content": user},
-    ]
-    data = call_llm_json(messages, model=model)
+        c = router.complete(messages, model=model, session=session, priority=priority)
+    except ProviderError:
+        usage_ledger().record(model, ERROR, session, latency_ms=(time.perf_counter() - t0) * 1000)
+        raise
+    usage_ledger().record(c.model, CALL, session, c.provider, c.usage.get("prompt_tokens", 0),
+                          c.usage.get("completion_tokens", 0), c.latency_s * 1000, c.cost_usd)
+    return parse_json_safely(c.text)
+
+def ai_generate_role_pack(title: str, location: str, jd_text: str, level: str, env: str, size: str, model: str, session: str = "") -> Dict[str, Any]:
+    messages = role_pack_messages(title, location, jd_text, level, env, size)
+    data = call_llm_json(messages, model=model, session=session)
+    # Unparseable output comes back as {} and needs the fix-up call most
+    errors = fatal(validate_role_pack(data)) if data else [SchemaError("$", "response was not a parseable JSON object")]
+    if errors:
+        # One corrective re-request with the structured errors; it queues behind other sessions' first calls
+        try:
+            retry = call_llm_json(fix_messages(messages, data, errors), model=model, session=session, priority=BATCH)
+        except ProviderError:
+            retry = {}
+        if retry and len(fatal(validate_role_pack(retry))) < len(errors):
+            data = retry
+    if data and isinstance(data.get("role_category"), str):
+        data["role_category"] = data["role_category"].strip().lower()
     return data
 
+# ============================ Deadline-aware AI ============================
+# Build renders the ROLE_LIB pack at once and runs the model call here; the AI terms are merged
+# into the pack when they arrive, or dropped once AI_DEADLINE_S has passed
+AI_DEADLINE_S = float(os.getenv("AI_DEADLINE_S", "20"))
+
+@st.cache_resource(show_spinner=False)
+def ai_executor() -> ThreadPoolExecutor:
+    # Shared by all sessions; bounded so a burst of Builds can't open unbounded provider connections
+    return ThreadPoolExecutor(max_workers=int(os.getenv("AI_WORKERS", "8")), thread_name_prefix="ai-pack")
+
+def start_ai_job(seeds: Dict[str, List[str]], heuristic_cat: str, metro: str, *args: str) -> None:
+    """Submit ai_pack_fetch(*args) for this session, replacing any job from an earlier Build."""
+    future = ai_executor().submit(ai_pack_fetch, *args, session_id())
+    st.session_state["ai_job"] = {"future": future, "deadline": time.time() + AI_DEADLINE_S,
+                                  "seeds": seeds, "category": heuristic_cat, "metro": metro}
+
+def merge_ai_pack(ai: Dict[str, Any], seeds: Dict[str, List[str]], heuristic_cat: str, metro: str) -> None:
+    """Fold an AI role pack into the session's term lists.
+
+    Lists still at their ROLE_LIB seeds get exactly what a blocking Build would have produced;
+    lists the user has edited meanwhile keep the edits, with the AI terms appended.
+    """
+    st.session_state["category"] = (ai.get("role_category") or heuristic_cat or "other")
+    cur = {k: get_terms(k) for k in seeds}
+    if cur["must"] == seeds["must"] and cur["nice"] == seeds["nice"]:
+        set_terms("must", unique_preserve(ai.get("must_have") or seeds["must"]))
+        set_terms("nice", unique_preserve(ai.get("nice_to_have") or seeds["nice"]))
+    else:
+        set_terms("must", unique_preserve(cur["must"] + (ai.get("must_have") or [])))
+        set_terms("nice", unique_preserve(cur["nice"] + (ai.get("nice_to_have") or [])))
+    set_terms("titles", unique_preserve((ai.get("titles") or []) + cur["titles"]))
+    set_terms("not_terms", unique_preserve((ai.get("negatives") or []) + cur["not_terms"]))
+    set_terms("companies_seed", unique_preserve((ai.get("target_companies") or []) + METRO_COMPANIES.get(metro, []) + cur["companies_seed"]))
+    st.session_state["ai_notes"] = ai.get("notes", "")
+
+def resolve_ai_job() -> None:
+    """Merge a finished AI job into the pack, or drop it past the deadline; pending jobs are left alone."""
+    job = st.session_state.get("ai_job")
+    if not job:
+        return
+    future = job["future"]
+    if not future.done():
+        if time.time() < job["deadline"]:
+            return
+        future.cancel()  # Only stops a call still queued; one in flight finishes into the cache
+        st.session_state.pop("ai_job")
+        st.session_state["ai_status"] = ("caption", f"AI took longer than {AI_DEADLINE_S:g}s; kept the fallback library pack.")
+        return
+    st.session_state.pop("ai_job")
+    try:
+        ai = future.result()
+    except RolePackInvalid as e:
+        st.session_state["ai_status"] = ("caption", f"AI response rejected by schema check ({e}).")
+        return
+    except ProviderError as e:
+        st.session_state["ai_status"] = ("error", f"AI request failed: {e}")
+        return
+    merge_ai_pack(ai, job["seeds"], job["category"], job["metro"])
+    # The editors have rendered since Build, so they are reset to the merged terms (as Extract from JD does)
+    refresh_editors()
+    st.session_state["history_pending"] = True
+    st.session_state.pop("ai_status", None)
+    if ai.get("schema_warnings"):
+        st.session_state["ai_status"] = ("caption", "AI pack applied with schema warnings: " + "; ".join(ai["schema_warnings"][:5]) + ".")
+    st.toast("AI suggestions applied.")
+
+@st.fragment(run_every=0.5)
+def ai_job_progress() -> None:
+    # Polls the session's AI job and reruns the whole app once it is done or out of time
+    job = st.session_state.get("ai_job")
+    if not job:
+        return
+    if job["future"].done() or time.time() >= job["deadline"]:
+        st.rerun()
+    router, _ = get_llm_router()
+    queued = router.limiter.depth() if router and router.limiter else 0
+    behind = f" · {queued} AI request{'s' if queued != 1 else ''} queued on the shared key" if queued else ""
+    st.caption(f"⏳ AI suggestions on the way; they merge into the pack when ready (up to {max(0, job['deadline'] - time.time()):.0f}s more){behind}.")
+
 # ============================ Bright Theme CSS ============================
 THEMES: Dict[str, Dict[str, str]] = {
     "Sky":   {"grad": "linear-gradient(135deg, #3B82F6 0%, #60A5FA 100%)", "bg": "#F8FAFC", "card": "#FFFFFF", "text": "#0F172A", "muted": "#475569", "ring": "#3B82F6", "button": "#2563EB"},
@@ -389,9 +257,8 @@ THEMES: Dict[str, Dict[str, str]] = {
     "Mint":  {"grad": "linear-gradient(135deg, #34D399 0%, #22D3EE 100%)", "bg": "#ECFEFF", "card": "#FFFFFF", "text": "#0F172A", "muted": "#334155", "ring": "#10B981", "button": "#10B981"},
 }
 
-def inject_css(theme_name: str) -> None:
-    t = THEMES.get(theme_name, THEMES["Sky"])
-    css = f"""
+def _theme_css(t: Dict[str, str]) -> str:
+    return f"""
     <style>
       :root {{
         --grad: {t['grad']};
@@ -462,35 +329,108 @@ def inject_css(theme_name: str) -> None:
       }}
     </style>
     """
-    st.markdown(css, unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def theme_stylesheets() -> Dict[Tuple[str, ...], str]:
+    # Built (and minified) once per process for every theme, not on each rerun
+    return build_stylesheets(_theme_css, THEMES)
+
+def inject_css(theme_name: str) -> None:
+    sheets = theme_stylesheets()
+    st.markdown(sheets.get((theme_name,), sheets[("Sky",)]), unsafe_allow_html=True)
 
 def hero(job_title: str, category: str, location: str) -> None:
-    st.markdown("<div class='hero'>", unsafe_allow_html=True)
-    st.markdown("<h1>AI Sourcing Assistant</h1>", unsafe_allow_html=True)
-    chips = []
-    if job_title:
-        chips.append("<span class='chip'>🎯 " + job_title + "</span>")
-    if category:
-        chips.append("<span class='chip'>🧠 " + (category.upper()) + "</span>")
-    if location:
-        chips.append("<span class='chip'>📍 " + location + "</span>")
-    if chips:
-        st.markdown("<div class='chips'>" + "".join(chips) + "</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(hero_html(job_title or "", category or "", location or ""), unsafe_allow_html=True)
 
 def code_card(title: str, text: str, hint: str = "") -> None:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<h3 style='margin:0 0 6px 0;font-size:14px;color:var(--muted);'>" + title + "</h3>", unsafe_allow_html=True)
+    st.markdown(card_header_html(title), unsafe_allow_html=True)
     st.code(text or "", language="text")
     if hint:
-        st.markdown("<div class='hint'>" + hint + "</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown(hint_html(hint), unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def warm_company_index() -> int:
+    # Default segment selections for every role × metro, once per process
+    return COMPANY_INDEX.warm("alias")
+
+@st.cache_resource(show_spinner=False)
+def company_search_index() -> CompanySegmentIndex:
+    return build_company_search_index()
+
+@st.cache_resource(show_spinner=False)
+def jd_corpus() -> DocFreqStore:
+    # Process-wide JD document frequencies (IDF background), persisted to DOCFREQ_FILE
+    return open_docfreq_store()
+
+def learn_jd(jd_text: str) -> bool:
+    """Count a pasted JD in the IDF corpus; repeats of the same text are ignored."""
+    if not (jd_text or "").strip():
+        return False
+    return jd_corpus().add(jd_terms(jd_text), doc_fingerprint(jd_text))
+
+COMPANY_POLICY_LABELS = {
+    "exact": "Exact names only",
+    "alias": "Merge aliases",
+    "parent": "Merge subsidiaries into parent",
+    "expand": "Expand aliases (widest match)",
+}
+
+# ============================ Session term lists ============================
+# titles/must/nice/not_terms/companies_seed are stored as interned ID arrays; text is built on read
+EDITOR_KEYS = ("titles_text", "must_text", "nice_text")
+
+def get_terms(key: str) -> List[str]:
+    return TERMS.decode(st.session_state.get(key, EMPTY_IDS))
+
+def set_terms(key: str, terms: List[str]) -> None:
+    st.session_state[key] = TERMS.encode(terms)
+
+def merge_terms(key: str, extra: List[str]) -> None:
+    # unique_preserve(current + extra) without leaving the ID domain
+    new = TERMS.encode(extra)
+    st.session_state[key] = TERMS.unique(itertools.chain(st.session_state.get(key, EMPTY_IDS), new))
+
+def refresh_editors() -> None:
+    """Drop the editors' text so they render again from the term IDs (their `value`)."""
+    for key in EDITOR_KEYS:
+        st.session_state.pop(key, None)
+
+def extract_from_jd() -> None:
+    jd = st.session_state.get("jd_text_local", "")
+    learn_jd(jd)
+    analysis = analyze_jd(jd, jd_corpus())
+    m_ex, n_ex, n_not = [h.term for h in analysis.must], [h.term for h in analysis.nice], [h.term for h in analysis.nots]
+    if m_ex:
+        merge_terms("must", m_ex)
+    if n_ex:
+        merge_terms("nice", n_ex)
+    if n_not:
+        merge_terms("not_terms", n_not)
+    applied = bool(m_ex or n_ex or n_not)
+    if applied:
+        refresh_editors()
+    rows = [
+        {"bucket": bucket, "term": h.term, "score": h.score, "count": h.count, "section": h.section,
+         "evidence": " … ".join(jd[s:e] for s, e in h.spans)}
+        for bucket, hits in (("must", analysis.must), ("nice", analysis.nice), ("not", analysis.nots)) for h in hits
+    ]
+    st.session_state["jd_extract_result"] = {"applied": applied, "rows": rows}
 
 # ============================ URL State ============================
 qp = st.query_params
 
+# Legacy per-field params (old links) and the snapshot fields they map to
+QP_FIELDS = {"title": "role_title", "loc": "location", "level": "level", "env": "env", "size": "size",
+             "metro": "metro", "theme": "theme", "not": "extra_not"}
+
+def restored(name: str, default: Any) -> Any:
+    """Value from the shared pack this session was opened with (used as widget defaults), else `default`."""
+    return st.session_state.get("restored_pack", {}).get(name, default)
+
 def qp_get(name: str, default: str = "") -> str:
     val = qp.get(name, None)
+    if val is None:
+        val = restored(QP_FIELDS[name], None) if name in QP_FIELDS else None
     if val is None:
         return default
     if isinstance(val, list):
@@ -501,6 +441,51 @@ def qp_set(**kwargs):
     for k, v in kwargs.items():
         st.query_params[k] = v
 
+@st.cache_resource(show_spinner=False)
+def snapshot_store() -> SnapshotStore:
+    # Holds packs whose token would be longer than SNAPSHOT_MAX_CHARS
+    return open_snapshot_store()
+
+@st.cache_resource(show_spinner=False)
+def pack_history() -> PackHistory:
+    return open_history()
+
+def apply_snapshot(snap: Dict[str, Any]) -> None:
+    for key in ("titles", "must", "nice", "not_terms", "companies_seed"):
+        set_terms(key, snap[key])
+    st.session_state.update(built=True, role_title=snap["role_title"], location=snap["location"],
+                            category=snap["category"], ai_notes=snap["ai_notes"], restored_pack=snap)
+    # A restored pack is final; an AI job from an earlier Build must not merge into it
+    st.session_state.pop("ai_job", None)
+
+def restore_pack(token: str) -> None:
+    """Rebuild the edited pack from a share token — no AI call."""
+    apply_snapshot(decode_token(token, snapshot_store()))
+
+def history_pack_text(history: PackHistory, key: str) -> str:
+    """Deferred download data for a history row; runs off the script thread, so it takes the store explicitly."""
+    stored = history.get(key, touch=False)
+    return stored.pack_text if stored else ""
+
+def open_from_history(key: str) -> None:
+    """on_click for a history row: reopen the stored pack as if its share link had been opened."""
+    pack = pack_history().get(key)
+    try:
+        if pack is None or pack.snapshot is None:
+            raise SnapshotError("this pack was imported without its editable state; download its text instead")
+        apply_snapshot(decode_blob(pack.snapshot))
+        st.session_state.pop("history_error", None)
+    except SnapshotError as e:
+        st.session_state["history_error"] = f"Couldn't reopen that pack: {e}"
+
+_share_token = qp_get("s")
+if _share_token and _share_token != st.session_state.get("pack_token"):
+    try:
+        restore_pack(_share_token)
+    except SnapshotError as e:
+        st.warning(f"Couldn't reopen the shared pack: {e}")
+    st.session_state["pack_token"] = _share_token
+
 # ============================ UI: Inputs ============================
 col_theme = st.columns([1])[0]
 with col_theme:
@@ -535,24 +520,44 @@ with col4:
 # ============================ AI Controls ============================
 ai_expander = st.expander("🤖 AI Assistance (optional)", expanded=True)
 with ai_expander:
-    st.caption("Set an API key in env `OPENAI_API_KEY` or Streamlit `st.secrets`. Model can be overridden with env `OPENAI_MODEL`.")
+    st.caption("Set an API key in env `OPENAI_API_KEY` or Streamlit `st.secrets`. Model can be overridden with env `OPENAI_MODEL`. "
+               "Set `LLM_LOCAL_BASE_URL` to send short prompts to a local OpenAI-compatible server (enter its `LLM_LOCAL_MODEL` as the Model), "
+               "or `LLM_PROVIDER=mock` to run offline.")
     use_ai = st.checkbox("Enable AI for any role/title", value=True)
     model_name = st.text_input("Model", value=MODEL_DEFAULT)
     jd_helper = st.text_area("Paste JD (optional) for better suggestions", height=160, key="jd_text_global")
     ai_ping = st.button("Test AI connection")
     if ai_ping:
-        client, err = get_openai_client()
+        router, err = get_llm_router()
         if err:
             st.error(err)
         else:
-            st.success("OpenAI client ready.")
+            st.success("AI providers ready: " + ", ".join(router.providers))
+    router, _ = get_llm_router()
+    if router and any(v["calls"] for v in router.stats().values()):
+        st.caption("Provider latency & cost (this server process)")
+        st.dataframe([{"provider": k, **v} for k, v in router.stats().items()], hide_index=True)
+    if router and router.limiter:
+        q = router.limiter.stats()
+        quota = " · ".join(f"{q[k + '_left']:,g} of {q[k]:,g} {k.upper()} left" for k in ("rpm", "tpm") if q[k])
+        st.caption(f"Shared-key queue: {q['queued']['interactive']} interactive, {q['queued']['batch']} batch waiting "
+                   f"(oldest {q['oldest_wait_s']:g}s) · wait p50 {q['wait_p50_s']:g}s / p95 {q['wait_p95_s']:g}s · {quota}"
+                   + (f" · {q['backoffs']} 429 back-offs" if q["backoffs"] else ""))
+    if st.toggle("Show AI usage (tokens, latency, cost)", key="show_usage"):
+        ledger = usage_ledger()
+        day_cap = f" of ${AI_BUDGETS.day_usd:g}" if AI_BUDGETS.day_usd else ""
+        st.caption(f"Spent today: ${ledger.spent(day=usage_today()):.4f}{day_cap} · this session: ${ledger.spent(session=session_id()):.4f} "
+                   "· `python -m sourcing.usage bench --models …` compares models on a fixed title set")
+        usage_by = st.radio("Group by", ["model", "day", "session", "provider"], horizontal=True, key="usage_by")
+        st.dataframe(ledger.summary(usage_by, days=int(os.getenv("AI_USAGE_DAYS", "7"))), hide_index=True, use_container_width=True)
 
 # Build
 if st.button("✨ Build sourcing pack") and (job_title or "").strip():
-    qp_set(**{"title": job_title, "loc": location, "level": level, "env": env, "size": size, "metro": metro, "theme": theme_choice, "not": st.session_state.get("extra_not", "")})
     st.session_state["built"] = True
+    st.session_state["history_pending"] = True
     st.session_state["role_title"] = job_title
     st.session_state["location"] = location
+    learn_jd(st.session_state.get("jd_text_global", ""))
 
     # Default seeds (fallback)
     heuristic_cat = map_title_to_category(job_title)
@@ -563,39 +568,52 @@ if st.button("✨ Build sourcing pack") and (job_title or "").strip():
     not_seed = list(SMART_NOT)
     companies_seed: List[str] = []
 
-    # AI augmentation (any role)
+    set_terms("titles", titles_seed)
+    set_terms("must", must_seed)
+    set_terms("nice", nice_seed)
+    set_terms("not_terms", not_seed)
+    set_terms("companies_seed", companies_seed)
+    st.session_state["category"] = heuristic_cat
+    st.session_state.pop("ai_job", None)
+    st.session_state.pop("ai_status", None)
+
+    # AI augmentation (any role): a cached pack applies now, a model call runs in the background
     if use_ai and job_title.strip():
-        with st.spinner("Calling AI for role intelligence…"):
-            ai = _ai_cached(job_title.strip(), location.strip(), st.session_state.get("jd_text_global", ""), level, env, size, model_name)
-        if ai:
-            st.session_state["category"] = (ai.get("role_category") or heuristic_cat or "other")
-            titles_seed = unique_preserve((ai.get("titles") or []) + titles_seed)
-            must_seed   = unique_preserve(ai.get("must_have") or must_seed)
-            nice_seed   = unique_preserve(ai.get("nice_to_have") or nice_seed)
-            not_seed    = unique_preserve((ai.get("negatives") or []) + not_seed)
-            companies_seed = unique_preserve((ai.get("target_companies") or []) + METRO_COMPANIES.get(metro, []))
-            st.session_state["ai_notes"] = ai.get("notes", "")
-            st.toast("AI suggestions applied.")
-        else:
-            st.session_state["category"] = heuristic_cat
+        ai_args = (job_title.strip(), location.strip(), st.session_state.get("jd_text_global", ""), level, env, size, model_name)
+        _, err = get_llm_router()
+        try:
+            ai, ai_note = ai_pack_lookup(*ai_args)
+        except AIBudgetExceeded as e:
+            st.caption(f"AI budget: {e}.")
             st.info("AI unavailable; using fallback library.")
-    else:
-        st.session_state["category"] = heuristic_cat
+        else:
+            if ai_note:
+                st.caption(ai_note)
+            seeds = {k: get_terms(k) for k in ("titles", "must", "nice", "not_terms", "companies_seed")}
+            if ai:
+                merge_ai_pack(ai, seeds, heuristic_cat, metro)
+                st.toast("AI suggestions applied.")
+            elif err:
+                st.info(err)
+                st.info("AI unavailable; using fallback library.")
+            else:
+                start_ai_job(seeds, heuristic_cat, metro, *ai_args)
 
-    st.session_state["titles"] = titles_seed
-    st.session_state["must"] = must_seed
-    st.session_state["nice"] = nice_seed
-    st.session_state["not_terms"] = not_seed
-    st.session_state["companies_seed"] = companies_seed
+resolve_ai_job()
+ai_status = st.session_state.get("ai_status")
+if ai_status:
+    getattr(st, ai_status[0])(ai_status[1])
+if st.session_state.get("ai_job"):
+    ai_job_progress()
 
 category = st.session_state.get("category", "")
 hero(st.session_state.get("role_title", ""), category, st.session_state.get("location", ""))
 
 if st.session_state.get("built"):
-    titles = st.session_state.get("titles", [])
-    must = st.session_state.get("must", [])
-    nice = st.session_state.get("nice", [])
-    base_not = st.session_state.get("not_terms", [])
+    titles = get_terms("titles")
+    must = get_terms("must")
+    nice = get_terms("nice")
+    base_not = get_terms("not_terms")
 
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
@@ -606,16 +624,19 @@ if st.session_state.get("built"):
     elif any(w in title_lower for w in ["senior", "sr "]):
         level = "Senior+"
 
-    titles = apply_seniority(titles, level)
+    # Pack artifacts live in a per-session dependency graph; only nodes whose inputs changed recompute
+    graph: PackGraph = st.session_state.setdefault("pack_graph", PackGraph())
+    graph.set(raw_titles=titles, level=level)
+    titles = graph.get("titles")
 
     # Editors + advanced controls
     st.subheader("✏️ Customize")
     c0, c1, c2 = st.columns([1, 1, 1])
     with c0:
-        ic_only = st.checkbox("IC-only (exclude managers)", value=False, help="Adds NOT manager/director/head of")
-        use_two_tier = st.checkbox("Use must-have anchors (AND)", value=False, help="Require 1–3 anchors; everything else stays OR")
-        min_must = st.slider("Anchors count", min_value=1, max_value=3, value=2, disabled=not use_two_tier)
-        env_size_as_keywords = st.checkbox("Also add env/size as keywords", value=False, help="When filters aren't available; may increase noise")
+        ic_only = st.checkbox("IC-only (exclude managers)", value=restored("ic_only", False), help="Adds NOT manager/director/head of")
+        use_two_tier = st.checkbox("Use must-have anchors (AND)", value=restored("two_tier", False), help="Require 1–3 anchors; everything else stays OR")
+        min_must = st.slider("Anchors count", min_value=1, max_value=3, value=restored("min_must", 2), disabled=not use_two_tier)
+        env_size_as_keywords = st.checkbox("Also add env/size as keywords", value=restored("env_size_as_keywords", False), help="When filters aren't available; may increase noise")
     with c1:
         titles_text = st.text_area("Titles (one per line)", value="\n".join(titles), height=180, key="titles_text")
     with c2:
@@ -623,89 +644,109 @@ if st.session_state.get("built"):
         nice_text = st.text_area("Nice-to-have skills (comma-separated)", value=", ".join(nice), height=120, key="nice_text")
 
     # JD extraction (optional, local)
-    with st.expander("📄 Paste JD → Auto-extract using keyword heuristics (optional)"):
+    with st.expander("📄 Paste JD → Auto-extract ranked skills (optional, runs locally)"):
         jd = st.text_area("Paste JD (optional)", height=160, key="jd_text_local")
-        if st.button("Extract from JD"):
-            m_ex, n_ex, n_not = jd_extract(jd)
-            applied = False
-            if m_ex:
-                st.session_state["must"] = unique_preserve(st.session_state.get("must", []) + m_ex); applied = True
-            if n_ex:
-                st.session_state["nice"] = unique_preserve(st.session_state.get("nice", []) + n_ex); applied = True
-            if n_not:
-                st.session_state["not_terms"] = unique_preserve(st.session_state.get("not_terms", []) + n_not); applied = True
-            if applied:
-                st.session_state["must_text"] = ", ".join(st.session_state["must"])
-                st.session_state["nice_text"] = ", ".join(st.session_state["nice"])
+        # Runs as a callback so the editor widgets can be updated before they render
+        st.button("Extract from JD", on_click=extract_from_jd)
+        result = st.session_state.pop("jd_extract_result", None)
+        if result is not None:
+            if result["applied"]:
                 st.success("JD terms applied to the editors.")
+                st.dataframe(result["rows"], hide_index=True, use_container_width=True)
             else:
                 st.info("No strong matches found.")
+        corpus = jd_corpus()
+        st.caption(f"Terms are weighted against {corpus.n_docs:,} JDs seen so far; rarer terms rank higher.")
+        jd_files = st.file_uploader("Add JDs to the corpus (.txt separated by '---' lines, or .jsonl with a \"text\" field)",
+                                    type=["txt", "jsonl"], accept_multiple_files=True, key="jd_corpus_files")
+        if jd_files and st.button("Add to corpus"):
+            added = 0
+            for f in jd_files:
+                for text in iter_jd_lines(io.TextIOWrapper(f, encoding="utf-8", errors="replace")):
+                    added += learn_jd(text)
+            corpus.flush()
+            st.success(f"Added {added:,} new JDs ({corpus.n_docs:,} total).")
 
     # Apply user edits
     if st.button("Apply changes"):
         titles = [t.strip() for t in st.session_state.get("titles_text", "").splitlines() if t.strip()]
         must = [s.strip() for s in st.session_state.get("must_text", "").split(",") if s.strip()]
         nice = [s.strip() for s in st.session_state.get("nice_text", "").split(",") if s.strip()]
-        st.session_state["titles"], st.session_state["must"], st.session_state["nice"] = titles, must, nice
+        set_terms("titles", titles); set_terms("must", must); set_terms("nice", nice)
+        graph.set(raw_titles=titles)
+        titles = graph.get("titles")
 
     # Companies
+    warm_company_index()
     st.subheader("🏢 Company Targets — common employers for this role")
-    group_order = ROLE_TO_GROUPS.get((category or "swe"), ["faang_plus"])
+    group_order = segment_order(category)
     default_sel = group_order[:3] if len(group_order) >= 3 else group_order
+    if restored("segments", None) is not None:
+        default_sel = [g for g in restored("segments", None) if g in group_order]
     selected_groups = st.multiselect("Segments", options=group_order, default=default_sel, help="Choose segments to populate the company list.")
-    custom_companies = st.text_area("Add companies (comma-separated)", placeholder="e.g., Two Sigma, Bloomberg, Robinhood", height=80)
-
-    companies = []
-    for g in selected_groups:
-        companies.extend(COMPANY_SETS.get(g, []))
-    companies.extend(METRO_COMPANIES.get(metro, []))
-    companies.extend(st.session_state.get("companies_seed", []))
-    companies.extend([c.strip() for c in (custom_companies or "").split(",") if c.strip()])
-    companies = unique_preserve(companies)
+    custom_companies = st.text_area("Add companies (comma-separated)", value=restored("custom_companies", ""), placeholder="e.g., Two Sigma, Bloomberg, Robinhood", height=80)
+    custom_list = [c.strip() for c in (custom_companies or "").split(",") if c.strip()]
+    cs_index = company_search_index()
+    if custom_list:
+        suggestions = cs_index.suggest_segments(custom_list, category or "swe", exclude=selected_groups)
+        if suggestions:
+            st.caption("💡 Segments matching your companies: " + ", ".join(f"**{seg}** ({n}: {', '.join(names[:3])})" for seg, n, names in suggestions[:3]))
+    company_lookup = st.text_input("Look up a company", placeholder="Type a prefix, e.g. clou", key="company_lookup")
+    if company_lookup.strip():
+        matches = cs_index.complete(company_lookup, limit=12)
+        st.caption(("Matches: " + ", ".join(matches)) if matches else "No known companies with that prefix.")
+    cp1, cp2 = st.columns(2)
+    with cp1:
+        company_policy = st.selectbox("Company dedupe", COMPANY_POLICIES, index=COMPANY_POLICIES.index(restored("company_policy", "alias")), format_func=COMPANY_POLICY_LABELS.get,
+                                      help="Merge aliases (Facebook → Meta) or subsidiaries (YouTube → Google) to shorten the Companies string.")
+    with cp2:
+        max_company_chars = st.number_input("Max Companies string length (0 = no limit)", min_value=0, max_value=5000, value=int(restored("max_company_chars", 0)), step=100)
+
+    # Segment + metro part is shared across sessions; only seeds/custom entries are merged here
+    company_extra = get_terms("companies_seed") + custom_list
+    companies = COMPANY_INDEX.companies(selected_groups, metro, company_extra, company_policy)
+    company_source = [selected_groups, metro, company_extra, company_policy]
+    if company_policy in ("alias", "parent"):
+        n_raw = len(COMPANY_INDEX.companies(selected_groups, metro, company_extra))
+        if n_raw > len(companies):
+            st.caption(f"Merged {n_raw - len(companies)} duplicate/related companies.")
+    if max_company_chars:
+        companies, dropped = fit_or_group(companies, int(max_company_chars))
+        if dropped:
+            company_source = None  # trimmed list: quote what's left
+            st.caption(f"Dropped {len(dropped)} companies to stay under {int(max_company_chars)} chars: " + ", ".join(dropped[:10]) + ("…" if len(dropped) > 10 else ""))
 
     # Qualifiers (in Keywords)
-    qual = []
-    if env_size_as_keywords:
-        if env == "Remote":
-            qual.append("remote")
-        elif env == "Hybrid":
-            qual.append("hybrid")
-        elif env == "On-site":
-            qual.append("on-site")
-        if size == "Startup":
-            qual.append("startup")
-        elif size == "Growth":
-            qual.append("scale-up")
-        elif size == "Enterprise":
-            qual.append("enterprise")
-        qual += ["highly scalable", "high throughput"]
+    qual = env_size_qualifiers(env, size) if env_size_as_keywords else []
 
     # Build NOT list (IC-only optional)
     extra_not_list = [t.strip() for t in (st.session_state.get("extra_not", "") or "").split(",") if t.strip()]
     all_not = unique_preserve(base_not + extra_not_list)
     if ic_only:
-        all_not = unique_preserve(all_not + ["manager", "director", "head of"])
+        all_not = unique_preserve(all_not + IC_ONLY_NOT)
 
     # Build strings
-    li_title_current = or_group(titles)
-    li_title_past = or_group(titles[: min(20, len(titles))])
-    li_keywords = build_keywords_two_tier(must, nice, all_not, qualifiers=qual, min_must=min_must) if use_two_tier else build_keywords(must, nice, all_not, qualifiers=qual)
-    companies_or = or_group(companies)
-    skills_all_csv = ", ".join(unique_preserve(must + nice))
+    graph.set(
+        must=must, nice=nice, nots=all_not, qualifiers=qual, two_tier=use_two_tier, min_must=min_must,
+        companies=companies, company_source=company_source, role_title=st.session_state.get("role_title", ""),
+        location=st.session_state.get("location") or "", ai_notes=st.session_state.get("ai_notes") or "",
+    )
+    li_title_current = graph.get("title_current")
+    li_title_past = graph.get("title_past")
+    li_keywords = graph.get("keywords")
+    companies_or = graph.get("companies_or")
 
     # Health + grade + quick fix
-    issues = string_health_report(li_keywords)
-    grade = string_health_grade(li_keywords)
+    issues = graph.get("health")
+    grade = graph.get("grade")
     if issues:
         st.warning("Health: " + grade + "\n" + "\n".join(["• " + x for x in issues]))
         if st.button("🧹 Trim & Dedupe (suggested)"):
             must_k = canonicalize(must)[:12]
             nice_k = canonicalize(nice)[:8]
             all_not_k = canonicalize(all_not)[:10]
-            if use_two_tier:
-                li_keywords = build_keywords_two_tier(must_k, nice_k, all_not_k, qualifiers=canonicalize(qual), min_must=min_must)
-            else:
-                li_keywords = build_keywords(must_k, nice_k, all_not_k, qualifiers=canonicalize(qual))
+            graph.set(must=must_k, nice=nice_k, nots=all_not_k, qualifiers=canonicalize(qual))
+            li_keywords = graph.get("keywords")
             st.success("Applied trim/dedupe.")
     else:
         st.success("✅ String looks healthy (" + grade + ") and ready to paste into LinkedIn.")
@@ -714,37 +755,22 @@ if st.session_state.get("built"):
     # Boolean Pack
     st.subheader("🎯 Boolean Pack (LinkedIn fields)")
     st.caption("Each block is copyable — paste into the matching LinkedIn field.")
-    st.markdown("<div class='grid'>", unsafe_allow_html=True)
     code_card("Title (Current) • People → Title (Current)", li_title_current)
     code_card("Title (Past) • People → Title (Past)", li_title_past)
     code_card("Keywords (Boolean) • People → Keywords", li_keywords)
     code_card("Companies (OR) • People → Current/Past company", companies_or)
-    st.markdown("</div>", unsafe_allow_html=True)
+
+    # All anchor/IC-only/seniority/qualifier combinations side by side
+    with st.expander("🧪 Compare variants (anchors × IC-only × seniority × env/size)"):
+        if st.checkbox("Build variant table", value=False, key="show_sweep"):
+            rows = sweep_variants(
+                get_terms("titles"), must, nice, unique_preserve(base_not + extra_not_list), env=env, size=size,
+            )
+            st.caption(f"{len(rows)} variants — click a column header to sort.")
+            st.dataframe(rows, hide_index=True, use_container_width=True)
 
     # Build export text (used below and in Export tab)
-    lines: List[str] = []
-    lines.append("ROLE: " + st.session_state.get("role_title", ""))
-    lines.append("LOCATION: " + (st.session_state.get("location") or ""))
-    lines.append("")
-    lines.append("COMPANIES (OR):")
-    lines.append(companies_or)
-    lines.append("")
-    lines.append("TITLE (CURRENT):")
-    lines.append(li_title_current)
-    lines.append("")
-    lines.append("TITLE (PAST):")
-    lines.append(li_title_past)
-    lines.append("")
-    lines.append("KEYWORDS:")
-    lines.append(li_keywords)
-    lines.append("")
-    lines.append("SKILLS (CSV):")
-    lines.append(skills_all_csv)
-    if st.session_state.get("ai_notes"):
-        lines.append("")
-        lines.append("AI NOTES:")
-        lines.append(st.session_state.get("ai_notes"))
-    pack_text = "\n".join(lines)
+    pack_text = graph.get("pack_text")
 
     # Assistant Panels
     st.subheader("📚 Assistant Panels")
@@ -832,40 +858,164 @@ We’re scaling {{team/product}}. Your experience across {', '.join(must[:5]) or
 
     # Export (download)
     st.subheader("⬇️ Export")
-    st.download_button("Download pack (.txt)", data=pack_text, file_name="sourcing_pack.txt")
+    st.download_button("Download pack (.txt)", data=pack_text, file_name="sourcing_pack.txt",
+                       on_click=lambda: st.session_state.update(history_pending=True))
+    x1, x2, x3 = st.columns([1, 1, 1])
+    with x1:
+        export_fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=str.upper, key="export_fmt")
+    with x2:
+        export_variant = st.selectbox("Fields", list(EXPORT_VARIANTS), format_func=EXPORT_VARIANT_LABELS.get, key="export_variant")
+    with x3:
+        _, export_mime, export_ext = EXPORT_FORMATS[export_fmt]
+        current_pack = {"id": 1, "category": category, **{f: graph.get(f) for f in EXPORT_FIELDS}}
+        st.download_button(f"Download pack ({export_ext})", data=export_bytes([current_pack], export_fmt, export_variant),
+                           file_name=f"sourcing_pack_{export_variant}{export_ext}", mime=export_mime,
+                           on_click=lambda: st.session_state.update(history_pending=True))
+
+    # The whole edited pack as one compact ?s= token; reopening the URL restores it without an AI call
+    snapshot_blob = encode_blob({
+        "role_title": st.session_state.get("role_title", ""), "location": st.session_state.get("location") or "",
+        "level": level, "env": env, "size": size, "metro": metro, "theme": theme_choice,
+        "extra_not": st.session_state.get("extra_not", ""), "category": category, "ai_notes": st.session_state.get("ai_notes") or "",
+        "titles": get_terms("titles"), "must": get_terms("must"), "nice": get_terms("nice"),
+        "not_terms": get_terms("not_terms"), "companies_seed": get_terms("companies_seed"),
+        "custom_companies": custom_companies or "", "segments": selected_groups, "company_policy": company_policy,
+        "max_company_chars": int(max_company_chars), "ic_only": ic_only, "two_tier": use_two_tier, "min_must": min_must,
+        "env_size_as_keywords": env_size_as_keywords,
+    })
+    share_token = blob_token(snapshot_blob, snapshot_store(), max_chars=int(os.getenv("SNAPSHOT_MAX_CHARS", "1500")))
+    if share_token != qp_get("s"):
+        st.query_params.from_dict({"s": share_token, **({"debug": qp_get("debug")} if qp_get("debug") else {})})
+        st.session_state["pack_token"] = share_token
+    st.caption(f"🔗 The page URL now carries this exact pack ({len(share_token)}-character token) — share or bookmark it to reopen without rebuilding.")
+
+    # Saved to the pack history on Build and on download; an identical pack is stored once
+    if st.session_state.pop("history_pending", False):
+        pack_history().record(
+            pack_text, snapshot_blob, role_title=st.session_state.get("role_title", ""), category=category,
+            location=st.session_state.get("location") or "", companies=companies, skills=unique_preserve(must + nice))
+
+    # Sticky Copy Bar: one persistent component; strings are re-sent only when their hash changes
+    copy_bar([
+        ("Copy Title(Current)", li_title_current),
+        ("Copy Title(Past)", li_title_past),
+        ("Copy Keywords", li_keywords),
+        ("Copy Companies", companies_or),
+    ], color=THEMES.get(theme_choice, THEMES["Sky"])["button"])
+
+def all_session_states() -> List[Dict[str, Any]]:
+    """User-visible session_state of every session on this server; just this one if the runtime isn't reachable."""
+    # Runtime._session_mgr is private API (checked against Streamlit 1.52 and 1.66); any change lands in the fallback
+    try:
+        from streamlit.runtime import Runtime
+        return [info.session.session_state.filtered_state for info in Runtime.instance()._session_mgr.list_active_sessions()]
+    except Exception:
+        return [st.session_state.to_dict()]
+
+def memory_panel(admin: bool) -> None:
+    """Read-only memory report; the controls that change process-wide state need `admin` (MEMORY_PANEL=1)."""
+    with st.expander("🧮 Memory (debug)", expanded=True):
+        rss = rss_mb()
+        states = all_session_states()
+        st.caption(f"Process RSS: {rss:.0f} MB · {len(states)} session(s)" if rss is not None else f"{len(states)} session(s)")
+
+        cache = ai_pack_cache()
+        st.markdown("**AI role-pack cache**")
+        st.dataframe([cache.stats()], hide_index=True, use_container_width=True)
+        if admin:
+            m1, m2, m3 = st.columns([1, 1, 1])
+            with m1:
+                cap_entries = st.number_input("Max entries (0 = no limit)", min_value=0, value=int(cache.max_entries), step=64, key="mem_cap_entries")
+            with m2:
+                cap_mb = st.number_input("Max MB (0 = no limit)", min_value=0.0, value=cache.max_bytes / (1 << 20), step=8.0, key="mem_cap_mb")
+            with m3:
+                if st.button("Apply caps"):
+                    evicted = cache.resize(int(cap_entries), int(cap_mb * (1 << 20)))
+                    st.success(f"Caps applied; evicted {evicted} entries.")
+                if st.button("Clear AI cache"):
+                    cache.clear()
+
+        st.markdown("**Other process caches**")
+        corpus = jd_corpus()
+        rows = process_caches() + [{"cache": "JD corpus (DF sketch)", "entries": corpus.n_docs, "max_entries": None,
+                                    "bytes": corpus.stats()["bytes"], "hit_rate": None}]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+        st.markdown("**session_state bytes per key, across sessions**")
+        st.dataframe(session_key_sizes(states), hide_index=True, use_container_width=True)
+        st.caption(f"This session: {deep_sizeof(st.session_state.to_dict()):,} bytes")
+
+        if not admin:
+            st.caption("Cache caps, clearing and allocation tracing need MEMORY_PANEL=1 on the server.")
+            return
+        st.markdown("**Top allocators (tracemalloc)**")
+        if st.checkbox("Trace allocations (slows every session while on)", value=False, key="mem_trace"):
+            tracemalloc_start()
+            group_by = st.radio("Group by", ["lineno", "filename"], horizontal=True, key="mem_trace_group")
+            traced, top = tracemalloc_top(20, group_by)
+            st.caption(f"Traced since enabling: {traced / (1 << 20):.1f} MB")
+            st.dataframe(top, hide_index=True, use_container_width=True)
+        else:
+            tracemalloc_stop()
+
+# ============================ Pack History ============================
+with st.expander("🗂️ Pack history"):
+    hist_query = st.text_input("Search past packs", key="history_query",
+                               placeholder="e.g., sre kubernetes · title:payroll · company:stripe · skill:go · category:swe")
+    if st.session_state.get("history_error"):
+        st.warning(st.session_state["history_error"])
+    history = pack_history()
+    hits = history.search(hist_query, limit=int(os.getenv("HISTORY_RESULTS", "20")))
+    if not hits:
+        st.caption("No matching packs." if hist_query else "No packs yet — packs are saved here when you build or download them.")
+    for entry in hits:
+        h1, h2, h3 = st.columns([6, 1, 1])
+        with h1:
+            st.markdown(f"**{entry.role_title or '(untitled)'}** · {entry.category or '—'} · {entry.location or 'any location'}  \n"
+                        f"<span style='opacity:.7'>{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.last_used))} · "
+                        f"built {entry.uses}×</span>", unsafe_allow_html=True)
+        with h2:
+            st.button("Open", key=f"history_open_{entry.key}", on_click=open_from_history, args=(entry.key,))
+        with h3:
+            # The stored pack is read and decompressed only when this button is clicked
+            st.download_button("⬇️", data=lambda key=entry.key: history_pack_text(history, key), key=f"history_dl_{entry.key}",
+                               file_name="sourcing_pack.txt", help="Download the pack text exactly as it was saved")
+
+# ============================ Batch Export ============================
+with st.expander("📦 Batch export (CSV / JSONL / XLSX / zip)"):
+    st.caption("Upload a .jsonl of reqs (one {\"title\", \"location\", \"jd\", …} per line) or of packs from `python -m sourcing.batch`. "
+               "Large batches download in parts; each part is built only when you click it.")
+    batch_file = st.file_uploader("Reqs or packs (.jsonl)", type=["jsonl"], key="batch_export_file")
+    b1, b2, b3 = st.columns([1, 1, 1])
+    with b1:
+        batch_fmt = st.selectbox("Format", list(EXPORT_FORMATS) + ["zip"], key="batch_export_fmt",
+                                 format_func=lambda f: "ZIP (all formats + .txt per pack)" if f == "zip" else f.upper())
+    with b2:
+        batch_variant = st.selectbox("Fields", list(EXPORT_VARIANTS), format_func=EXPORT_VARIANT_LABELS.get, key="batch_export_variant")
+    with b3:
+        part_size = st.number_input("Packs per download", min_value=100, max_value=100000, value=5000, step=500, key="batch_part_size")
+    if batch_file is not None:
+        raw = batch_file.getvalue()
+        n_rows = sum(1 for line in raw.splitlines() if line.strip())
+        n_parts = max(1, -(-n_rows // int(part_size)))
+        part = st.number_input(f"Part (of {n_parts})", min_value=1, max_value=n_parts, value=1, key="batch_part") if n_parts > 1 else 1
+        lo, hi = (part - 1) * int(part_size) + 1, min(part * int(part_size), n_rows)
+        st.caption(f"{n_rows:,} rows → {n_parts} download(s). This part: rows {lo:,}–{hi:,}.")
+        ext = ".zip" if batch_fmt == "zip" else EXPORT_FORMATS[batch_fmt][2]
+        st.download_button(
+            f"Download part {part} ({ext})", file_name=f"sourcing_packs_{batch_variant}-{part:05d}{ext}",
+            mime="application/zip" if batch_fmt == "zip" else EXPORT_FORMATS[batch_fmt][1],
+            data=lambda: export_part(io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8"), part - 1, int(part_size),
+                                     batch_fmt, batch_variant, workers=int(os.getenv("EXPORT_WORKERS", "1"))),
+        )
 
-    # Sticky Copy Bar (with fallback if navigator.clipboard is unavailable)
-    def js_escape(s: str) -> str:
-        try:
-            return json.dumps(s or "")
-        except Exception:
-            return json.dumps("")
-
-    html = []
-    html.append("<div class='sticky'>")
-    html.append("""
-    <script>
-      function fallbackCopy(text){
-        const ta = document.createElement('textarea');
-        ta.value = text; document.body.appendChild(ta); ta.select();
-        try { document.execCommand('copy'); } catch(e) {}
-        document.body.removeChild(ta);
-      }
-      async function copyText(t){
-        try{ if(navigator.clipboard){ await navigator.clipboard.writeText(t); }
-              else { fallbackCopy(t); } }
-        catch(e){ fallbackCopy(t); }
-      }
-    </script>
-    """)
-    html.append("<button class='btn' onclick=\"copyText(" + js_escape(li_title_current) + ")\">Copy Title(Current)</button>")
-    html.append("<button class='btn' onclick=\"copyText(" + js_escape(li_title_past) + ")\">Copy Title(Past)</button>")
-    html.append("<button class='btn' onclick=\"copyText(" + js_escape(li_keywords) + ")\">Copy Keywords</button>")
-    html.append("<button class='btn' onclick=\"copyText(" + js_escape(companies_or) + ")\">Copy Companies</button>")
-    html.append("</div>")
-    st.components.v1.html("".join(html), height=90)
+# Hidden memory panel: ?debug=memory shows the read-only report; MEMORY_PANEL=1 also enables its controls
+MEMORY_ADMIN = os.getenv("MEMORY_PANEL") == "1"
+if MEMORY_ADMIN or qp_get("debug") == "memory":
+    memory_panel(admin=MEMORY_ADMIN)
 
 # Final hint if user hasn't built yet
 if not st.session_state.get("built"):
     st.info("Type a job title (any role), optionally paste a JD in the AI section, pick a bright theme, then click **Build sourcing pack**.")
 
+mark_first_render(_script_start)
@@ -1,155 +1,13 @@
-import re
-from typing import List, Tuple
+from typing import List
 import streamlit as st
 
-st.set_page_config(page_title="AI Sourcing Assistant", layout="wide")
-
-
-# ============================ Role Library (extensible) ============================
-ROLE_LIB = {
-    "swe": {
-        "titles": [
-            "Software Engineer", "Software Developer", "SDE", "SDE I", "SDE II",
-            "Senior Software Engineer", "Full Stack Engineer", "Backend Engineer",
-            "Frontend Engineer", "Platform Engineer"
-        ],
-        "must": ["python", "java", "go", "microservices", "distributed systems"],
-        "nice": ["kubernetes", "docker", "graphql", "gRPC", "aws"],
-    },
-    "ml": {
-        "titles": [
-            "Machine Learning Engineer", "ML Engineer", "ML Scientist",
-            "Applied Scientist", "Data Scientist", "AI Engineer"
-        ],
-        "must": ["python", "pytorch", "tensorflow", "mlops", "model deployment"],
-        "nice": ["sklearn", "xgboost", "feature store", "mlflow", "sagemaker"],
-    },
-    "sre": {
-        "titles": [
-            "Site Reliability Engineer", "SRE", "Reliability Engineer",
-            "DevOps Engineer", "Platform Reliability Engineer"
-        ],
-        "must": ["kubernetes", "terraform", "prometheus", "grafana", "incident response"],
-        "nice": ["golang", "python", "aws", "gcp", "oncall"],
-    },
-}
-
-SMART_NOT = [
-    "intern", "internship", "fellow", "bootcamp", "student", "professor",
-    "sales", "marketing", "hr", "talent acquisition", "recruiter",
-    "customer support", "help desk", "desktop support", "qa tester"
-]
-
-
-# ============================ Helpers ============================
-def unique_preserve(seq: List[str]) -> List[str]:
-    seen, out = set(), []
-    for x in seq:
-        x2 = (x or "").strip()
-        if not x2:
-            continue
-        key = x2.lower()
-        if key not in seen:
-            seen.add(key)
-            out.append(x2)
-    return out
-
-
-def or_group(items: List[str]) -> str:
-    items = [i.strip() for i in items if i and i.strip()]
-    if not items:
-        return ""
-    quoted = []
-    for i in items:
-        if " " in i and not i.startswith('"'):
-            quoted.append('"' + i + '"')
-        else:
-            quoted.append(i)
-    return "(" + " OR ".join(quoted) + ")"
+from sourcing.core import (
+    build_keywords, expand_titles, jd_extract, map_title_to_category, or_group, string_health_report,
+    unique_preserve,
+)
+from sourcing.taxonomy import ROLE_LIB, SMART_NOT
 
-
-def map_title_to_category(title: str) -> str:
-    s = (title or "").lower()
-    # SRE first
-    sre_terms = ["sre", "site reliability", "reliab", "devops", "platform reliability"]
-    if any(t in s for t in sre_terms):
-        return "sre"
-    # ML next
-    ml_terms = [
-        "machine learning", "ml engineer", "applied scientist",
-        "data scientist", "ai engineer", " ml ", "ml-", "ml/"
-    ]
-    if any(t in s for t in ml_terms):
-        return "ml"
-    return "swe"
-
-
-def expand_titles(base_titles: List[str], cat: str) -> List[str]:
-    extra: List[str] = []
-    if cat == "swe":
-        extra = ["Software Eng", "Software Dev", "Full-Stack Engineer",
-                 "Backend Developer", "Frontend Developer"]
-    elif cat == "ml":
-        extra = ["ML Eng", "Machine Learning Specialist",
-                 "Applied ML Engineer", "ML Research Engineer"]
-    elif cat == "sre":
-        extra = ["Reliability Eng", "DevOps SRE", "Platform SRE", "Production Engineer"]
-    return unique_preserve(base_titles + extra)
-
-
-def build_keywords(must: List[str], nice: List[str], nots: List[str]) -> str:
-    core = or_group(unique_preserve(must + nice))
-    if not core:
-        return ""
-    nots2 = unique_preserve(nots)
-    if nots2:
-        return core + " NOT (" + " OR ".join(nots2) + ")"
-    return core
-
-
-def jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
-    """
-    Minimal extractor: count occurrences of known skills from ROLE_LIB across all roles.
-    Returns (must_ex, nice_ex, auto_not).
-    """
-    jd = (jd_text or "").lower()
-    pool = set()
-    for role in ROLE_LIB.values():
-        for s in role["must"] + role["nice"]:
-            pool.add(s.lower())
-    counts = {s: jd.count(s) for s in pool}
-    ranked = [s for s, c in sorted(counts.items(), key=lambda x: x[1], reverse=True) if c > 0]
-    must_ex = ranked[:8]
-    nice_ex = ranked[8:16]
-    auto_not = []
-    for kw in ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]:
-        if kw in jd:
-            auto_not.append(kw)
-    return must_ex, nice_ex, auto_not
-
-
-def string_health_report(s: str) -> List[str]:
-    issues: List[str] = []
-    if not s:
-        return ["Keywords are empty — add must/nice skills."]
-    if len(s) > 900:
-        issues.append("Keywords look long (>900 chars); consider trimming.")
-    if s.count(" OR ") > 80:
-        issues.append("High OR count; remove niche/redundant terms.")
-    # Parentheses balance
-    depth = 0
-    ok = True
-    for ch in s:
-        if ch == "(":
-            depth += 1
-        elif ch == ")":
-            depth -= 1
-            if depth < 0:
-                ok = False
-                break
-    if depth != 0 or not ok:
-        issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
-    return issues
+st.set_page_config(page_title="AI Sourcing Assistant", layout="wide")
 
 
 # ============================ UI Theming ============================
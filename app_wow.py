@@ -1,182 +1,14 @@
-import re
-from typing import List, Tuple
+from typing import List
 import streamlit as st
 
-st.set_page_config(page_title="AI Sourcing Assistant", layout="wide")
-
-
-# ============================ Role Library (extensible) ============================
-ROLE_LIB = {
-    "swe": {
-        "titles": [
-            "Software Engineer", "Software Developer", "SDE", "SDE I", "SDE II",
-            "Senior Software Engineer", "Full Stack Engineer", "Backend Engineer",
-            "Frontend Engineer", "Platform Engineer"
-        ],
-        "must": ["python", "java", "go", "microservices", "distributed systems"],
-        "nice": ["kubernetes", "docker", "graphql", "gRPC", "aws"],
-    },
-    "ml": {
-        "titles": [
-            "Machine Learning Engineer", "ML Engineer", "ML Scientist",
-            "Applied Scientist", "Data Scientist", "AI Engineer"
-        ],
-        "must": ["python", "pytorch", "tensorflow", "mlops", "model deployment"],
-        "nice": ["sklearn", "xgboost", "feature store", "mlflow", "sagemaker"],
-    },
-    "sre": {
-        "titles": [
-            "Site Reliability Engineer", "SRE", "Reliability Engineer",
-            "DevOps Engineer", "Platform Reliability Engineer"
-        ],
-        "must": ["kubernetes", "terraform", "prometheus", "grafana", "incident response"],
-        "nice": ["golang", "python", "aws", "gcp", "oncall"],
-    },
-}
+from sourcing.core import (
+    apply_seniority, build_keywords, expand_titles, jd_extract, map_title_to_category, or_group,
+    string_health_report, unique_preserve,
+)
+from sourcing.render import build_stylesheets, card_header_html, hero_html, hint_html
+from sourcing.taxonomy import ROLE_LIB, SMART_NOT
 
-SMART_NOT = [
-    "intern", "internship", "fellow", "bootcamp", "student", "professor",
-    "sales", "marketing", "hr", "talent acquisition", "recruiter",
-    "customer support", "help desk", "desktop support", "qa tester"
-]
-
-
-# ============================ Helpers ============================
-def unique_preserve(seq: List[str]) -> List[str]:
-    seen, out = set(), []
-    for x in seq:
-        x2 = (x or "").strip()
-        if not x2:
-            continue
-        key = x2.lower()
-        if key not in seen:
-            seen.add(key)
-            out.append(x2)
-    return out
-
-
-def or_group(items: List[str]) -> str:
-    items = [i.strip() for i in items if i and i.strip()]
-    if not items:
-        return ""
-    quoted = []
-    for i in items:
-        if " " in i and not i.startswith('"'):
-            quoted.append('"' + i + '"')
-        else:
-            quoted.append(i)
-    return "(" + " OR ".join(quoted) + ")"
-
-
-def map_title_to_category(title: str) -> str:
-    s = (title or "").lower()
-    # SRE first
-    sre_terms = ["sre", "site reliability", "reliab", "devops", "platform reliability"]
-    if any(t in s for t in sre_terms):
-        return "sre"
-    # ML next
-    ml_terms = [
-        "machine learning", "ml engineer", "applied scientist",
-        "data scientist", "ai engineer", " ml ", "ml-", "ml/"
-    ]
-    if any(t in s for t in ml_terms):
-        return "ml"
-    return "swe"
-
-
-def expand_titles(base_titles: List[str], cat: str) -> List[str]:
-    extra: List[str] = []
-    if cat == "swe":
-        extra = ["Software Eng", "Software Dev", "Full-Stack Engineer",
-                 "Backend Developer", "Frontend Developer"]
-    elif cat == "ml":
-        extra = ["ML Eng", "Machine Learning Specialist",
-                 "Applied ML Engineer", "ML Research Engineer"]
-    elif cat == "sre":
-        extra = ["Reliability Eng", "DevOps SRE", "Platform SRE", "Production Engineer"]
-    return unique_preserve(base_titles + extra)
-
-
-def build_keywords(must: List[str], nice: List[str], nots: List[str]) -> str:
-    core = or_group(unique_preserve(must + nice))
-    if not core:
-        return ""
-    nots2 = unique_preserve(nots)
-    if nots2:
-        return core + " NOT (" + " OR ".join(nots2) + ")"
-    return core
-
-
-def jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
-    """
-    Minimal extractor: count occurrences of known skills from ROLE_LIB across all roles.
-    Returns (must_ex, nice_ex, auto_not).
-    """
-    jd = (jd_text or "").lower()
-    pool = set()
-    for role in ROLE_LIB.values():
-        for s in role["must"] + role["nice"]:
-            pool.add(s.lower())
-    counts = {s: jd.count(s) for s in pool}
-    ranked = [s for s, c in sorted(counts.items(), key=lambda x: x[1], reverse=True) if c > 0]
-    must_ex = ranked[:8]
-    nice_ex = ranked[8:16]
-    auto_not = []
-    for kw in ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]:
-        if kw in jd:
-            auto_not.append(kw)
-    return must_ex, nice_ex, auto_not
-
-
-def string_health_report(s: str) -> List[str]:
-    issues: List[str] = []
-    if not s:
-        return ["Keywords are empty — add must/nice skills."]
-    if len(s) > 900:
-        issues.append("Keywords look long (>900 chars); consider trimming.")
-    if s.count(" OR ") > 80:
-        issues.append("High OR count; remove niche/redundant terms.")
-    # Parentheses balance
-    depth = 0
-    ok = True
-    for ch in s:
-        if ch == "(":
-            depth += 1
-        elif ch == ")":
-            depth -= 1
-            if depth < 0:
-                ok = False
-                break
-    if depth != 0 or not ok:
-        issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
-    return issues
-
-
-def apply_seniority(titles: List[str], level: str) -> List[str]:
-    base = []
-    for t in titles:
-        b = t
-        for tok in ["Senior ", "Staff ", "Principal ", "Lead ", "Sr "]:
-            b = b.replace(tok, "")
-        base.append(b.strip())
-    out: List[str] = []
-    if level == "All":
-        out = titles + base
-    elif level == "Associate":
-        out = ["Junior " + b for b in base] + base
-    elif level == "Mid":
-        out = base
-    elif level == "Senior+":
-        out = ["Senior " + b for b in base] + base
-    else:  # Staff/Principal
-        out = ["Staff " + b for b in base] + ["Principal " + b for b in base] + ["Lead " + b for b in base] + base
-    # dedupe preserve order
-    seen, res = set(), []
-    for x in out:
-        xl = x.lower()
-        if xl not in seen:
-            seen.add(xl); res.append(x)
-    return res[:24]
+st.set_page_config(page_title="AI Sourcing Assistant", layout="wide")
 
 
 # ============================ Theming & Density ============================
@@ -226,10 +58,8 @@ DENSITY = {
 }
 
 
-def inject_css(theme_name: str, density: str) -> None:
-    t = THEMES.get(theme_name, THEMES["Electric"])
-    d = DENSITY.get(density, DENSITY["Cozy"])
-    css = (
+def _theme_css(t: dict, d: dict) -> str:
+    return (
         "<style>"
         ":root {"
         "--grad: " + t["grad"] + ";"
@@ -247,20 +77,20 @@ def inject_css(theme_name: str, density: str) -> None:
         "}"
         ".stApp, [data-testid='stAppViewContainer'] {background: var(--bg); color: var(--text);}"
         "[data-testid='stHeader'] {background: transparent;}"
-        /* Inputs */
+        # Inputs
         "input[type='text'], textarea {background: var(--card) !important; color: var(--text) !important; "
         "border: 1px solid rgba(255,255,255,.07) !important; border-radius: var(--radius) !important;}"
         "input[type='text']:focus, textarea:focus {outline: none !important; border-color: var(--ring) !important; "
         "box-shadow: 0 0 0 3px rgba(99,102,241,.18) !important;}"
-        /* Buttons */
+        # Buttons
         ".stButton>button, .stDownloadButton>button {"
         "background: var(--btn); color: #0B1021; font-weight: 700; border: none; "
         "padding: var(--btnpad); border-radius: 999px; box-shadow: 0 8px 24px rgba(0,0,0,.25);}"
         ".stButton>button:hover, .stDownloadButton>button:hover {filter: brightness(1.05);}"
         ".stButton>button:focus {outline: none; box-shadow: 0 0 0 3px rgba(99,102,241,.25);}"
-        /* Code blocks */
+        # Code blocks
         "pre, code {font-size: var(--codefs) !important;}"
-        /* Cards & Grid */
+        # Cards & Grid
         ".grid {display: grid; gap: var(--gap); grid-template-columns: repeat(12, 1fr);}"
         ".card {grid-column: span 6; background: var(--card); border: 1px solid rgba(255,255,255,.06); "
         "border-radius: var(--radius); padding: var(--pad); box-shadow: 0 10px 30px rgba(0,0,0,.35);}"
@@ -276,31 +106,29 @@ def inject_css(theme_name: str, density: str) -> None:
         ".pill {display:inline-block;padding:4px 10px;border-radius:999px;background: var(--grad); color:#0b0f19; font-weight:700; font-size:12px;}"
         "</style>"
     )
-    st.markdown(css, unsafe_allow_html=True)
+
+
+@st.cache_resource(show_spinner=False)
+def theme_stylesheets() -> dict:
+    # Every theme × density sheet, built once per process
+    return build_stylesheets(_theme_css, THEMES, DENSITY)
+
+
+def inject_css(theme_name: str, density: str) -> None:
+    sheets = theme_stylesheets()
+    key = (theme_name if theme_name in THEMES else "Electric", density if density in DENSITY else "Cozy")
+    st.markdown(sheets[key], unsafe_allow_html=True)
 
 
 def hero(job_title: str, category: str, location: str) -> None:
-    st.markdown("<div class='hero'>", unsafe_allow_html=True)
-    st.markdown("<h1>AI Sourcing Assistant</h1>", unsafe_allow_html=True)
-    chips = []
-    if job_title:
-        chips.append("<span class='chip'>🎯 " + job_title + "</span>")
-    if category:
-        chips.append("<span class='chip'>🧠 " + category.upper() + "</span>")
-    if location:
-        chips.append("<span class='chip'>📍 " + location + "</span>")
-    if chips:
-        st.markdown("<div class='chips'>" + "".join(chips) + "</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(hero_html(job_title or "", category or "", location or ""), unsafe_allow_html=True)
 
 
 def code_card(title: str, text: str, hint: str = "") -> None:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<h3 style='margin:0 0 6px 0;font-size:14px;color:var(--muted);'>" + title + "</h3>", unsafe_allow_html=True)
+    st.markdown(card_header_html(title), unsafe_allow_html=True)
     st.code(text or "", language="text")
     if hint:
-        st.markdown("<div class='hint'>" + hint + "</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown(hint_html(hint), unsafe_allow_html=True)
 
 
 # ============================ Controls ============================
@@ -416,12 +244,10 @@ if st.session_state.get("built"):
     # Boolean Pack — pretty cards
     st.subheader("🎯 Boolean Pack (LinkedIn fields)")
     st.caption("Each block is copyable — paste into the matching LinkedIn field.")
-    st.markdown("<div class='grid'>", unsafe_allow_html=True)
     code_card("Title (Current) • People → Title (Current)", li_title_current)
     code_card("Title (Past) • People → Title (Past)", li_title_past)
     code_card("Keywords (Boolean) • People → Keywords", li_keywords)
     code_card("Skills (CSV) • People → Skills", skills_all_csv)
-    st.markdown("</div>", unsafe_allow_html=True)
 
     # Export
     st.subheader("⬇️ Export")
@@ -0,0 +1 @@
+"""Custom Streamlit components (static frontends, no build step)."""
@@ -0,0 +1,35 @@
+# components/copy_bar — sticky "Copy …" bar as a persistent custom component
+#
+# The iframe is declared once and keeps its identity across reruns (fixed key),
+# so rapid edits don't recreate it. Python sends the strings only when their
+# hash changes; otherwise it sends just the hash. If the frontend doesn't hold
+# the strings for that hash (e.g. it was remounted), it asks for them by
+# setting the component value to {"need": hash, "n": nonce}.
+
+import hashlib
+import json
+import os
+from typing import List, Tuple
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+_FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("copy_bar", path=_FRONTEND)
+
+
+def payload_hash(items: List[Tuple[str, str]]) -> str:
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def copy_bar(items: List[Tuple[str, str]], color: str = "#2563EB", key: str = "copy_bar") -> None:
+    """items: (button label, text to copy) pairs."""
+    digest = payload_hash(items)
+    sent_key, handled_key = f"{key}__sent", f"{key}__handled"
+    request = st.session_state.get(key)
+    need = isinstance(request, dict) and request.get("need") == digest and request.get("n") != st.session_state.get(handled_key)
+    resend = st.session_state.get(sent_key) != digest or need
+    if need:
+        st.session_state[handled_key] = request.get("n")
+    _component(v=digest, items=items if resend else None, color=color, key=key, default=None)
+    st.session_state[sent_key] = digest
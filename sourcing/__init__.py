@@ -0,0 +1 @@
+"""Streamlit-free building blocks shared by the sourcing apps and batch tools."""
@@ -0,0 +1,220 @@
+# sourcing/batch.py — regenerate packs for a whole req backlog on a process pool
+#
+# build_pack() runs the app's Build flow without Streamlit: heuristic (or
+# cached AI) seeds, jd_extract merge, seniority, keywords, health and the
+# Companies string, all through a fresh PackGraph. Once AI packs are cached
+# that work is pure CPU, so run_batch() spreads it over worker processes:
+#
+# - reqs are sent in chunks (one task = `chunksize` small dicts), so IPC and
+#   scheduling cost is paid per chunk, not per req;
+# - each worker imports the taxonomy and warms the company index once, in
+#   the pool initializer, so tasks never pickle ROLE_LIB/COMPANY_SETS/SYNONYMS;
+# - at most a few chunks per worker are in flight and results are yielded in
+#   input order, so output streams with bounded memory however long the input.
+#
+#   python -m sourcing.batch reqs.jsonl -o packs.jsonl [--workers 8] [--chunksize 32]
+#   python -m sourcing.batch reqs.jsonl --scale      # throughput at 1, 2, 4, … workers
+#
+# Each input line is a req: {"id", "title", "location", "level", "env", "size",
+# "metro", "jd", "ai" (cached role pack), "ic_only", "two_tier", "min_must",
+# "policy", "max_company_chars", "extra_not", "env_size_as_keywords"}; only
+# "title" is required.
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .companies import COMPANY_INDEX, segment_order
+from .core import (
+    IC_ONLY_NOT, env_size_qualifiers, expand_titles, jd_extract, map_title_to_category, unique_preserve,
+)
+from .entities import fit_or_group
+from .pack import EXPORT_FIELDS, PACK_NODES, PackGraph
+from .taxonomy import METRO_COMPANIES, ROLE_LIB, SMART_NOT
+
+PACK_FIELDS = [name for name, _, _ in PACK_NODES]
+PACK_INPUT_FIELDS = [f for f in EXPORT_FIELDS if f not in PACK_FIELDS]  # role_title, location, ai_notes
+Progress = Callable[[int, float], None]
+
+
+def _level_for(title: str, level: str) -> str:
+    # Same title heuristic the app applies after Build
+    t = (title or "").lower()
+    if any(w in t for w in ["staff", "principal"]):
+        return "Staff/Principal"
+    if any(w in t for w in ["senior", "sr "]):
+        return "Senior+"
+    return level or "All"
+
+
+def build_pack(req: Dict[str, Any]) -> Dict[str, Any]:
+    """One req -> {"id", "category", role_title, location, ai_notes, <PACK_NODES fields>}, as the app would build it."""
+    title = (req.get("title") or "").strip()
+    metro = req.get("metro") or "Any"
+    ai = req.get("ai") or {}
+    category = map_title_to_category(title)
+    R = ROLE_LIB[category]
+    titles = expand_titles(R["titles"], category)
+    must, nice, nots, companies_seed = list(R["must"]), list(R["nice"]), list(SMART_NOT), []
+    if ai:
+        category = ai.get("role_category") or category
+        titles = unique_preserve((ai.get("titles") or []) + titles)
+        must = unique_preserve(ai.get("must_have") or must)
+        nice = unique_preserve(ai.get("nice_to_have") or nice)
+        nots = unique_preserve((ai.get("negatives") or []) + nots)
+        companies_seed = unique_preserve((ai.get("target_companies") or []) + METRO_COMPANIES.get(metro, []))
+    if req.get("jd"):
+        m_ex, n_ex, not_ex = jd_extract(req["jd"])
+        must, nice, nots = unique_preserve(must + m_ex), unique_preserve(nice + n_ex), unique_preserve(nots + not_ex)
+
+    groups = segment_order(category)[:3]
+    company_source = [groups, metro, companies_seed, req.get("policy") or "alias"]
+    companies = COMPANY_INDEX.companies(*company_source)
+    if req.get("max_company_chars"):
+        companies, dropped = fit_or_group(companies, int(req["max_company_chars"]))
+        if dropped:
+            company_source = None
+    extra_not = [t.strip() for t in (req.get("extra_not") or "").split(",") if t.strip()]
+    all_not = unique_preserve(nots + extra_not + (IC_ONLY_NOT if req.get("ic_only") else []))
+    qual = env_size_qualifiers(req.get("env") or "Any", req.get("size") or "Any") if req.get("env_size_as_keywords") else []
+
+    graph = PackGraph()
+    graph.set(
+        raw_titles=titles, level=_level_for(title, req.get("level") or "All"),
+        must=must, nice=nice, nots=all_not, qualifiers=qual, two_tier=bool(req.get("two_tier")),
+        min_must=int(req.get("min_must") or 2), companies=companies, company_source=company_source,
+        role_title=title, location=req.get("location") or "", ai_notes=ai.get("notes") or "",
+    )
+    out: Dict[str, Any] = {"id": req.get("id"), "category": category}
+    out.update((f, graph.get(f)) for f in PACK_INPUT_FIELDS + PACK_FIELDS)
+    return out
+
+
+def _init_worker(policies: Sequence[str]) -> None:
+    # Runs once per worker process. The taxonomy arrived with this module's
+    # import; the shared company fragments (and safe_quote's cache) are warmed
+    # here so the first chunk doesn't pay for them.
+    for policy in policies:
+        COMPANY_INDEX.warm(policy)
+
+
+def _run_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for req in chunk:
+        try:
+            out.append(build_pack(req))
+        except Exception as e:  # one bad req must not sink its chunk
+            out.append({"id": req.get("id"), "error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+def _chunks(reqs: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    buf: List[Dict[str, Any]] = []
+    for r in reqs:
+        buf.append(r)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def run_batch(reqs: Iterable[Dict[str, Any]], workers: Optional[int] = None, chunksize: int = 32,
+              progress: Optional[Progress] = None, policies: Sequence[str] = ("alias",)) -> Iterator[Dict[str, Any]]:
+    """Packs for `reqs`, in input order, streamed. workers=1 runs inline (no pool)."""
+    workers = workers or os.cpu_count() or 1
+    t0, done = time.perf_counter(), 0
+    if workers <= 1:
+        _init_worker(policies)
+        for chunk in _chunks(reqs, chunksize):
+            for res in _run_chunk(chunk):
+                yield res
+            done += len(chunk)
+            if progress:
+                progress(done, time.perf_counter() - t0)
+        return
+    window = workers * 4  # chunks in flight: enough to keep every worker busy, bounded for memory
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tuple(policies),)) as ex:
+        pending: Deque[Future] = deque()
+
+        def drain_head() -> Iterator[Dict[str, Any]]:
+            nonlocal done
+            results = pending.popleft().result()
+            done += len(results)
+            if progress:
+                progress(done, time.perf_counter() - t0)
+            return iter(results)
+
+        for chunk in _chunks(reqs, chunksize):
+            pending.append(ex.submit(_run_chunk, chunk))
+            if len(pending) >= window:
+                yield from drain_head()
+        while pending:
+            yield from drain_head()
+
+
+def iter_reqs(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(x for x in f if x.strip()):
+            req = json.loads(line)
+            req.setdefault("id", i)
+            yield req
+
+
+def _stderr_progress(every_s: float = 1.0) -> Progress:
+    last = [0.0]
+
+    def report(done: int, elapsed: float) -> None:
+        if elapsed - last[0] >= every_s:
+            last[0] = elapsed
+            print(f"\r{done} packs, {done / elapsed:.0f}/s", end="", file=sys.stderr, flush=True)
+    return report
+
+
+def scale(reqs: List[Dict[str, Any]], max_workers: int, chunksize: int) -> List[Tuple[int, float, float]]:
+    """(workers, packs/s, speedup vs 1 worker) for 1, 2, 4, … up to max_workers."""
+    counts = [1 << i for i in range(max_workers.bit_length()) if 1 << i < max_workers] + [max_workers]
+    rows: List[Tuple[int, float, float]] = []
+    for n in counts:
+        t0 = time.perf_counter()
+        for _ in run_batch(reqs, workers=n, chunksize=chunksize):
+            pass
+        rate = len(reqs) / (time.perf_counter() - t0)
+        rows.append((n, rate, rate / rows[0][1] if rows else 1.0))
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Regenerate sourcing packs for a req backlog on a process pool.")
+    ap.add_argument("path", help="JSONL of reqs")
+    ap.add_argument("-o", "--out", help="JSONL output (default: stdout)")
+    ap.add_argument("--workers", type=int, default=None, help="default: CPU count; 1 = no pool")
+    ap.add_argument("--chunksize", type=int, default=32)
+    ap.add_argument("--scale", action="store_true", help="report throughput at 1, 2, 4, … workers instead of writing packs")
+    args = ap.parse_args(argv)
+    if args.scale:
+        reqs = list(iter_reqs(args.path))
+        for n, rate, speedup in scale(reqs, args.workers or os.cpu_count() or 1, args.chunksize):
+            print(f"{n:3d} workers  {rate:9.0f} packs/s  x{speedup:.2f}")
+        return 0
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    t0, n = time.perf_counter(), 0
+    try:
+        for pack in run_batch(iter_reqs(args.path), args.workers, args.chunksize, _stderr_progress()):
+            out.write(json.dumps(pack) + "\n")
+            n += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    dt = time.perf_counter() - t0
+    print(f"\r{n} packs in {dt:.2f}s ({n / dt if dt else 0:.0f}/s)".ljust(40), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
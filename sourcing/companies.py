@@ -0,0 +1,116 @@
+# sourcing/companies.py — process-shared company lists per (segments, metro)
+#
+# The seed part of the company list (COMPANY_SETS for the selected segments,
+# then METRO_COMPANIES[metro]) is the same for every user who picks the same
+# segments and metro. CompanyIndex dedupes and pre-quotes it once, keeps it in
+# a bounded LRU, and merges only the per-user additions (AI seeds, custom
+# entries) at request time. Names go through entity resolution with the given
+# policy (see entities.py; "exact" leaves them untouched). Results match
+# unique_preserve(resolve(base + extra)) and or_group(...) exactly.
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+from .core import safe_quote, unique_preserve
+from .entities import ENTITIES, EntityIndex
+from .taxonomy import COMPANY_SETS, METRO_COMPANIES, ROLE_TO_GROUPS
+
+
+def segment_order(category: str) -> List[str]:
+    """Company segments offered for a role category, best first; ["faang_plus"] for unknown (e.g. AI-made) categories."""
+    return ROLE_TO_GROUPS.get(category or "swe", ["faang_plus"])
+
+
+class CompanyFragment(NamedTuple):
+    names: Tuple[str, ...]
+    keys: FrozenSet[str]       # lowercase names, for merging extras
+    quoted: Tuple[str, ...]
+    qkeys: FrozenSet[str]      # lowercase quoted tokens (or_group dedupes on these)
+    or_body: str               # " OR ".join(quoted)
+
+
+def build_fragment(names: Sequence[str]) -> CompanyFragment:
+    names = unique_preserve(list(names))
+    quoted = unique_preserve([q for q in (safe_quote(n) for n in names) if q])
+    return CompanyFragment(tuple(names), frozenset(n.lower() for n in names), tuple(quoted),
+                           frozenset(q.lower() for q in quoted), " OR ".join(quoted))
+
+
+class CompanyIndex:
+    def __init__(self, maxsize: int = 256, company_sets: Optional[Dict[str, List[str]]] = None,
+                 metro_companies: Optional[Dict[str, List[str]]] = None, entities: Optional[EntityIndex] = None) -> None:
+        self.maxsize = maxsize
+        self.company_sets = COMPANY_SETS if company_sets is None else company_sets
+        self.metro_companies = METRO_COMPANIES if metro_companies is None else metro_companies
+        self.entities = ENTITIES if entities is None else entities
+        self._cache: "OrderedDict[Tuple[Tuple[str, ...], str, str], CompanyFragment]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def base(self, segments: Sequence[str], metro: str, policy: str = "exact") -> CompanyFragment:
+        key = (tuple(segments), metro or "Any", policy)
+        with self._lock:
+            frag = self._cache.get(key)
+            if frag is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return frag
+            self.misses += 1
+        names: List[str] = []
+        for g in key[0]:
+            names.extend(self.company_sets.get(g, []))
+        names.extend(self.metro_companies.get(key[1], []))
+        frag = build_fragment(self.entities.resolve(names, policy))
+        with self._lock:
+            self._cache[key] = frag
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return frag
+
+    def companies(self, segments: Sequence[str], metro: str, extra: Sequence[str] = (), policy: str = "exact") -> List[str]:
+        """unique_preserve(resolve(segment companies + metro companies + extra))."""
+        frag = self.base(segments, metro, policy)
+        out, seen = list(frag.names), set()
+        for x in self.entities.resolve(extra, policy):
+            x2 = (x or "").strip()
+            k = x2.lower()
+            if x2 and k not in frag.keys and k not in seen:
+                seen.add(k)
+                out.append(x2)
+        return out
+
+    def companies_or(self, segments: Sequence[str], metro: str, extra: Sequence[str] = (), policy: str = "exact") -> str:
+        """or_group(companies(...)), reusing the pre-quoted base fragment."""
+        frag = self.base(segments, metro, policy)
+        add, seen = [], set()
+        for x in self.entities.resolve(extra, policy):
+            x2 = (x or "").strip()
+            if not x2 or x2.lower() in frag.keys:
+                continue
+            q = safe_quote(x2)
+            k = q.lower()
+            if q and k not in frag.qkeys and k not in seen:
+                seen.add(k)
+                add.append(q)
+        body = " OR ".join(([frag.or_body] if frag.or_body else []) + add)
+        return f"({body})" if body else ""
+
+    def warm(self, policy: str = "exact") -> int:
+        """Precompute the default selections (first three segments of each role) for every metro."""
+        n = 0
+        for groups in ROLE_TO_GROUPS.values():
+            for metro in self.metro_companies:
+                self.base(groups[:3], metro, policy)
+                n += 1
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"entries": len(self._cache), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+COMPANY_INDEX = CompanyIndex()
@@ -0,0 +1,147 @@
+# sourcing/company_search.py — company → segment index and prefix search
+#
+# Built from COMPANY_SETS, METRO_COMPANIES and an optional CSV
+# (company,segments with ";"-separated segments; default data/company_segments.csv,
+# override with COMPANY_DATA_FILE). Lookups go through entity resolution, so
+# "Facebook" finds Meta's segments.
+#
+# Prefix search uses sorted arrays of normalized keys (full name plus each
+# word suffix, so "cloud" finds "Google Cloud") and bisect. That behaves
+# like a trie lookup, O(log n + k), without per-node objects, and stays well
+# under 5 ms at tens of thousands of names. Curated taxonomy companies have
+# their own small array, searched first, so "cl" offers Cloudflare before
+# a long alphabetical run of data-file names.
+#
+#   python -m sourcing.company_search suggest --category swe "Two Sigma, Robinhood, Plaid"
+#   python -m sourcing.company_search complete goo
+
+import argparse
+import csv
+import os
+import sys
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .companies import segment_order
+from .entities import ENTITIES, normalize_company
+from .taxonomy import COMPANY_SETS, METRO_COMPANIES
+
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "company_segments.csv")
+
+
+def load_company_file(path: str) -> Dict[str, List[str]]:
+    out: Dict[str, List[str]] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("company") or "").strip()
+            if name:
+                out.setdefault(name, []).extend(s.strip() for s in (row.get("segments") or "").split(";") if s.strip())
+    return out
+
+
+class CompanySegmentIndex:
+    def __init__(self, extra: Optional[Dict[str, List[str]]] = None) -> None:
+        self._segments: Dict[str, Set[str]] = {}   # entity key -> segments (and "metro:<name>" tags)
+        self._display: Dict[str, str] = {}         # entity key -> display name
+        for seg, names in COMPANY_SETS.items():
+            for n in names:
+                self._add(n, seg)
+        for metro, names in METRO_COMPANIES.items():
+            for n in names:
+                self._add(n, "metro:" + metro)
+        for n, segs in (extra or {}).items():
+            self._add(n)
+            for seg in segs:
+                self._add(n, seg)
+        curated = {self.key(n) for names in list(COMPANY_SETS.values()) + list(METRO_COMPANIES.values()) for n in names}
+        self._curated = self._prefix_array(k for k in self._display if k in curated)
+        self._rest = self._prefix_array(k for k in self._display if k not in curated)
+
+    @staticmethod
+    def _prefix_array(entity_keys) -> Tuple[List[str], List[str]]:
+        pairs: List[Tuple[str, str]] = []
+        for k in entity_keys:
+            words = k.split()
+            for i in range(len(words)):
+                pairs.append((" ".join(words[i:]), k))
+        pairs.sort()
+        return [p for p, _ in pairs], [k for _, k in pairs]
+
+    @staticmethod
+    def key(name: str) -> str:
+        return normalize_company(ENTITIES.canonical(name))
+
+    def _add(self, name: str, segment: Optional[str] = None) -> None:
+        k = self.key(name)
+        if not k:
+            return
+        self._display.setdefault(k, ENTITIES.canonical(name))
+        segs = self._segments.setdefault(k, set())
+        if segment:
+            segs.add(segment)
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    def segments_for(self, name: str) -> Set[str]:
+        return {s for s in self._segments.get(self.key(name), set()) if not s.startswith("metro:")}
+
+    def complete(self, prefix: str, limit: int = 10, scan: int = 400) -> List[str]:
+        """Companies whose name (or a later word in it) starts with `prefix`; best-known first."""
+        p = normalize_company(prefix)
+        if not p:
+            return []
+        out: List[str] = []
+        for keys, vals in (self._curated, self._rest):
+            i, found = bisect_left(keys, p), {}
+            while i < len(keys) and len(found) < scan and keys[i].startswith(p):
+                found.setdefault(vals[i], keys[i] == vals[i])  # True when the full name matched
+                i += 1
+            ranked = sorted(found, key=lambda k: (not found[k], -len(self._segments.get(k, ())), k))
+            out.extend(self._display[k] for k in ranked if self._display[k] not in out)
+            if len(out) >= limit:
+                break
+        return out[:limit]
+
+    def suggest_segments(self, companies: Sequence[str], category: str = "swe",
+                         exclude: Sequence[str] = ()) -> List[Tuple[str, int, List[str]]]:
+        """Rank the category's segments (the app's Segments options) by overlap with `companies`: [(segment, hits, matched names)]."""
+        order = segment_order(category)
+        hits: Dict[str, List[str]] = {}
+        for c in companies:
+            for seg in self.segments_for(c):
+                if seg in order and seg not in exclude:
+                    hits.setdefault(seg, []).append(c.strip())
+        ranked = sorted(hits.items(), key=lambda kv: (-len(kv[1]), order.index(kv[0])))
+        return [(seg, len(names), names) for seg, names in ranked]
+
+
+def build_index(path: Optional[str] = None) -> CompanySegmentIndex:
+    path = path or os.getenv("COMPANY_DATA_FILE", DEFAULT_DATA_FILE)
+    extra = load_company_file(path) if path and os.path.exists(path) else {}
+    return CompanySegmentIndex(extra)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Company segment suggestions and autocomplete.")
+    ap.add_argument("--data", default=None, help="company,segments CSV (default: COMPANY_DATA_FILE or data/company_segments.csv)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s1 = sub.add_parser("suggest")
+    s1.add_argument("--category", default="swe")
+    s1.add_argument("companies", help="comma-separated")
+    s2 = sub.add_parser("complete")
+    s2.add_argument("prefix")
+    s2.add_argument("--limit", type=int, default=10)
+    args = ap.parse_args(argv)
+    idx = build_index(args.data)
+    if args.cmd == "suggest":
+        for seg, n, names in idx.suggest_segments([c for c in args.companies.split(",") if c.strip()], args.category):
+            print(f"{seg}\t{n}\t{', '.join(names)}")
+    else:
+        for name in idx.complete(args.prefix, args.limit):
+            print(name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# sourcing/core.py — string builders and heuristics behind the Boolean pack
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+from .taxonomy import ROLE_LIB, SYNONYMS
+
+# ============================ Helpers ============================
+def unique_preserve(seq: List[str]) -> List[str]:
+    seen, out = set(), []
+    for x in seq:
+        if x:
+            x = x.strip()
+            if x:
+                key = x.lower()
+                if key not in seen:
+                    seen.add(key)
+                    out.append(x)
+    return out
+
+def canonicalize(tokens: List[str]) -> List[str]:
+    out, seen = [], set()
+    synonym = SYNONYMS.get
+    for t in tokens:
+        t = t or ""
+        c = synonym(t.lower(), t).strip()
+        k = c.lower()
+        if k and k not in seen:
+            seen.add(k)
+            out.append(c)
+    return out
+
+def normalize_quotes(s: str) -> str:
+    return (s or "").replace("“", '"').replace("”", '"').replace("’", "'").replace("‘", "'")
+
+class TermCache(dict):
+    """term -> derived value, computed on first use; cleared wholesale at `maxsize`.
+
+    A hit is a plain dict lookup with no lru bookkeeping. Terms repeat across
+    fields, reruns and variants, so the per-term work in or_group is almost
+    always a hit.
+    """
+
+    __slots__ = ("fn", "maxsize", "misses")
+
+    def __init__(self, fn, maxsize: int = 8192) -> None:
+        super().__init__()
+        self.fn = fn
+        self.maxsize = maxsize
+        self.misses = 0
+
+    def __missing__(self, key):
+        if len(self) >= self.maxsize:
+            self.clear()
+        self.misses += 1
+        value = self[key] = self.fn(key)
+        return value
+
+_NEEDS_QUOTES = re.compile(r"\s|\(|\)|-")
+
+def _quote_term(token: str) -> Tuple[str, str]:
+    """(Boolean-safe token, its lowercase dedup key); ("", "") for a blank term."""
+    t = normalize_quotes((token or "").strip())
+    if not t:
+        return "", ""
+    t = t.replace('"', r'\"')  # escape embedded quotes
+    if _NEEDS_QUOTES.search(t):
+        t = f'"{t}"'
+    return t, t.lower()
+
+_QUOTED = TermCache(_quote_term)
+_SAFE = TermCache(lambda token: _QUOTED[token][0])
+TERM_CACHES = {"quoted terms": _QUOTED, "safe_quote": _SAFE}
+
+# token -> Boolean-safe token; a hit is one C-level dict lookup, as cheap as the lru_cache it replaced
+safe_quote = _SAFE.__getitem__
+
+def or_group(items: List[str]) -> str:
+    seen, toks = {""}, []
+    for tok, key in map(_QUOTED.__getitem__, items):
+        if key not in seen:
+            seen.add(key)
+            toks.append(tok)
+    return f"({ ' OR '.join(toks) })" if toks else ""
+
+not_group = or_group  # same grouping; kept as its own name for readability at call sites
+
+_SRE_HINTS = ("sre", "site reliability", "reliab", "devops", "platform reliability", "production engineer")
+_ML_HINTS = ("machine learning", "ml engineer", "applied scientist", "data scientist", "ai engineer",
+             "genai", "llm", "deep learning", " ml ", "ml-", "ml/")
+
+def map_title_to_category(title: str) -> str:
+    s = (title or "").lower()
+    for t in _SRE_HINTS:
+        if t in s:
+            return "sre"
+    for t in _ML_HINTS:
+        if t in s:
+            return "ml"
+    return "swe"
+
+_TITLE_EXTRAS = {
+    "swe": ["Software Eng", "Software Dev", "Full-Stack Engineer", "Backend Developer", "Frontend Developer"],
+    "ml": ["ML Eng", "Machine Learning Specialist", "Applied ML Engineer", "ML Research Engineer"],
+    "sre": ["Reliability Eng", "DevOps SRE", "Platform SRE", "Production Engineer"],
+}
+
+def expand_titles(base_titles: List[str], cat: str) -> List[str]:
+    return unique_preserve(base_titles + _TITLE_EXTRAS.get(cat, []))
+
+# or_group dedupes on the quoted form, which merges everything unique_preserve would, so the
+# builders below hand it canonicalized lists directly
+def build_keywords(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None) -> str:
+    core = or_group(canonicalize(must) + canonicalize(nice) + canonicalize(qualifiers or []))
+    if not core:
+        return ""
+    ng = not_group(canonicalize(nots))
+    return f"{core} NOT {ng}" if ng else core
+
+def build_keywords_two_tier(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None, min_must: int = 2) -> str:
+    must = canonicalize(must)
+    anchors, rest = must[:max(0, min_must)], must[max(0, min_must):]
+    left = " AND ".join(or_group([a]) for a in anchors) if anchors else ""
+    right = or_group(rest + canonicalize(nice) + canonicalize(qualifiers or []))
+    core = " AND ".join([p for p in [left, right] if p])
+    ng = not_group(canonicalize(nots))
+    return f"{core} NOT {ng}" if ng else core
+
+AUTO_NOT_TERMS = ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]
+
+_WORD_CHAR = re.compile(r"\w")
+
+def _bounded(term: str) -> "re.Pattern[str]":
+    """Same matches as rf"\b{re.escape(term)}\b", with the literal first.
+
+    A pattern that starts with \b gets no literal-prefix scan and tries every position;
+    checking both boundaries after the literal (a fixed-width lookbehind for the left one)
+    lets the regex engine jump between occurrences instead, ~25x faster on a JD.
+    """
+    lit = re.escape(term)
+    head = _WORD_CHAR.match(term[0]) is not None
+    tail = _WORD_CHAR.match(term[-1]) is not None
+    left = rf"(?<!\w{lit})" if head else rf"(?<=\w{lit})"
+    right = r"(?!\w)" if tail else r"(?=\w)"
+    return re.compile(lit + left + right)
+
+@lru_cache(maxsize=1)
+def _jd_matchers() -> Tuple[Tuple, Tuple]:
+    """ROLE_LIB skills and auto-NOT terms with their matchers, built once per process.
+
+    Multi-word, "/" and "-" skills are counted as plain substrings, the rest as whole words.
+    """
+    pool = {s.lower() for role in ROLE_LIB.values() for s in (role["must"] + role["nice"])}
+    skills = tuple((t, None if (" " in t or "/" in t or "-" in t) else _bounded(t).findall)
+                   for t in pool)  # set order, as before, so ties rank the same
+    nots = tuple((kw, _bounded(kw).search) for kw in AUTO_NOT_TERMS)
+    return skills, nots
+
+def jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
+    jd = normalize_quotes((jd_text or "").lower())
+    skills, nots = _jd_matchers()
+    hits = []
+    for term, findall in skills:
+        n = jd.count(term) if findall is None else len(findall(jd))
+        if n:
+            hits.append((term, n))
+    hits.sort(key=lambda h: h[1], reverse=True)
+    ranked = [t for t, _ in hits]
+    auto_not = [kw for kw, search in nots if search(jd)]
+    return ranked[:8], ranked[8:16], auto_not
+
+_QUOTED_SPAN = re.compile(r'"[^"]*"')
+_NOT_PAREN = re.compile(r"[^()]+")
+
+def string_health_report(s: str) -> List[str]:
+    issues: List[str] = []
+    if not s:
+        return ["Keywords are empty — add must/nice skills."]
+    if len(s) > 900:
+        issues.append("Keywords look long (>900 chars); consider trimming.")
+    if s.count(" OR ") > 80:
+        issues.append("High OR count; remove niche/redundant terms.")
+    unquoted = _QUOTED_SPAN.sub("", s) if '"' in s else s
+    if "(" in unquoted or ")" in unquoted:
+        # Balanced iff deleting "()" pairs until none are left empties the paren sequence
+        parens = _NOT_PAREN.sub("", unquoted)
+        while "()" in parens:
+            parens = parens.replace("()", "")
+        if parens:
+            issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
+    return issues
+
+def string_health_grade(s: str) -> str:
+    if not s:
+        return "F"
+    score = 100
+    if len(s) > 900:
+        score -= 25
+    orc = s.count(" OR ")
+    if orc > 80:
+        score -= 25
+    if orc > 40:
+        score -= 15
+    if any("Unbalanced parentheses" in x for x in string_health_report(s)):
+        score -= 25
+    return "A" if score >= 90 else "B" if score >= 80 else "C" if score >= 70 else "D" if score >= 60 else "E" if score >= 50 else "F"
+
+def apply_seniority(titles: List[str], level: str) -> List[str]:
+    base = []
+    for t in titles:
+        b = t
+        for tok in ["Senior ", "Staff ", "Principal ", "Lead ", "Sr "]:
+            b = b.replace(tok, "")
+        base.append(b.strip())
+    out: List[str] = []
+    if level == "All":
+        out = titles + base
+    elif level == "Associate":
+        out = ["Junior " + b for b in base] + base
+    elif level == "Mid":
+        out = base
+    elif level == "Senior+":
+        out = ["Senior " + b for b in base] + base
+    else:
+        out = ["Staff " + b for b in base] + ["Principal " + b for b in base] + ["Lead " + b for b in base] + base
+    seen, res = set(), []
+    for x in out:
+        xl = x.lower()
+        if xl not in seen:
+            seen.add(xl)
+            res.append(x)
+    return res[:24]
+
+IC_ONLY_NOT = ["manager", "director", "head of"]
+
+def env_size_qualifiers(env: str, size: str) -> List[str]:
+    qual: List[str] = []
+    if env == "Remote":
+        qual.append("remote")
+    elif env == "Hybrid":
+        qual.append("hybrid")
+    elif env == "On-site":
+        qual.append("on-site")
+    if size == "Startup":
+        qual.append("startup")
+    elif size == "Growth":
+        qual.append("scale-up")
+    elif size == "Enterprise":
+        qual.append("enterprise")
+    qual += ["highly scalable", "high throughput"]
+    return qual
@@ -0,0 +1,260 @@
+# sourcing/docfreq.py — persistent, bounded document-frequency store for IDF
+#
+# A count-min sketch (depth rows × width uint32 counters, conservative update)
+# holds "how many JDs contain this term" for an unbounded vocabulary in a
+# fixed amount of memory: 4 × 2^18 counters = 4 MB whatever the corpus size.
+# Estimates never undercount; with conservative update the overcount stays
+# small for the rare terms IDF cares about. Each JD is fingerprinted so the
+# same paste seen on every rerun is counted once.
+#
+# Sketches add element-wise, so flush() merges this process's pending
+# increments into whatever is on disk (under a lock file where fcntl exists)
+# and several server processes can share one file.
+#
+#   python -m sourcing.docfreq add jds.jsonl          # batch-load a dump (same formats as sourcing.jd)
+#   python -m sourcing.docfreq lookup kubernetes "payroll tax"
+#   python -m sourcing.docfreq stats
+
+import argparse
+import atexit
+import hashlib
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: flushes from several processes may interleave
+    fcntl = None
+
+DEFAULT_STORE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jd_docfreq.bin")
+
+_MAGIC = b"JDDF"
+_HEADER = struct.Struct("<4sHHIQI")  # magic, version, depth, width, n_docs, n_fingerprints
+_VERSION = 1
+
+
+def doc_fingerprint(text: str) -> int:
+    """64-bit content hash of a JD, whitespace- and case-insensitive."""
+    norm = " ".join((text or "").lower().split())
+    return int.from_bytes(hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _to_le(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _from_le(typecode: str, data: bytes) -> array:
+    a = array(typecode)
+    a.frombytes(data)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+class DocFreqStore:
+    """Count-min document frequencies; same `n_docs` / `df(term)` / `add(terms)` interface as jd.DocFreq."""
+
+    def __init__(self, path: Optional[str] = None, width: int = 1 << 18, depth: int = 4,
+                 max_fingerprints: int = 200_000, flush_every_s: float = 30.0) -> None:
+        if width & (width - 1) or not 1 <= depth <= 16:
+            raise ValueError("width must be a power of two and depth in 1..16")
+        self.path = path
+        self.width, self.depth = width, depth
+        self.max_fingerprints = max_fingerprints
+        self.flush_every_s = flush_every_s
+        self.n_docs = 0
+        self._counts = array("I", bytes(4 * width * depth))
+        self._pending = array("I", bytes(4 * width * depth))  # increments not yet on disk
+        self._pending_docs = 0
+        self._seen: Dict[int, None] = {}  # insertion-ordered fingerprints, oldest evicted first
+        self._new_seen: List[int] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._mask = width - 1
+        self._unpack = struct.Struct(f"<{depth}I").unpack
+        if path and os.path.exists(path):
+            self._load()
+
+    # ---- hashing / lookup ----
+
+    def _slots(self, term: str) -> List[int]:
+        hs = self._unpack(hashlib.blake2b(term.encode("utf-8"), digest_size=4 * self.depth).digest())
+        w, m = self.width, self._mask
+        return [r * w + (h & m) for r, h in enumerate(hs)]
+
+    def df(self, term: str) -> int:
+        c = self._counts
+        return min(c[i] for i in self._slots(term))
+
+    def idf(self, term: str) -> float:
+        """Smoothed IDF, 1.0 when the store is empty (matches jd.idf)."""
+        n = self.n_docs
+        return math.log((n + 1) / (self.df(term) + 1)) + 1.0 if n else 1.0
+
+    def idf_many(self, terms: Iterable[str]) -> Dict[str, float]:
+        return {t: self.idf(t) for t in terms}
+
+    def seen(self, text: str) -> bool:
+        return doc_fingerprint(text) in self._seen
+
+    # ---- updates ----
+
+    def add(self, terms: Iterable[str], fingerprint: Optional[int] = None) -> bool:
+        """Count one document's distinct terms; False (no-op) if its fingerprint was already counted."""
+        with self._lock:
+            if fingerprint is not None:
+                if fingerprint in self._seen:
+                    return False
+                self._remember(fingerprint)
+                self._new_seen.append(fingerprint)
+            c, p = self._counts, self._pending
+            for t in set(terms):
+                slots = self._slots(t)
+                target = min(c[i] for i in slots) + 1
+                for i in slots:  # conservative update: only raise counters below the new estimate
+                    if c[i] < target:
+                        p[i] += target - c[i]
+                        c[i] = target
+            self.n_docs += 1
+            self._pending_docs += 1
+        if self.path and time.monotonic() - self._last_flush > self.flush_every_s:
+            self.flush()
+        return True
+
+    def _remember(self, fp: int) -> None:
+        self._seen[fp] = None
+        while len(self._seen) > self.max_fingerprints:
+            del self._seen[next(iter(self._seen))]
+
+    # ---- persistence ----
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None or not self.path:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            magic, version, depth, width, n_docs, n_fp = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{self.path}: not a docfreq store (or unsupported version)")
+            if (depth, width) != (self.depth, self.width):
+                raise ValueError(f"{self.path}: store is {depth}x{width}, expected {self.depth}x{self.width}")
+            counts = _from_le("I", f.read(4 * depth * width))
+            fps = _from_le("Q", f.read(8 * n_fp))
+        return n_docs, counts, fps
+
+    def _load(self) -> None:
+        with self._file_lock():
+            n_docs, counts, fps = self._read()
+        self.n_docs, self._counts = n_docs, counts
+        for fp in fps:
+            self._remember(fp)
+
+    def flush(self) -> bool:
+        """Merge pending increments into the file; returns False when there was nothing to write."""
+        if not self.path:
+            return False
+        with self._lock:
+            if not self._pending_docs:
+                return False
+            pending, pending_docs, new_seen = self._pending, self._pending_docs, self._new_seen
+            self._pending = array("I", bytes(4 * self.width * self.depth))
+            self._pending_docs, self._new_seen = 0, []
+            self._last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._file_lock():
+            if os.path.exists(self.path):
+                n_docs, counts, fps = self._read()
+                seen = dict.fromkeys(fps)
+            else:
+                n_docs, counts, seen = 0, array("I", bytes(4 * self.width * self.depth)), {}
+            for i, v in enumerate(pending):
+                if v:
+                    counts[i] += v
+            n_docs += pending_docs
+            for fp in new_seen:
+                seen[fp] = None
+            fps = array("Q", list(seen)[-self.max_fingerprints:])
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, self.depth, self.width, n_docs, len(fps)))
+                f.write(_to_le(counts))
+                f.write(_to_le(fps))
+            os.replace(tmp, self.path)
+        with self._lock:  # pick up other processes' documents, keeping increments made meanwhile
+            p = self._pending
+            self._counts = array("I", (c + d for c, d in zip(counts, p))) if self._pending_docs else counts
+            self.n_docs = n_docs + self._pending_docs
+            for fp in fps:
+                if fp not in self._seen:
+                    self._remember(fp)
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        return {"n_docs": self.n_docs, "width": self.width, "depth": self.depth,
+                "bytes": self._counts.itemsize * len(self._counts) * 2, "fingerprints": len(self._seen),
+                "pending_docs": self._pending_docs, "path": self.path}
+
+
+def open_store(path: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> DocFreqStore:
+    """Store at DOCFREQ_FILE (default data/jd_docfreq.bin), sized by DOCFREQ_WIDTH; flushed at exit."""
+    env = os.environ if env is None else env
+    path = path or env.get("DOCFREQ_FILE") or DEFAULT_STORE_FILE
+    store = DocFreqStore(path, width=int(env.get("DOCFREQ_WIDTH") or 1 << 18))
+    atexit.register(store.flush)
+    return store
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .jd import iter_jd_file, jd_terms
+
+    ap = argparse.ArgumentParser(description="JD document-frequency store used for IDF weighting.")
+    ap.add_argument("--file", default=None, help="store path (default: $DOCFREQ_FILE or data/jd_docfreq.bin)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("add")
+    a.add_argument("paths", nargs="+")
+    lk = sub.add_parser("lookup")
+    lk.add_argument("terms", nargs="+")
+    sub.add_parser("stats")
+    args = ap.parse_args(argv)
+    store = open_store(args.file)
+    if args.cmd == "add":
+        t0, n, dup = time.perf_counter(), 0, 0
+        for path in args.paths:
+            for jd in iter_jd_file(path):
+                if store.add(jd_terms(jd), doc_fingerprint(jd)):
+                    n += 1
+                else:
+                    dup += 1
+        store.flush()
+        dt = time.perf_counter() - t0
+        print(f"added {n} JDs ({dup} duplicates skipped) in {dt:.2f}s; store now has {store.n_docs}", file=sys.stderr)
+    elif args.cmd == "lookup":
+        for t in args.terms:
+            print(f"{t}\tdf={store.df(t.lower())}\tidf={store.idf(t.lower()):.3f}")
+    else:
+        for k, v in store.stats().items():
+            print(f"{k}: {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# sourcing/entities.py — company entity resolution (aliases and parent companies)
+#
+# Names are normalized (case, punctuation, corporate suffixes) and looked up in
+# a dict built once from COMPANY_ENTITIES. A policy decides what a name
+# resolves to:
+#   "exact"   keep names as typed (plain case-insensitive dedupe)
+#   "alias"   aliases -> canonical entity ("Facebook", "Meta Platforms" -> "Meta")
+#   "parent"  aliases and subsidiaries -> top parent ("YouTube", "Google Cloud" -> "Google")
+#   "expand"  canonical entity plus its aliases, for the widest company match
+# Every policy maps names one at a time and then dedupes, so resolving
+# base + extra gives the same result as resolving each part and merging.
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .core import safe_quote, unique_preserve
+from .taxonomy import COMPANY_ENTITIES
+
+POLICIES = ["exact", "alias", "parent", "expand"]
+
+_SUFFIXES = {"inc", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "plc", "gmbh", "ag", "sa", "holdings", "group"}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=16384)
+def normalize_company(name: str) -> str:
+    words = _NON_WORD.sub(" ", (name or "").lower().replace("&", " and ")).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+class EntityIndex:
+    def __init__(self, entities: Optional[Dict[str, Dict[str, List[str]]]] = None) -> None:
+        entities = COMPANY_ENTITIES if entities is None else entities
+        self._canonical: Dict[str, str] = {}   # normalized name -> canonical entity
+        self._parent: Dict[str, str] = {}      # canonical entity -> direct parent
+        self._aliases: Dict[str, List[str]] = {}
+        for canon, spec in entities.items():
+            self._aliases[canon] = list(spec.get("aliases", []))
+            for n in [canon] + self._aliases[canon]:
+                self._canonical.setdefault(normalize_company(n), canon)
+        for canon, spec in entities.items():
+            for sub in spec.get("subsidiaries", []):
+                self._canonical.setdefault(normalize_company(sub), sub)
+                self._parent[self._canonical[normalize_company(sub)]] = canon
+
+    def canonical(self, name: str) -> str:
+        return self._canonical.get(normalize_company(name), (name or "").strip())
+
+    def top_parent(self, name: str) -> str:
+        c, seen = self.canonical(name), set()
+        while c in self._parent and c not in seen:
+            seen.add(c)
+            c = self._parent[c]
+        return c
+
+    def resolve_one(self, name: str, policy: str) -> List[str]:
+        if policy == "alias":
+            return [self.canonical(name)]
+        if policy == "parent":
+            return [self.top_parent(name)]
+        if policy == "expand":
+            c = self.canonical(name)
+            return [c] + self._aliases.get(c, [])
+        return [name]
+
+    def resolve(self, names: Sequence[str], policy: str = "alias") -> List[str]:
+        out: List[str] = []
+        for n in names:
+            if (n or "").strip():
+                out.extend(self.resolve_one(n.strip(), policy))
+        return unique_preserve(out)
+
+
+ENTITIES = EntityIndex()
+
+
+def fit_or_group(names: Sequence[str], max_chars: int) -> Tuple[List[str], List[str]]:
+    """Longest prefix of `names` whose or_group fits in max_chars; returns (kept, dropped)."""
+    kept: List[str] = []
+    seen, size = set(), 2  # "(" + ")"
+    for i, n in enumerate(names):
+        q = safe_quote(n)
+        if not q or q.lower() in seen:
+            kept.append(n)  # or_group drops it anyway; costs nothing
+            continue
+        add = len(q) + (4 if seen else 0)  # " OR "
+        if size + add > max_chars:
+            return kept, list(names[i:])
+        seen.add(q.lower())
+        size += add
+        kept.append(n)
+    return kept, []
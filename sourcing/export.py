@@ -0,0 +1,387 @@
+# sourcing/export.py — streaming CSV / JSONL / XLSX export of packs
+#
+# Every writer takes an iterable of pack dicts (the app's current pack, or
+# sourcing.batch output) and yields bytes in ~64 KB chunks. It holds at most
+# one buffered chunk, so memory stays flat however many packs pass through.
+# Columns come from a variant:
+#
+#   pack       id, category + EXPORT_FIELDS (the same fields pack_text is built from)
+#   linkedin   one column per LinkedIn search field (Title current/past, Keywords, Company)
+#   recruiter  LinkedIn Recruiter filters (Job titles, Companies, Keywords, Skills, Locations)
+#
+# XLSX is written directly as SpreadsheetML (inline strings) into a streamed
+# zip, so no spreadsheet library is needed. Excel's limits are respected:
+# cells are truncated at 32,767 characters and rows roll over to a new sheet.
+# bundle() zips several format × variant files plus one .txt per pack. Packs
+# are spooled to a temporary file once, so a req backlog is built a single
+# time however many files come out.
+#
+#   python -m sourcing.export packs.jsonl -o packs.xlsx --variant recruiter
+#   python -m sourcing.export reqs.jsonl -o packs.csv --part-size 5000   # builds packs; packs-00001.csv, …
+#   python -m sourcing.export packs.jsonl -o bundle.zip --formats csv,xlsx --variants linkedin,recruiter
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from itertools import chain, islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from .pack import EXPORT_FIELDS
+
+try:
+    import orjson  # Optional fast JSON
+except Exception:
+    orjson = None
+
+CHUNK_BYTES = 64 << 10
+XLSX_MAX_CELL = 32767
+
+VARIANTS: Dict[str, List[Tuple[str, str]]] = {
+    "pack": [("id", "id"), ("category", "category")] + [(f, f) for f in EXPORT_FIELDS],
+    "linkedin": [("Role", "role_title"), ("Title (Current)", "title_current"), ("Title (Past)", "title_past"),
+                 ("Keywords", "keywords"), ("Current company", "companies_or")],
+    "recruiter": [("Role", "role_title"), ("Job titles", "title_current"), ("Companies", "companies_or"),
+                  ("Keywords", "keywords"), ("Skills", "skills_csv"), ("Locations", "location")],
+}
+
+VARIANT_LABELS = {"pack": "Full pack", "linkedin": "LinkedIn search fields", "recruiter": "LinkedIn Recruiter filters"}
+
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _cell(pack: Dict[str, Any], field: str) -> str:
+    v = pack.get(field)
+    return "" if v is None else str(v)
+
+
+def _columns(variant: str) -> List[Tuple[str, str]]:
+    try:
+        return VARIANTS[variant]
+    except KeyError:
+        raise ValueError(f"unknown export variant {variant!r} (expected one of {', '.join(VARIANTS)})") from None
+
+
+class _Sink:
+    """Write-only byte buffer the writers drain as they go (no tell/seek, so zipfile streams into it)."""
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buf += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = bytes(self.buf)
+        self.buf.clear()
+        return out
+
+
+def iter_csv(packs: Iterable[Dict[str, Any]], variant: str = "pack") -> Iterator[bytes]:
+    cols = _columns(variant)
+    text = io.StringIO()
+    w = csv.writer(text)
+    w.writerow([h for h, _ in cols])
+    for pack in packs:
+        w.writerow([_cell(pack, f) for _, f in cols])
+        if text.tell() >= CHUNK_BYTES:
+            yield text.getvalue().encode("utf-8")
+            text.seek(0)
+            text.truncate()
+    yield text.getvalue().encode("utf-8")
+
+
+def iter_jsonl(packs: Iterable[Dict[str, Any]], variant: str = "pack") -> Iterator[bytes]:
+    cols = _columns(variant)
+    buf = bytearray()
+    for pack in packs:
+        row = {h: pack.get(f) for h, f in cols}
+        buf += orjson.dumps(row) if orjson is not None else json.dumps(row, ensure_ascii=False).encode("utf-8")
+        buf += b"\n"
+        if len(buf) >= CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    yield bytes(buf)
+
+
+def _col_letter(i: int) -> str:
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _xlsx_row(r: int, values: Sequence[str], style: int = 0) -> str:
+    s = f' s="{style}"' if style else ""
+    cells = "".join(
+        f'<c r="{_col_letter(i)}{r}" t="inlineStr"{s}><is><t xml:space="preserve">'
+        f'{escape(_XML_ILLEGAL.sub("", v[:XLSX_MAX_CELL]))}</t></is></c>'
+        for i, v in enumerate(values))
+    return f'<row r="{r}">{cells}</row>'
+
+
+_XLSX_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+              '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+              '</sheetView></sheetViews><sheetData>').encode("utf-8")
+_XLSX_TAIL = b"</sheetData></worksheet>"
+_XLSX_STYLES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<fonts count="2"><font/><font><b/></font></fonts>'
+                '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+                '<borders count="1"><border/></borders>'
+                '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+                '<cellXfs count="2"><xf/><xf fontId="1" applyFont="1"/></cellXfs>'
+                '</styleSheet>')
+_XLSX_ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+                   'officeDocument" Target="xl/workbook.xml"/></Relationships>')
+XLSX_MAX_ROWS = 1048576
+_SPREADSHEETML = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+_RELS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _xlsx_index(n_sheets: int) -> Dict[str, str]:
+    # Written after the sheets, once their count is known (zip member order doesn't matter)
+    sheets = range(1, n_sheets + 1)
+    return {
+        "[Content_Types].xml":
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{_SPREADSHEETML}.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="{_SPREADSHEETML}.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_SPREADSHEETML}.worksheet+xml"/>'
+                      for i in sheets) + '</Types>',
+        "_rels/.rels": _XLSX_ROOT_RELS,
+        "xl/workbook.xml":
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="{_RELS}"><sheets>'
+            + "".join(f'<sheet name="Packs{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets)
+            + '</sheets></workbook>',
+        "xl/_rels/workbook.xml.rels":
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{_RELS}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in sheets)
+            + f'<Relationship Id="rId{n_sheets + 1}" Type="{_RELS}/styles" Target="styles.xml"/></Relationships>',
+        "xl/styles.xml": _XLSX_STYLES,
+    }
+
+
+def iter_xlsx(packs: Iterable[Dict[str, Any]], variant: str = "pack") -> Iterator[bytes]:
+    """One worksheet per 1,048,575 packs (Excel's row limit, less the header)."""
+    cols = _columns(variant)
+    header = _xlsx_row(1, [h for h, _ in cols], style=1).encode("utf-8")
+    sink = _Sink()
+    it = iter(packs)
+    pack = next(it, None)
+    n_sheets = 0
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        while n_sheets == 0 or pack is not None:
+            n_sheets += 1
+            with zf.open(f"xl/worksheets/sheet{n_sheets}.xml", "w") as sheet:
+                sheet.write(_XLSX_HEAD)
+                sheet.write(header)
+                r = 2
+                while pack is not None and r <= XLSX_MAX_ROWS:
+                    sheet.write(_xlsx_row(r, [_cell(pack, f) for _, f in cols]).encode("utf-8"))
+                    if len(sink.buf) >= CHUNK_BYTES:
+                        yield sink.drain()
+                    pack = next(it, None)
+                    r += 1
+                sheet.write(_XLSX_TAIL)
+        for name, xml in _xlsx_index(n_sheets).items():
+            zf.writestr(name, xml)
+    yield sink.drain()
+
+
+# format -> (writer, mime type, file extension)
+FORMATS: Dict[str, Tuple[Callable[[Iterable[Dict[str, Any]], str], Iterator[bytes]], str, str]] = {
+    "csv": (iter_csv, "text/csv", ".csv"),
+    "jsonl": (iter_jsonl, "application/x-ndjson", ".jsonl"),
+    "xlsx": (iter_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+}
+
+
+def export(packs: Iterable[Dict[str, Any]], fmt: str = "csv", variant: str = "pack") -> Iterator[bytes]:
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    return FORMATS[fmt][0](packs, variant)
+
+
+def export_bytes(packs: Iterable[Dict[str, Any]], fmt: str = "csv", variant: str = "pack") -> bytes:
+    """Whole export in memory (one pack, or one download part)."""
+    return b"".join(export(packs, fmt, variant))
+
+
+def iter_zip(members: Iterable[Tuple[str, Iterable[bytes]]]) -> Iterator[bytes]:
+    """Stream a zip of (name, byte chunks) members, one member at a time."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, chunks in members:
+            with zf.open(name, "w", force_zip64=True) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    if len(sink.buf) >= CHUNK_BYTES:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _pack_name(pack: Dict[str, Any], i: int) -> str:
+    stem = re.sub(r"[^\w.-]+", "_", str(pack.get("id") if pack.get("id") is not None else i)).strip("_") or str(i)
+    role = re.sub(r"[^\w-]+", "_", pack.get("role_title") or "").strip("_")[:60]
+    return f"packs/{stem}{'_' + role if role else ''}.txt"
+
+
+def bundle(packs: Iterable[Dict[str, Any]], formats: Sequence[str] = ("csv", "jsonl", "xlsx"),
+           variants: Sequence[str] = ("pack",), texts: bool = True, stem: str = "packs") -> Iterator[bytes]:
+    """Zip of every format × variant (e.g. packs_linkedin.xlsx) plus, with `texts`, each pack's .txt."""
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    for variant in variants:
+        _columns(variant)
+    with tempfile.TemporaryFile() as spool:
+        for pack in packs:
+            spool.write(json.dumps(pack, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        def reread() -> Iterator[Dict[str, Any]]:
+            spool.seek(0)
+            for line in spool:
+                yield json.loads(line)
+
+        def members() -> Iterator[Tuple[str, Iterable[bytes]]]:
+            for variant in variants:
+                for fmt in formats:
+                    suffix = "" if variant == "pack" else f"_{variant}"
+                    yield f"{stem}{suffix}{FORMATS[fmt][2]}", export(reread(), fmt, variant)
+            if texts:
+                for i, pack in enumerate(reread()):
+                    if pack.get("pack_text"):
+                        yield _pack_name(pack, i), [pack["pack_text"].encode("utf-8")]
+
+        yield from iter_zip(members())
+
+
+def parts(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of `size` items (one per download part)."""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_packs(lines: Iterable[str], workers: Optional[int] = 1, first_id: int = 0) -> Iterator[Dict[str, Any]]:
+    """Packs from JSONL lines: sourcing.batch output passes through; reqs (no pack_text) are built on the fly."""
+    from .batch import run_batch
+
+    rows = (json.loads(x) for x in lines if x.strip())
+    first = next(rows, None)
+    if first is None:
+        return
+    if "pack_text" in first:
+        yield first
+        yield from rows
+        return
+
+    def reqs() -> Iterator[Dict[str, Any]]:
+        for i, req in enumerate(chain([first], rows), start=first_id):
+            req.setdefault("id", i)
+            yield req
+    yield from run_batch(reqs(), workers=workers)
+
+
+def export_part(lines: Iterable[str], part: int, size: int, fmt: str = "csv", variant: str = "pack",
+                workers: Optional[int] = 1) -> bytes:
+    """One download part: packs part*size … (part+1)*size-1 of a JSONL of packs or reqs, in `fmt` or a "zip" bundle.
+    Only that slice of reqs is built, so every part costs the same."""
+    rows = islice((x for x in lines if x.strip()), part * size, (part + 1) * size)
+    packs = iter_packs(rows, workers, first_id=part * size)
+    chunks = bundle(packs, list(FORMATS), [variant], stem=f"packs-{part + 1:05d}") if fmt == "zip" else export(packs, fmt, variant)
+    return b"".join(chunks)
+
+
+def write_stream(chunks: Iterable[bytes], out: IO[bytes]) -> int:
+    n = 0
+    for chunk in chunks:
+        out.write(chunk)
+        n += len(chunk)
+    return n
+
+
+class _Counted:
+    def __init__(self, items: Iterable[Any]) -> None:
+        self.items, self.n = items, 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for x in self.items:
+            self.n += 1
+            yield x
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Export packs (or build them from reqs) to CSV, JSONL, XLSX or a zip bundle.")
+    ap.add_argument("path", help="JSONL of packs (sourcing.batch output) or of reqs; '-' for stdin")
+    ap.add_argument("-o", "--out", required=True, help="output file; the extension picks the format (.csv/.jsonl/.xlsx/.zip)")
+    ap.add_argument("--variant", default="pack", choices=list(VARIANTS))
+    ap.add_argument("--formats", default="csv,jsonl,xlsx", help="zip bundles: formats to include")
+    ap.add_argument("--variants", default="pack", help="zip bundles: variants to include")
+    ap.add_argument("--no-texts", action="store_true", help="zip bundles: leave out the per-pack .txt files")
+    ap.add_argument("--part-size", type=int, default=0, help="split into files of N packs (out-00001.ext, …)")
+    ap.add_argument("--workers", type=int, default=1, help="when building from reqs (see sourcing.batch)")
+    args = ap.parse_args(argv)
+
+    stem, ext = os.path.splitext(args.out)
+    ext = ext.lower()
+    if ext == ".zip":
+        formats, variants = args.formats.split(","), args.variants.split(",")
+
+        def write(packs: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+            return bundle(packs, formats, variants, texts=not args.no_texts, stem=os.path.basename(stem))
+    else:
+        fmt = ext.lstrip(".")
+        if fmt not in FORMATS:
+            ap.error(f"can't tell the format from {args.out!r}; use .csv, .jsonl, .xlsx or .zip")
+
+        def write(packs: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+            return export(packs, fmt, args.variant)
+
+    src = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    t0, total, files = time.perf_counter(), 0, 0
+    try:
+        packs = iter_packs(src, args.workers)
+        groups = parts(packs, args.part_size) if args.part_size else [packs]
+        for i, group in enumerate(groups, start=1):
+            path = f"{stem}-{i:05d}{ext}" if args.part_size else args.out
+            counted = _Counted(group)
+            with open(path, "wb") as out:
+                write_stream(write(counted), out)
+            total += counted.n
+            files += 1
+    finally:
+        if src is not sys.stdin:
+            src.close()
+    print(f"{total} packs -> {files} file(s) in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# sourcing/fuzz.py — differential fuzzing of the Boolean builders against sourcing.reference
+#
+# A tuned builder must return exactly what the frozen reference returns, for any input,
+# not just the fixtures sourcing.microbench times. This module draws random term lists
+# with Hypothesis and compares a candidate module (default sourcing.core) against
+# sourcing.reference, function by function:
+#
+#   safe_quote, or_group, not_group, build_keywords, build_keywords_two_tier, string_health_report
+#
+# Terms mix real ROLE_LIB / SMART_NOT / synonym terms with random strings, and decorate them
+# with case changes, padding, straight and curly quotes (normalize_quotes), parens, hyphens
+# and slashes. Lists repeat terms so dedup runs, and include blanks and None. Two-tier calls
+# use min_must from -1 to 4, and an empty must list gives them empty anchors. Health-report
+# inputs are real packs, packs with parens and quotes inserted or dropped, long packs
+# (>900 chars, >80 ORs), and raw text.
+#
+#   check        run N examples per function. A mismatch is shrunk by Hypothesis to a
+#                minimal input and printed with both outputs. Exit 1 on any mismatch.
+#   throughput   generate a pool of inputs, then call the candidate and the reference on
+#                it for --seconds each. Reports ops/sec and the speedup, and counts inputs
+#                whose outputs differ (exit 1 if any), so a speedup is only reported
+#                alongside proof of identical output.
+#
+# check shrinks the candidate's term caches to --cache-size, so the wholesale clears in
+# TermCache run too; throughput leaves them at their real size.
+#
+# Hypothesis is only needed for this tool, not by the apps: pip install hypothesis
+#
+#   python -m sourcing.fuzz check [functions...] [--examples 1000] [--seed 0] [--against sourcing.core]
+#   python -m sourcing.fuzz throughput [functions...] [--seconds 2] [--pool 500] [--json]
+
+import argparse
+import importlib
+import json
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import reference
+from .microbench import format_rows
+from .taxonomy import ROLE_LIB, SMART_NOT, SYNONYMS
+
+try:
+    import hypothesis
+    from hypothesis import HealthCheck, given, settings
+    from hypothesis import strategies as hs
+except ImportError:  # optional: only this tool needs it
+    hypothesis = None
+
+FUNCTIONS = ("safe_quote", "or_group", "not_group", "build_keywords", "build_keywords_two_tier",
+             "string_health_report")
+
+COLUMNS = ["function", "inputs", "core_ops_s", "reference_ops_s", "speedup", "mismatches"]
+
+# Characters the builders treat specially, plus enough ordinary ones to form words
+_ALPHABET = "abkoRSTZ09 \t\"“”‘’'()-/.+#_\\é"
+_DECORATIONS = ("plain", "upper", "lower", "pad", "quoted", "curly", "paren", "hyphen", "slash")
+
+
+class Mismatch(AssertionError):
+    """Candidate and reference returned different values for the same arguments."""
+
+    def __init__(self, function: str, args: Tuple, got: Any, want: Any) -> None:
+        super().__init__(f"{function}{args!r}\n  candidate: {got!r}\n  reference: {want!r}")
+        self.function, self.call_args, self.got, self.want = function, args, got, want
+
+
+def _corpus() -> List[str]:
+    terms = {t for r in ROLE_LIB.values() for t in r["titles"] + r["must"] + r["nice"]}
+    terms.update(SMART_NOT, SYNONYMS, SYNONYMS.values())
+    return sorted(terms)
+
+
+def _decorate(t: str, how: str) -> str:
+    if how == "upper":
+        return t.upper()
+    if how == "lower":
+        return t.lower()
+    if how == "pad":
+        return f"  {t}\t"
+    if how == "quoted":
+        return f'"{t}"'
+    if how == "curly":
+        return f"“{t}”"
+    if how == "paren":
+        return f"{t} (senior)"
+    if how == "hyphen":
+        return f"{t}-ops"
+    if how == "slash":
+        return f"{t}/ml"
+    return t
+
+
+def strategies() -> Dict[str, Any]:
+    """function name -> Hypothesis strategy for its positional-argument tuple."""
+    if hypothesis is None:
+        raise RuntimeError("the fuzz harness needs Hypothesis: pip install hypothesis")
+    corpus = _corpus()
+    known = hs.sampled_from(corpus)
+    blank = hs.sampled_from(["", "  ", "\t", None])
+
+    @hs.composite
+    def term(draw):
+        return _decorate(draw(hs.one_of(known, hs.text(alphabet=_ALPHABET, max_size=14))),
+                         draw(hs.sampled_from(_DECORATIONS)))
+
+    @hs.composite
+    def term_list(draw, max_size: int = 12):
+        # draw from a small pool so the same term (and its case variants) shows up more than once
+        pool = draw(hs.lists(hs.one_of(term(), blank), min_size=1, max_size=6))
+        return draw(hs.lists(hs.one_of(hs.sampled_from(pool), term(), blank), max_size=max_size))
+
+    two_tier = hs.tuples(term_list(), term_list(), term_list(),
+                         hs.one_of(hs.none(), term_list(4)), hs.integers(min_value=-1, max_value=4))
+
+    @hs.composite
+    def boolean_string(draw):
+        kind = draw(hs.sampled_from(("pack", "mutated", "long", "text")))
+        if kind == "text":
+            return draw(hs.text(alphabet=_ALPHABET + "OR", max_size=60))
+        s = reference.build_keywords_two_tier(*draw(two_tier))
+        if kind == "long":
+            s = reference.or_group(draw(hs.lists(known, min_size=60, max_size=140))) + (" AND " + s if s else "")
+        if kind == "mutated":
+            for _ in range(draw(hs.integers(min_value=1, max_value=4))):
+                i = draw(hs.integers(min_value=0, max_value=len(s)))
+                if s and draw(hs.booleans()):
+                    s = s[:max(0, i - 1)] + s[i:]  # drop a character
+                else:
+                    s = s[:i] + draw(hs.sampled_from('()"“”')) + s[i:]
+        return s
+
+    return {
+        "safe_quote": hs.tuples(hs.one_of(term(), blank)),
+        "or_group": hs.tuples(term_list()),
+        "not_group": hs.tuples(term_list()),
+        "build_keywords": hs.tuples(term_list(), term_list(), term_list(), hs.one_of(hs.none(), term_list(4))),
+        "build_keywords_two_tier": two_tier,
+        "string_health_report": hs.tuples(boolean_string()),
+    }
+
+
+@contextmanager
+def _small_caches(candidate: ModuleType, size: int) -> Iterator[None]:
+    caches = list(getattr(candidate, "TERM_CACHES", {}).values())
+    saved = [c.maxsize for c in caches]
+    for c in caches:
+        c.clear()
+        c.maxsize = size
+    try:
+        yield
+    finally:
+        for c, m in zip(caches, saved):
+            c.clear()
+            c.maxsize = m
+
+
+def _settings(examples: int, seed: Optional[int]) -> Callable:
+    wrap = settings(max_examples=examples, deadline=None, database=None, print_blob=False,
+                    suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large,
+                                           HealthCheck.filter_too_much])
+
+    def apply(fn: Callable) -> Callable:
+        fn = wrap(fn)
+        return hypothesis.seed(seed)(fn) if seed is not None else fn
+    return apply
+
+
+def check(names: Sequence[str] = FUNCTIONS, examples: int = 1000, seed: Optional[int] = None,
+          candidate: ModuleType = None, cache_size: int = 64) -> List[Dict[str, Any]]:
+    """One row per function: examples run and the shrunk mismatch, if any."""
+    candidate = candidate or importlib.import_module("sourcing.core")
+    table = strategies()
+    rows = []
+    with _small_caches(candidate, cache_size):
+        for name in names:
+            fast, ref = getattr(candidate, name), getattr(reference, name)
+
+            @_settings(examples, seed)
+            @given(table[name])
+            def same(args: Tuple) -> None:
+                got, want = fast(*args), ref(*args)
+                if got != want:
+                    raise Mismatch(name, args, got, want)
+
+            try:
+                same()
+                rows.append({"function": name, "examples": examples, "mismatch": None})
+            except Mismatch as e:
+                rows.append({"function": name, "examples": examples, "mismatch": str(e)})
+    return rows
+
+
+def _pool(strategy: Any, size: int, seed: Optional[int]) -> List[Tuple]:
+    out: List[Tuple] = []
+
+    @_settings(size, seed)
+    @given(strategy)
+    def collect(args: Tuple) -> None:
+        out.append(args)
+
+    collect()
+    return out
+
+
+def _ops_per_s(fn: Callable, inputs: List[Tuple], seconds: float) -> float:
+    n, start = 0, time.perf_counter()
+    end = start + seconds
+    while True:
+        for args in inputs:
+            fn(*args)
+        n += len(inputs)
+        now = time.perf_counter()
+        if now >= end:
+            return n / (now - start)
+
+
+def throughput(names: Sequence[str] = FUNCTIONS, seconds: float = 2.0, pool: int = 500, seed: Optional[int] = 0,
+               candidate: ModuleType = None) -> List[Dict[str, Any]]:
+    """One row per function: candidate and reference ops/sec over the same fuzzed inputs, plus mismatches."""
+    candidate = candidate or importlib.import_module("sourcing.core")
+    table = strategies()
+    rows = []
+    for name in names:
+        fast, ref = getattr(candidate, name), getattr(reference, name)
+        inputs = _pool(table[name], pool, seed)
+        mismatches = sum(fast(*a) != ref(*a) for a in inputs)  # also the warm-up
+        fast_ops = _ops_per_s(fast, inputs, seconds / 2)
+        ref_ops = _ops_per_s(ref, inputs, seconds / 2)
+        rows.append({"function": name, "inputs": len(inputs), "core_ops_s": round(fast_ops),
+                     "reference_ops_s": round(ref_ops), "speedup": round(fast_ops / ref_ops, 2),
+                     "mismatches": mismatches})
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Differential fuzzing of the Boolean builders against sourcing.reference.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for cmd, help_text in (("check", "compare outputs on random inputs; shrink and print any mismatch"),
+                           ("throughput", "ops/sec for candidate and reference on the same fuzzed inputs")):
+        p = sub.add_parser(cmd, help=help_text)
+        p.add_argument("functions", nargs="*", help=f"subset of: {', '.join(FUNCTIONS)}")
+        p.add_argument("--against", default="sourcing.core", help="module with the candidate implementations")
+        p.add_argument("--json", action="store_true")
+    ap_check, ap_tp = sub.choices["check"], sub.choices["throughput"]
+    ap_check.add_argument("--examples", type=int, default=1000, help="examples per function")
+    ap_check.add_argument("--cache-size", type=int, default=64, help="candidate TermCache maxsize while checking")
+    ap_check.add_argument("--seed", type=int, default=None, help="fixed Hypothesis seed (default: random)")
+    ap_tp.add_argument("--seconds", type=float, default=2.0, help="timed seconds per function, split between both")
+    ap_tp.add_argument("--pool", type=int, default=500, help="fuzzed inputs per function")
+    ap_tp.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    unknown = [f for f in args.functions if f not in FUNCTIONS]
+    if unknown:
+        ap.error(f"unknown function(s): {', '.join(unknown)}")
+    if hypothesis is None:
+        print("error: the fuzz harness needs Hypothesis: pip install hypothesis", file=sys.stderr)
+        return 2
+    candidate = importlib.import_module(args.against)
+    names = args.functions or FUNCTIONS
+
+    if args.cmd == "check":
+        rows = check(names, args.examples, args.seed, candidate, args.cache_size)
+        failed = [r for r in rows if r["mismatch"]]
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            for r in rows:
+                print(f"{r['function']:<26} {r['examples']} examples  {'MISMATCH' if r['mismatch'] else 'ok'}")
+            for r in failed:
+                print(f"\nminimal mismatch: {r['mismatch']}")
+        return 1 if failed else 0
+
+    rows = throughput(names, args.seconds, args.pool, args.seed, candidate)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows, COLUMNS))
+    return 1 if any(r["mismatches"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
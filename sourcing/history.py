@@ -0,0 +1,275 @@
+# sourcing/history.py — every built pack, searchable and reopenable
+#
+# One SQLite file (WAL, so several server processes can share it) holds each
+# pack once. The key is a hash of the pack's inputs (the state_codec snapshot
+# blob) and its output (pack_text), so rebuilding the same pack only bumps
+# `uses` and `last_used`. An FTS5 index over title, category, location,
+# companies and skills (prefix-indexed, external-content so text isn't stored
+# twice) answers searches in milliseconds at hundreds of thousands of packs:
+# hits come newest first, read straight off the index in rowid order (bm25
+# ranking would score every match — 100x slower for a word like "engineer").
+# pack_text is stored zlib-compressed. Reopening a pack decodes the stored
+# snapshot, so neither the AI call nor the string pipeline runs again, and
+# the stored text can be downloaded as it was.
+#
+# Search syntax: plain words match any field by prefix ("sre kube"); quote
+# phrases ("site reliability"); limit a word to a field with title:, category:,
+# location:, company: or skill: ("company:stripe skill:go").
+#
+#   python -m sourcing.history search "title:sre skill:kubernetes"
+#   python -m sourcing.history show <key>
+#   python -m sourcing.history import packs.jsonl     # output of sourcing.batch
+#   python -m sourcing.history stats
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+DEFAULT_HISTORY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "pack_history.sqlite3")
+
+SEARCH_FIELDS = {"title": "role_title", "category": "category", "location": "location",
+                 "company": "companies", "skill": "skills"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 1,
+    role_title TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    location TEXT NOT NULL DEFAULT '',
+    companies TEXT NOT NULL DEFAULT '',
+    skills TEXT NOT NULL DEFAULT '',
+    snapshot BLOB,
+    pack_text BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packs_last_used ON packs(last_used);
+CREATE VIRTUAL TABLE IF NOT EXISTS packs_fts USING fts5(
+    role_title, category, location, companies, skills,
+    content='packs', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS packs_ai AFTER INSERT ON packs BEGIN
+    INSERT INTO packs_fts(rowid, role_title, category, location, companies, skills)
+    VALUES (new.id, new.role_title, new.category, new.location, new.companies, new.skills);
+END;
+CREATE TRIGGER IF NOT EXISTS packs_ad AFTER DELETE ON packs BEGIN
+    INSERT INTO packs_fts(packs_fts, rowid, role_title, category, location, companies, skills)
+    VALUES ('delete', old.id, old.role_title, old.category, old.location, old.companies, old.skills);
+END;
+"""
+
+_COLUMNS = "key, role_title, category, location, created, last_used, uses"
+_QUERY_TOKEN = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+
+Terms = Union[str, Iterable[str]]
+
+
+class HistoryEntry(NamedTuple):
+    key: str
+    role_title: str
+    category: str
+    location: str
+    created: float
+    last_used: float
+    uses: int
+
+
+class HistoryPack(NamedTuple):
+    entry: HistoryEntry
+    pack_text: str
+    snapshot: Optional[bytes]  # state_codec blob; decode with state_codec.decode_blob
+
+
+def pack_key(pack_text: str, snapshot: Optional[bytes] = None) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    h.update(snapshot or b"")
+    h.update(b"\0")
+    h.update(pack_text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def fts_query(text: str) -> str:
+    """User search text -> FTS5 MATCH expression (every word must match, by prefix)."""
+    parts = []
+    for field, phrase, word in _QUERY_TOKEN.findall(text or ""):
+        term = (phrase or word).replace('"', " ").strip()
+        if not term:
+            continue
+        col = SEARCH_FIELDS.get(field.lower()) if field else None
+        if field and col is None:  # "c++:x" or an unknown field: search the whole token
+            term = f"{field}:{term}"
+        expr = '"' + term + '"*'
+        parts.append(f"{col} : {expr}" if col else expr)
+    return " AND ".join(parts)
+
+
+def _joined(terms: Terms) -> str:
+    return terms if isinstance(terms, str) else ", ".join(terms)
+
+
+class PackHistory:
+    """Content-addressed pack history in SQLite with a full-text index; safe to share across threads."""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_FILE) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def _put(self, pack_text: str, snapshot: Optional[bytes], role_title: str, category: str, location: str,
+             companies: Terms, skills: Terms, now: float) -> Tuple[str, bool]:
+        key = pack_key(pack_text, snapshot)
+        cur = self._db.execute(
+            "INSERT OR IGNORE INTO packs (key, created, last_used, role_title, category, location, companies, skills,"
+            " snapshot, pack_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, now, now, role_title or "", category or "", location or "", _joined(companies), _joined(skills),
+             snapshot, zlib.compress(pack_text.encode("utf-8"), 6)))
+        if cur.rowcount:
+            return key, True
+        self._db.execute("UPDATE packs SET last_used = ?, uses = uses + 1 WHERE key = ?", (now, key))
+        return key, False
+
+    def record(self, pack_text: str, snapshot: Optional[bytes] = None, role_title: str = "", category: str = "",
+               location: str = "", companies: Terms = "", skills: Terms = "") -> Tuple[str, bool]:
+        """Store a pack; returns (key, True if it was new). A repeat only bumps uses/last_used."""
+        with self._lock:
+            return self._put(pack_text, snapshot, role_title, category, location, companies, skills, time.time())
+
+    def record_many(self, packs: Iterable[Dict[str, Any]], batch: int = 5000) -> Tuple[int, int]:
+        """Bulk record() of dicts with record()'s keyword names, committed every `batch`; returns (seen, new)."""
+        seen = new = 0
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for p in packs:
+                    _, added = self._put(p["pack_text"], p.get("snapshot"), p.get("role_title", ""),
+                                         p.get("category", ""), p.get("location", ""), p.get("companies", ""),
+                                         p.get("skills", ""), time.time())
+                    seen += 1
+                    new += added
+                    if seen % batch == 0:
+                        self._db.execute("COMMIT")
+                        self._db.execute("BEGIN")
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return seen, new
+
+    def search(self, query: str = "", limit: int = 20) -> List[HistoryEntry]:
+        """Newest packs matching `query` (see fts_query), or the most recently used packs when it's empty."""
+        match = fts_query(query)
+        with self._lock:
+            if not match:
+                rows = self._db.execute(f"SELECT {_COLUMNS} FROM packs ORDER BY last_used DESC LIMIT ?", (limit,))
+            else:
+                rows = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM packs WHERE id IN (SELECT rowid FROM packs_fts WHERE packs_fts MATCH ?"
+                    " ORDER BY rowid DESC LIMIT ?) ORDER BY id DESC", (match, limit))
+            return [HistoryEntry(*r) for r in rows.fetchall()]
+
+    def get(self, key: str, touch: bool = True) -> Optional[HistoryPack]:
+        """The stored pack (None if unknown); `touch` marks it used so it sorts first in recent packs."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS}, snapshot, pack_text FROM packs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if touch:
+                self._db.execute("UPDATE packs SET last_used = ? WHERE key = ?", (time.time(), key))
+        return HistoryPack(HistoryEntry(*row[:7]), zlib.decompress(row[8]).decode("utf-8"), row[7])
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return bool(self._db.execute("DELETE FROM packs WHERE key = ?", (key,)).rowcount)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n, uses, text_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(uses), 0), COALESCE(SUM(LENGTH(pack_text)), 0) FROM packs").fetchone()
+        size = os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0
+        return {"packs": n, "builds": uses, "dedup_hits": uses - n, "text_bytes_compressed": text_bytes,
+                "file_bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_history(env: Optional[Dict[str, str]] = None) -> PackHistory:
+    """History at PACK_HISTORY_FILE (default data/pack_history.sqlite3)."""
+    env = os.environ if env is None else env
+    return PackHistory(env.get("PACK_HISTORY_FILE") or DEFAULT_HISTORY_FILE)
+
+
+def _batch_pack(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Older sourcing.batch output has no role_title/location; fall back to pack_text's ROLE:/LOCATION: lines
+    head = dict(line.split(": ", 1) for line in row["pack_text"].split("\n", 2)[:2] if ": " in line)
+    return {"pack_text": row["pack_text"], "role_title": row.get("role_title", head.get("ROLE", "")),
+            "location": row.get("location", head.get("LOCATION", "")),
+            "category": row.get("category") or "", "companies": row.get("companies_or") or "",
+            "skills": row.get("skills_csv") or ""}
+
+
+def _iter_batch_output(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if row.get("pack_text"):
+                    yield _batch_pack(row)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Search and manage the local pack history.")
+    ap.add_argument("--file", default=None, help="history path (default: $PACK_HISTORY_FILE or data/pack_history.sqlite3)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("search")
+    s.add_argument("query", nargs="?", default="")
+    s.add_argument("--limit", type=int, default=20)
+    sh = sub.add_parser("show")
+    sh.add_argument("key")
+    im = sub.add_parser("import", help="record packs from sourcing.batch JSONL output")
+    im.add_argument("paths", nargs="+")
+    sub.add_parser("stats")
+    args = ap.parse_args(argv)
+    hist = PackHistory(args.file) if args.file else open_history()
+    if args.cmd == "search":
+        t0 = time.perf_counter()
+        hits = hist.search(args.query, args.limit)
+        for e in hits:
+            print(f"{e.key}  {time.strftime('%Y-%m-%d', time.localtime(e.last_used))}  x{e.uses:<3d} "
+                  f"{e.category:<10} {e.role_title}  {e.location}".rstrip())
+        print(f"{len(hits)} packs in {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    elif args.cmd == "show":
+        pack = hist.get(args.key, touch=False)
+        if pack is None:
+            print(f"error: no pack {args.key}", file=sys.stderr)
+            return 1
+        print(pack.pack_text)
+    elif args.cmd == "import":
+        t0 = time.perf_counter()
+        for path in args.paths:
+            seen, new = hist.record_many(_iter_batch_output(path))
+            print(f"{path}: {seen} packs, {new} new", file=sys.stderr)
+        print(f"{time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    else:
+        print(json.dumps(hist.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+# sourcing/jd.py — local JD analysis: sections, 1–3-gram candidates, TF-IDF ranking
+#
+# One tokenization pass per JD yields tokens with character offsets and phrase
+# breaks. Sections ("Requirements", "Nice to have", "Benefits", ...) weight the
+# terms found under them. Candidates are 1–3-grams within one phrase that
+# contain no stopword, mapped through SYNONYMS, and scored as
+#   tf(section-weighted) × idf(background corpus) × (1.5 if a known skill)
+# where the background is any object with `n_docs` and `df(term)` (DocFreq
+# below, or the persistent docfreq.DocFreqStore). Works for any role, not
+# just ROLE_LIB ones.
+#
+#   python -m sourcing.jd analyze jds.jsonl > suggestions.jsonl   # one {"text": ...} per line, or plain text
+#   python -m sourcing.jd analyze --store jds.jsonl                # weight by (and grow) the persistent store
+#   (prints throughput to stderr)
+
+import argparse
+import itertools
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .core import AUTO_NOT_TERMS, normalize_quotes
+from .docfreq import doc_fingerprint
+from .taxonomy import ROLE_LIB, SYNONYMS
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:'[a-z]+)?(?:[./-][a-z0-9+#]+)*\+*")
+_HAS_ALPHA = re.compile(r"[a-z]")
+_SOFT_GAP = re.compile(r"^[ \t]*$")  # only spaces between two tokens keeps a phrase together
+
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can could do does
+doing for from had has have having he her here how i if in into is it its just like may more most must
+no nor not of on or our out over own per plus same she should so some such than that the their them
+then there these they this those through to too under until up upon us very via was we were what when
+where which while who whom why will with within without would you your yours etc e g eg ie i.e e.g
+experience experiences years year strong ability able team teams work working role roles including
+include includes using use used across skills skill knowledge understanding excellent good great
+preferred required requirements requirement responsibilities responsibility qualifications qualification
+minimum least plus bonus ideal ideally candidate candidates looking join help new other well one two
+three four five six seven eight nine ten opportunity company companies environment related relevant
+demonstrated proven familiarity familiar solid deep hands hands-on highly level senior junior
+expert expertise need needs apply position positions full-time part-time time day days
+""".split())
+
+SECTION_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("must", re.compile(r"^(requirements?|required|qualifications?|minimum qualifications|basic qualifications|must[- ]haves?|what you(?:'ll)? (?:need|bring)|who you are|you have|skills)\b")),
+    ("nice", re.compile(r"^(preferred(?: qualifications)?|nice[- ]to[- ]haves?|bonus(?: points)?|pluses|good to have|desired)\b")),
+    ("duties", re.compile(r"^(responsibilities|what you(?:'ll)? do|the role|your impact|duties|day to day)\b")),
+    ("boiler", re.compile(r"^(about (?:us|the company|the team)|benefits|perks|compensation|equal opportunity|our values|why join)\b")),
+]
+SECTION_WEIGHT = {"intro": 1.0, "must": 1.6, "nice": 1.2, "duties": 1.0, "boiler": 0.25}
+
+KNOWN_SKILLS = frozenset(s.lower() for role in ROLE_LIB.values() for s in role["must"] + role["nice"])
+
+
+class TermHit(NamedTuple):
+    term: str
+    score: float
+    count: int
+    section: str                     # section contributing most weight
+    spans: List[Tuple[int, int]]     # character offsets into the original JD (first few)
+
+
+class JDAnalysis(NamedTuple):
+    must: List[TermHit]
+    nice: List[TermHit]
+    nots: List[TermHit]
+    sections: List[str]
+
+
+class DocFreq:
+    """In-memory document frequencies; `add` one JD at a time."""
+
+    def __init__(self) -> None:
+        self.n_docs = 0
+        self._df: Counter = Counter()
+        self._seen: Set[int] = set()
+
+    def add(self, terms: Iterable[str], fingerprint: Optional[int] = None) -> bool:
+        if fingerprint is not None:
+            if fingerprint in self._seen:
+                return False
+            self._seen.add(fingerprint)
+        self.n_docs += 1
+        self._df.update(set(terms))
+        return True
+
+    def df(self, term: str) -> int:
+        return self._df.get(term, 0)
+
+
+def idf(bg: Any, term: str) -> float:
+    n = getattr(bg, "n_docs", 0) if bg is not None else 0
+    if not n:
+        return 1.0
+    return math.log((n + 1) / (bg.df(term) + 1)) + 1.0
+
+
+def _section_of(line: str) -> Optional[str]:
+    s = line.strip().lower().lstrip("#*-• ").rstrip(":").strip()
+    if not s or len(s) > 60:
+        return None
+    for name, pat in SECTION_PATTERNS:
+        if pat.match(s):
+            return name
+    return None
+
+
+def tokenize(jd_text: str) -> Tuple[List[Tuple[str, int, int, bool, str]], List[str]]:
+    """Tokens as (token, start, end, breaks_before, section) plus the section order seen.
+
+    A heading line only switches the section; its own words ("what you'll bring",
+    "nice to have") are not tokens. Text after a heading's colon on the same line is.
+    """
+    text = normalize_quotes(jd_text or "").lower()
+    out: List[Tuple[str, int, int, bool, str]] = []
+    section, seen_sections, offset = "intro", ["intro"], 0
+    for line in text.splitlines(keepends=True):
+        body_at = 0
+        sec = _section_of(line)
+        if sec:
+            section = sec
+            seen_sections.append(sec)
+            body_at = line.find(":") + 1 or len(line)
+        prev_end = None
+        for m in _TOKEN.finditer(line, body_at):
+            tok, start, end = m.group(0), offset + m.start(), offset + m.end()
+            if tok.endswith("'s"):
+                tok, end = tok[:-2], end - 2  # possessive: "python's" counts as python
+            brk = prev_end is None or not _SOFT_GAP.match(text[prev_end:start])
+            out.append((tok, start, end, brk, section))
+            prev_end = end
+        offset += len(line)
+    return out, seen_sections
+
+
+def _stop(token: str) -> bool:
+    # contractions ("you'll", "we're") are one token each and never part of a term
+    return token in STOPWORDS or "'" in token or not _HAS_ALPHA.search(token)
+
+
+def candidates(tokens: List[Tuple[str, int, int, bool, str]], max_n: int = 3) -> Iterator[Tuple[str, int, int, str]]:
+    """(term, start, end, section) for every 1..max_n-gram inside one phrase without stopwords."""
+    for i in range(len(tokens)):
+        for n in range(1, max_n + 1):
+            j = i + n
+            if j > len(tokens) or _stop(tokens[j - 1][0]) or any(tokens[k][3] for k in range(i + 1, j)):
+                break  # longer n-grams from i would contain the same gap/stopword
+            if n == 1 and len(tokens[i][0]) < 2 and tokens[i][0] not in ("c", "r"):
+                continue
+            term = " ".join(t[0] for t in tokens[i:j])
+            yield SYNONYMS.get(term, term), tokens[i][1], tokens[j - 1][2], tokens[i][4]
+
+
+def jd_terms(jd_text: str) -> Set[str]:
+    """Distinct candidate terms of a JD, i.e. what a document-frequency store counts."""
+    tokens, _ = tokenize(jd_text)
+    return {t for t, _, _, _ in candidates(tokens)}
+
+
+def analyze_jd(jd_text: str, background: Any = None, top_must: int = 8, top_nice: int = 8,
+               min_count: int = 1) -> JDAnalysis:
+    tokens, sections = tokenize(jd_text)
+    weight: Dict[str, float] = {}
+    count: Counter = Counter()
+    by_section: Dict[str, Counter] = {}
+    spans: Dict[str, List[Tuple[int, int]]] = {}
+    for term, s, e, sec in candidates(tokens):
+        w = SECTION_WEIGHT.get(sec, 1.0)
+        weight[term] = weight.get(term, 0.0) + w
+        count[term] += 1
+        by_section.setdefault(term, Counter())[sec] += w
+        if len(spans.setdefault(term, [])) < 3:
+            spans[term].append((s, e))
+
+    scored: List[TermHit] = []
+    for term, w in weight.items():
+        known = term in KNOWN_SKILLS
+        if count[term] < min_count or (" " not in term and count[term] < 2 and not known and w < SECTION_WEIGHT["nice"]):
+            continue  # single mentions of generic unigrams are noise unless under a requirements/preferred heading
+        score = w * idf(background, term) * (1.5 if known else 1.0) * (1.0 + 0.15 * term.count(" "))
+        sec = by_section[term].most_common(1)[0][0]
+        scored.append(TermHit(term, round(score, 4), count[term], sec, spans[term]))
+    scored.sort(key=lambda h: (-h.score, h.term))
+
+    must: List[TermHit] = []
+    nice: List[TermHit] = []
+    picked: List[Tuple[str, int]] = []
+    for h in scored:
+        if h.section == "boiler":
+            continue
+        # skip a shorter term that only ever appears inside an already picked phrase
+        if any(f" {h.term} " in f" {p} " and h.count <= c for p, c in picked):
+            continue
+        bucket = nice if h.section == "nice" else must
+        cap = top_nice if bucket is nice else top_must
+        if len(bucket) < cap:
+            bucket.append(h)
+            picked.append((h.term, h.count))
+        elif bucket is must and len(nice) < top_nice:
+            nice.append(h)  # overflow from requirements becomes nice-to-have
+            picked.append((h.term, h.count))
+        if len(must) >= top_must and len(nice) >= top_nice:
+            break
+
+    text = normalize_quotes(jd_text or "").lower()
+    nots = []
+    for kw in AUTO_NOT_TERMS:
+        m = re.search(rf"\b{re.escape(kw)}\b", text)
+        if m:
+            nots.append(TermHit(kw, 0.0, 1, "intro", [(m.start(), m.end())]))
+    return JDAnalysis(must, nice, nots, sections)
+
+
+def analyze_stream(jds: Iterable[str], background: Any = None, learn: bool = True, **kw: Any) -> Iterator[JDAnalysis]:
+    """Analyze JDs lazily. With learn=True and an updatable background (has `add`),
+    each JD's candidate terms are added after it is scored (repeats counted once),
+    so the IDF sharpens as the dump streams by."""
+    bg = DocFreq() if background is None else background
+    for jd in jds:
+        res = analyze_jd(jd, bg, **kw)
+        if learn and hasattr(bg, "add"):
+            bg.add(jd_terms(jd), doc_fingerprint(jd))
+        yield res
+
+
+def analysis_to_dict(a: JDAnalysis, jd_text: str = "") -> Dict[str, Any]:
+    def rows(hits: List[TermHit]) -> List[Dict[str, Any]]:
+        return [{"term": h.term, "score": h.score, "count": h.count, "section": h.section,
+                 "evidence": [jd_text[s:e] for s, e in h.spans] if jd_text else h.spans} for h in hits]
+    return {"must": rows(a.must), "nice": rows(a.nice), "not": rows(a.nots), "sections": a.sections}
+
+
+def iter_jd_lines(lines: Iterable[str]) -> Iterator[str]:
+    """JSONL with a "text" (or "jd") field per line, or plain text with JDs separated by '---' lines."""
+    it = iter(lines)
+    first = next(it, None)
+    if first is None:
+        return
+    if first.lstrip().startswith("{"):
+        for line in itertools.chain([first], it):
+            if line.strip():
+                obj = json.loads(line)
+                yield obj.get("text") or obj.get("jd") or ""
+    else:
+        buf: List[str] = []
+        for line in itertools.chain([first], it):
+            if line.strip() == "---":
+                yield "".join(buf)
+                buf = []
+            else:
+                buf.append(line)
+        if "".join(buf).strip():
+            yield "".join(buf)
+
+
+def iter_jd_file(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        yield from iter_jd_lines(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rank must/nice/NOT suggestions for a dump of JDs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("analyze")
+    a.add_argument("path")
+    a.add_argument("--top", type=int, default=8)
+    a.add_argument("--store", action="store_true", help="use and grow the persistent DF store (see sourcing.docfreq)")
+    args = ap.parse_args(argv)
+    background = None
+    if args.store:
+        from .docfreq import open_store
+        background = open_store()
+    t0, n = time.perf_counter(), 0
+    texts = iter_jd_file(args.path)
+    pending: List[str] = []
+
+    def remember(it: Iterable[str]) -> Iterator[str]:
+        for t in it:
+            pending.append(t)
+            yield t
+
+    for res in analyze_stream(remember(texts), background, top_must=args.top, top_nice=args.top):
+        jd = pending.pop(0)
+        sys.stdout.write(json.dumps(analysis_to_dict(res, jd)) + "\n")
+        n += 1
+    dt = time.perf_counter() - t0
+    print(f"{n} JDs in {dt:.2f}s ({n / dt * 60 if dt else 0:.0f}/min)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
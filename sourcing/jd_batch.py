@@ -0,0 +1,248 @@
+# sourcing/jd_batch.py — jd_extract over a whole JD archive, vectorized
+#
+# One pass over the texts fills a CSR term-document count matrix (indptr,
+# indices, data as NumPy arrays; wrapped in scipy.sparse when SciPy is
+# installed) over the ROLE_LIB skill pool plus SYNONYMS aliases. Everything
+# after that is array work: per-document must/nice picks (rank by count
+# within each row via one lexsort), auto-NOT flags, and per-category
+# aggregates (np.add.at over category × term).
+#
+# Counting follows jd_extract: terms with a space, "/" or "-" are substring
+# counts, other terms are whole-word matches (one alternation scan per
+# document; whole words cannot overlap, so its match counts are exact).
+# Auto-NOT terms come from one zero-width lookahead scan, which also reports
+# overlapping matches. Ties are broken by vocabulary order rather than set
+# order, so results are reproducible. With synonyms=False the per-document
+# picks equal jd_extract's; the default folds aliases ("k8s") into their
+# canonical term ("kubernetes").
+#
+#   python -m sourcing.jd_batch archive.jsonl --docs picks.parquet --categories skills_by_category.csv
+#   (.jsonl rows may carry "id", "title" and "category"; .csv needs a "text" column; .txt is '---'-separated)
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import AUTO_NOT_TERMS, map_title_to_category, normalize_quotes
+from .jd import iter_jd_file
+from .taxonomy import ROLE_LIB, SYNONYMS
+
+_SUBSTRING = re.compile(r"[ /-]")
+
+
+class Vocab(NamedTuple):
+    terms: List[str]                  # column order (sorted canonical terms)
+    words: Dict[str, List[int]]       # whole-word term -> columns it counts toward
+    substrings: List[Tuple[str, int]]  # (substring term, column)
+
+
+def build_vocab(synonyms: bool = True) -> Vocab:
+    pool = {s.lower() for role in ROLE_LIB.values() for s in role["must"] + role["nice"]}
+    surface: Dict[str, str] = {t: t for t in pool}
+    if synonyms:
+        for alias, canon in SYNONYMS.items():
+            surface[alias.lower()] = canon.lower()
+    terms = sorted(set(surface.values()))
+    col = {t: i for i, t in enumerate(terms)}
+    words: Dict[str, List[int]] = {}
+    subs: List[Tuple[str, int]] = []
+    for s, canon in sorted(surface.items()):
+        if _SUBSTRING.search(s):
+            subs.append((s, col[canon]))
+        else:
+            words.setdefault(s, []).append(col[canon])
+    return Vocab(terms, words, subs)
+
+
+class JDRecord(NamedTuple):
+    doc_id: str
+    title: str
+    category: str
+    text: str
+
+
+class BatchResult(NamedTuple):
+    vocab: List[str]
+    doc_ids: List[str]
+    categories: List[str]
+    indptr: np.ndarray   # CSR row pointers, len n_docs + 1
+    indices: np.ndarray  # column (term) per nonzero
+    data: np.ndarray     # count per nonzero
+    must: np.ndarray     # bool per nonzero: picked as must-have
+    nice: np.ndarray     # bool per nonzero: picked as nice-to-have
+    nots: np.ndarray     # bool n_docs × len(AUTO_NOT_TERMS)
+
+    def matrix(self) -> Any:
+        """scipy.sparse.csr_matrix of counts (requires SciPy)."""
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self.data, self.indices, self.indptr), shape=(len(self.doc_ids), len(self.vocab)))
+
+    def rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.doc_ids)), np.diff(self.indptr))
+
+
+def count_matrix(texts: Iterable[str], vocab: Vocab) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(indptr, indices, data, nots) in one pass over `texts`."""
+    words, subs = vocab.words, vocab.substrings
+    word_re = re.compile(r"\b(?:" + "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r")\b") \
+        if words else None
+    not_col = {kw: i for i, kw in enumerate(AUTO_NOT_TERMS)}
+    not_re = re.compile(r"\b(?=(" + "|".join(re.escape(kw) for kw in AUTO_NOT_TERMS) + r")\b)")
+    indptr: List[int] = [0]
+    indices: List[int] = []
+    data: List[int] = []
+    nots: List[bool] = []
+    for text in texts:
+        jd = normalize_quotes((text or "").lower())
+        row: Dict[int, int] = {}
+        for tok, n in (Counter(word_re.findall(jd)).items() if word_re else ()):
+            for c in words[tok]:
+                row[c] = row.get(c, 0) + n
+        for s, c in subs:
+            n = jd.count(s)
+            if n:
+                row[c] = row.get(c, 0) + n
+        for c in sorted(row):
+            indices.append(c)
+            data.append(row[c])
+        indptr.append(len(indices))
+        flags = [False] * len(not_col)
+        for kw in not_re.findall(jd):
+            flags[not_col[kw]] = True
+        nots.extend(flags)
+    return (np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32),
+            np.asarray(data, dtype=np.int32), np.asarray(nots, dtype=bool).reshape(-1, len(not_col)))
+
+
+def select(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+           n_must: int = 8, n_nice: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row top-n_must / next-n_nice nonzeros by count (ties: lower column first)."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.lexsort((indices, -data, rows))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - indptr[rows[order]]
+    return rank < n_must, (rank >= n_must) & (rank < n_must + n_nice)
+
+
+def extract_batch(records: Sequence[JDRecord], synonyms: bool = True, n_must: int = 8, n_nice: int = 8) -> BatchResult:
+    vocab = build_vocab(synonyms)
+    indptr, indices, data, nots = count_matrix((r.text for r in records), vocab)
+    must, nice = select(indptr, indices, data, n_must, n_nice)
+    return BatchResult(vocab.terms, [r.doc_id for r in records], [r.category for r in records],
+                       indptr, indices, data, must, nice, nots)
+
+
+def doc_table(res: BatchResult) -> Dict[str, List[Any]]:
+    """Per-document picks, jd_extract-shaped (lists joined with '; '), as columns."""
+    rows = res.rows()
+    terms = np.asarray(res.vocab, dtype=object)
+    n = len(res.doc_ids)
+
+    def picked(mask: np.ndarray) -> List[str]:
+        out: List[List[str]] = [[] for _ in range(n)]
+        sel = np.flatnonzero(mask)
+        order = sel[np.lexsort((res.indices[sel], -res.data[sel], rows[sel]))]
+        for r, t in zip(rows[order].tolist(), terms[res.indices[order]].tolist()):
+            out[r].append(t)
+        return ["; ".join(x) for x in out]
+
+    not_terms = np.asarray(AUTO_NOT_TERMS, dtype=object)
+    return {"doc_id": res.doc_ids, "category": res.categories, "must": picked(res.must), "nice": picked(res.nice),
+            "not": ["; ".join(not_terms[m].tolist()) for m in res.nots]}
+
+
+def category_table(res: BatchResult, top: int = 0) -> Dict[str, List[Any]]:
+    """Per category × term: docs mentioning it, share of the category's docs, mentions, must/nice picks."""
+    cats, cat_idx = np.unique(np.asarray(res.categories, dtype=object), return_inverse=True)
+    k, v = len(cats), len(res.vocab)
+    row_cat = cat_idx[res.rows()]
+    docs = np.zeros((k, v), dtype=np.int64)
+    mentions = np.zeros((k, v), dtype=np.int64)
+    must = np.zeros((k, v), dtype=np.int64)
+    nice = np.zeros((k, v), dtype=np.int64)
+    np.add.at(docs, (row_cat, res.indices), 1)
+    np.add.at(mentions, (row_cat, res.indices), res.data)
+    np.add.at(must, (row_cat, res.indices), res.must.astype(np.int64))
+    np.add.at(nice, (row_cat, res.indices), res.nice.astype(np.int64))
+    n_docs = np.bincount(cat_idx, minlength=k)
+    ci, ti = np.nonzero(docs)
+    order = np.lexsort((ti, -docs[ci, ti], ci))
+    ci, ti = ci[order], ti[order]
+    if top:
+        first = np.searchsorted(ci, np.arange(k))
+        keep = (np.arange(len(ci)) - first[ci]) < top
+        ci, ti = ci[keep], ti[keep]
+    terms = np.asarray(res.vocab, dtype=object)
+    return {"category": cats[ci].tolist(), "term": terms[ti].tolist(), "docs": docs[ci, ti].tolist(),
+            "doc_share": np.round(docs[ci, ti] / n_docs[ci], 4).tolist(), "mentions": mentions[ci, ti].tolist(),
+            "must_picks": must[ci, ti].tolist(), "nice_picks": nice[ci, ti].tolist(), "category_docs": n_docs[ci].tolist()}
+
+
+def write_table(columns: Dict[str, List[Any]], path: str) -> None:
+    """Parquet for *.parquet (pandas + pyarrow), CSV otherwise."""
+    if path.endswith(".parquet"):
+        import pandas as pd
+        pd.DataFrame(columns).to_parquet(path, index=False)
+        return
+    names = list(columns)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(names)
+        w.writerows(zip(*(columns[c] for c in names)))
+
+
+def _record(i: int, obj: Dict[str, Any]) -> JDRecord:
+    text = obj.get("text") or obj.get("jd") or ""
+    title = obj.get("title") or ""
+    category = obj.get("category") or (map_title_to_category(title) if title else "unknown")
+    return JDRecord(str(obj.get("id", i)), title, category, text)
+
+
+def iter_records(path: str) -> Iterator[JDRecord]:
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for i, line in enumerate(x for x in f if x.strip()):
+                yield _record(i, json.loads(line))
+    elif path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                yield _record(i, row)
+    else:
+        for i, text in enumerate(iter_jd_file(path)):
+            yield JDRecord(str(i), "", "unknown", text)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Batch jd_extract over a JD archive with per-category skill aggregates.")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--docs", help="per-document picks (.parquet or .csv)")
+    ap.add_argument("--categories", help="per-category term aggregates (.parquet or .csv)")
+    ap.add_argument("--top", type=int, default=0, help="keep the top N terms per category (0 = all)")
+    ap.add_argument("--no-synonyms", action="store_true", help="count aliases separately, exactly like jd_extract")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    records = [r for p in args.paths for r in iter_records(p)]
+    res = extract_batch(records, synonyms=not args.no_synonyms)
+    dt = time.perf_counter() - t0
+    if args.docs:
+        write_table(doc_table(res), args.docs)
+    cats = category_table(res, args.top)
+    if args.categories:
+        write_table(cats, args.categories)
+    else:
+        for row in zip(*cats.values()):
+            print("\t".join(map(str, row)))
+    print(f"{len(records)} JDs, {len(res.data)} nonzeros in {dt:.2f}s ({len(records) / dt * 60 if dt else 0:.0f}/min)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# sourcing/llm.py — pluggable LLM backends (OpenAI, local OpenAI-compatible, mock)
+#
+# Every provider takes chat messages and returns the raw JSON text plus token
+# usage. ProviderRouter picks a provider by prompt size and falls through to the
+# next one on error, recording latency/cost per provider. A requested model pins
+# the route to the providers that serve it, so a call never silently runs on a
+# different model. complete() also
+# returns the winning call's model, tokens, latency and cost for per-call
+# accounting (sourcing.usage). Calls to the hosted key can go through a
+# shared RateLimiter (sourcing.ratelimit) that queues them per session and
+# priority.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .ratelimit import INTERACTIVE, RateLimiter, limiter_from_env
+
+Messages = List[Dict[str, str]]
+Usage = Dict[str, int]
+Prices = Dict[str, Tuple[float, float]]  # model -> (USD per 1K prompt tokens, USD per 1K completion tokens)
+
+
+class Completion(NamedTuple):
+    text: str
+    provider: str
+    model: str
+    usage: Usage
+    latency_s: float
+    cost_usd: float
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency_s = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float, usage: Usage, cost_usd: float, ok: bool = True) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.latency_s += latency_s
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.cost_usd += cost_usd
+
+    def as_dict(self) -> Dict[str, Any]:
+        ok = max(1, self.calls - self.errors)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency_ms": round(1000 * self.latency_s / ok, 1) if self.calls else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class LLMProvider:
+    """Base class: subclasses implement _complete()."""
+
+    name = "base"
+    shared_key = False  # calls count against the hosted key's rate limits
+    any_model = False   # serves whatever model is asked for, not just self.model
+
+    def __init__(self, model: str = "", cost_in_per_1k: float = 0.0, cost_out_per_1k: float = 0.0,
+                 prices: Optional[Prices] = None) -> None:
+        self.model = model
+        self.cost_in_per_1k = cost_in_per_1k
+        self.cost_out_per_1k = cost_out_per_1k
+        self.prices: Prices = dict(prices or {})
+        self.stats = ProviderStats()
+
+    def _complete(self, messages: Messages, model: str) -> Tuple[str, Usage]:
+        raise NotImplementedError
+
+    def cost(self, usage: Usage, model: Optional[str] = None) -> float:
+        cost_in, cost_out = self.prices.get(model or self.model, (self.cost_in_per_1k, self.cost_out_per_1k))
+        return (usage.get("prompt_tokens", 0) * cost_in + usage.get("completion_tokens", 0) * cost_out) / 1000.0
+
+    def complete_json(self, messages: Messages, model: Optional[str] = None) -> Tuple[str, Usage]:
+        t0 = time.perf_counter()
+        model = model or self.model
+        try:
+            text, usage = self._complete(messages, model)
+        except Exception:
+            self.stats.record(time.perf_counter() - t0, {}, 0.0, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - t0, usage, self.cost(usage, model))
+        return text, usage
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+def prompt_chars(messages: Messages) -> int:
+    return sum(len(m.get("content", "") or "") for m in messages)
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI SDK backend; set base_url to target a local OpenAI-compatible server (llama.cpp, vLLM)."""
+
+    def __init__(self, api_key: str, model: str, name: str = "openai", base_url: Optional[str] = None,
+                 cost_in_per_1k: float = 0.0, cost_out_per_1k: float = 0.0, timeout: float = 60.0,
+                 prices: Optional[Prices] = None) -> None:
+        super().__init__(model, cost_in_per_1k, cost_out_per_1k, prices)
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.shared_key = base_url is None
+        self.any_model = base_url is None  # the hosted API takes any model name; a local server runs one
+        self._client = None
+
+    def client(self):
+        if self._client is None:
+            try:
+                from openai import OpenAI  # Official OpenAI SDK (v1+)
+            except Exception as e:
+                raise ProviderError("OpenAI SDK not installed. Add `openai` to requirements.") from e
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    def _complete(self, messages: Messages, model: str) -> Tuple[str, Usage]:
+        client = self.client()
+        msgs = [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in messages]
+        # Chat Completions with JSON mode
+        try:
+            resp = client.chat.completions.create(
+                model=model, temperature=0.2, response_format={"type": "json_object"}, messages=msgs,
+            )
+            txt = resp.choices[0].message.content or ""
+            u = getattr(resp, "usage", None)
+            usage = {
+                "prompt_tokens": getattr(u, "prompt_tokens", 0) or estimate_tokens(json.dumps(msgs)),
+                "completion_tokens": getattr(u, "completion_tokens", 0) or estimate_tokens(txt),
+            }
+            return txt, usage
+        except Exception:
+            if self.base_url:
+                raise  # local servers rarely implement the Responses API
+        # Responses API fallback (defensive)
+        resp2 = client.responses.create(model=model, temperature=0.2, input=msgs)
+        txt = getattr(resp2, "output_text", None)
+        if not txt:
+            try:
+                parts = resp2.output[0].content  # type: ignore[attr-defined]
+                txt = "".join([p.text for p in parts if getattr(p, "type", "") == "output_text"])
+            except Exception:
+                txt = ""
+        u = getattr(resp2, "usage", None)
+        usage = {
+            "prompt_tokens": getattr(u, "input_tokens", 0) or estimate_tokens(json.dumps(msgs)),
+            "completion_tokens": getattr(u, "output_tokens", 0) or estimate_tokens(txt),
+        }
+        return txt, usage
+
+
+_MOCK_SKILLS = [
+    "python", "java", "go", "sql", "kubernetes", "docker", "terraform", "aws", "gcp", "azure",
+    "spark", "airflow", "react", "typescript", "graphql", "grpc", "kafka", "postgres", "redis",
+    "pytorch", "tensorflow", "mlops", "ci/cd", "linux", "observability", "stakeholder management",
+]
+_MOCK_COMPANIES = [
+    "Google", "Meta", "Apple", "Amazon", "Netflix", "Microsoft", "NVIDIA", "Uber", "Airbnb",
+    "Stripe", "Databricks", "Snowflake", "Datadog", "Cloudflare", "Shopify", "Atlassian",
+    "Salesforce", "Figma", "Notion", "Ramp", "Plaid", "Coinbase", "DoorDash", "Instacart",
+]
+_MOCK_NOT = ["intern", "internship", "student", "bootcamp", "recruiter", "sales", "help desk", "qa tester"]
+_MOCK_TITLE_VARIANTS = [
+    "{t}", "Senior {t}", "Staff {t}", "Principal {t}", "Lead {t}", "{t} II", "{t} III",
+    "Sr {t}", "Junior {t}", "Associate {t}", "{t} (Contract)", "Head of {t}",
+]
+
+
+class MockProvider(LLMProvider):
+    """Deterministic offline provider: same prompt -> same role pack, optional simulated latency."""
+
+    name = "mock"
+    shared_key = True  # stands in for the hosted API in offline and load tests
+    any_model = True
+
+    def __init__(self, latency_s: float = 0.0, model: str = "mock", prices: Optional[Prices] = None) -> None:
+        super().__init__(model, prices=prices)
+        self.latency_s = latency_s
+
+    def _complete(self, messages: Messages, model: str) -> Tuple[str, Usage]:
+        prompt = "\n".join(m.get("content", "") or "" for m in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        title = "Software Engineer"
+        for line in prompt.splitlines():
+            if line.startswith("Title:"):
+                title = line.split(":", 1)[1].strip() or title
+                break
+
+        def pick(pool: List[str], n: int, off: int) -> List[str]:
+            start = (seed + off) % len(pool)
+            return [pool[(start + i) % len(pool)] for i in range(n)]
+
+        skills = pick(_MOCK_SKILLS, 14, 0)
+        pack = {
+            "role_category": "eng",
+            "titles": [v.format(t=title) for v in _MOCK_TITLE_VARIANTS],
+            "must_have": skills[:7],
+            "nice_to_have": skills[7:14],
+            "negatives": list(_MOCK_NOT),
+            "qualifiers": ["remote", "enterprise"],
+            "target_companies": pick(_MOCK_COMPANIES, 18, 7),
+            "notes": "Start with current titles; add 2–3 anchor skills if volume is high.",
+        }
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        txt = json.dumps(pack)
+        return txt, {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(txt)}
+
+
+class ProviderRouter:
+    """Route by prompt size: rules are (max_prompt_chars, provider_name), checked in order.
+
+    The chosen provider is tried first; remaining providers (in registration
+    order) act as fallbacks when it errors or returns nothing. A requested
+    model narrows the route to the providers configured with that model, or
+    else to the ones that take any model (the hosted API).
+    """
+
+    def __init__(self, providers: List[LLMProvider], rules: Optional[List[Tuple[int, str]]] = None,
+                 limiter: Optional[RateLimiter] = None) -> None:
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers: Dict[str, LLMProvider] = {p.name: p for p in providers}
+        self.rules = [(n, name) for n, name in (rules or []) if name in self.providers]
+        self.limiter = limiter
+
+    def route(self, messages: Messages, model: Optional[str] = None) -> List[LLMProvider]:
+        size = prompt_chars(messages)
+        first = next((self.providers[name] for limit, name in self.rules if size <= limit), None)
+        order = [first] if first else []
+        order += [p for p in self.providers.values() if p is not first]
+        if model:
+            order = [p for p in order if p.model == model] or [p for p in order if p.any_model]
+        return order
+
+    def complete(self, messages: Messages, model: Optional[str] = None, session: str = "",
+                 priority: int = INTERACTIVE) -> Completion:
+        """First non-empty answer along the route; with `model`, only from providers that serve it.
+
+        Providers on the shared key wait for the limiter first; `session` and `priority` place the call in its queue.
+        """
+        errors: List[str] = []
+        route = self.route(messages, model)
+        if not route:
+            raise ProviderError(f"no configured provider serves model {model!r} (providers: {', '.join(self.providers)})")
+        for p in route:
+            used = model or p.model
+            ticket = None
+            t0 = time.perf_counter()
+            try:
+                if self.limiter and p.shared_key:
+                    est = max(1, prompt_chars(messages) // 4) + self.limiter.completion_tokens
+                    ticket = self.limiter.acquire(est, session, priority)
+                    t0 = time.perf_counter()  # latency excludes the queue wait
+                text, usage = p.complete_json(messages, used)
+            except Exception as e:
+                if ticket:
+                    ticket.settle(0)
+                    retry_after = rate_limited(e)
+                    if retry_after is not None:
+                        self.limiter.backoff(retry_after)
+                errors.append(f"{p.name}: {e}")
+                continue
+            if ticket:
+                ticket.settle(usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+            if text:
+                return Completion(text, p.name, used, usage, time.perf_counter() - t0, p.cost(usage, used))
+            errors.append(f"{p.name}: empty response")
+        raise ProviderError("; ".join(errors) or "no providers")
+
+    def complete_json(self, messages: Messages, model: Optional[str] = None) -> Tuple[str, str]:
+        """Returns (text, provider_name)."""
+        c = self.complete(messages, model)
+        return c.text, c.provider
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: p.stats.as_dict() for name, p in self.providers.items()}
+
+
+def rate_limited(err: BaseException, default_s: float = 10.0) -> Optional[float]:
+    """Seconds to back off when `err` is an HTTP 429 (honouring Retry-After), else None."""
+    if getattr(err, "status_code", None) != 429 and type(err).__name__ != "RateLimitError":
+        return None
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        return max(1.0, float(headers.get("retry-after", default_s)))
+    except (TypeError, ValueError):
+        return default_s
+
+
+def parse_prices(spec: str) -> Prices:
+    """"model=in/out,…" (USD per 1K tokens) -> {model: (in, out)}; malformed entries are skipped."""
+    prices: Prices = {}
+    for item in (spec or "").split(","):
+        model, _, rates = item.strip().partition("=")
+        cost_in, _, cost_out = rates.partition("/")
+        try:
+            prices[model.strip()] = (float(cost_in), float(cost_out or cost_in))
+        except ValueError:
+            continue
+    return prices
+
+
+def router_from_env(openai_api_key: Optional[str], default_model: str, env: Optional[Dict[str, str]] = None) -> ProviderRouter:
+    """Build the router from environment settings.
+
+    LLM_PROVIDER=mock            offline deterministic provider only
+    LLM_LOCAL_BASE_URL           e.g. http://localhost:8080/v1 (enables the local provider)
+    LLM_LOCAL_MODEL              model name served locally (default "local")
+    LLM_LOCAL_MAX_PROMPT_CHARS   prompts up to this size go local first (default 3000), unless
+                                 the call asks for a model other than LLM_LOCAL_MODEL
+    OPENAI_COST_IN_PER_1K / OPENAI_COST_OUT_PER_1K   USD per 1K tokens for cost tracking
+    LLM_MODEL_PRICES             per-model overrides, e.g. "gpt-4o=0.0025/0.01,gpt-4o-mini=0.00015/0.0006"
+    AI_RPM / AI_TPM / AI_RATE_FILE   shared-key rate limits (see sourcing.ratelimit)
+    """
+    env = os.environ if env is None else env
+    prices = parse_prices(env.get("LLM_MODEL_PRICES", ""))
+    limiter = limiter_from_env(env)
+    if env.get("LLM_PROVIDER", "").lower() == "mock":
+        return ProviderRouter([MockProvider(latency_s=float(env.get("LLM_MOCK_LATENCY_S", "0") or 0), prices=prices)], limiter=limiter)
+    providers: List[LLMProvider] = []
+    rules: List[Tuple[int, str]] = []
+    local_url = env.get("LLM_LOCAL_BASE_URL", "")
+    if local_url:
+        providers.append(OpenAIProvider(api_key=env.get("LLM_LOCAL_API_KEY", "sk-local"), model=env.get("LLM_LOCAL_MODEL", "local"),
+                                        name="local", base_url=local_url, timeout=120.0, prices=prices))
+        rules.append((int(env.get("LLM_LOCAL_MAX_PROMPT_CHARS", "3000")), "local"))
+    if openai_api_key:
+        providers.append(OpenAIProvider(api_key=openai_api_key, model=default_model, name="openai",
+                                        cost_in_per_1k=float(env.get("OPENAI_COST_IN_PER_1K", "0.00015")),
+                                        cost_out_per_1k=float(env.get("OPENAI_COST_OUT_PER_1K", "0.0006")), prices=prices))
+    if not providers:
+        raise ProviderError("Missing OPENAI_API_KEY (env var or st.secrets) and no LLM_LOCAL_BASE_URL configured.")
+    return ProviderRouter(providers, rules, limiter)
@@ -0,0 +1,374 @@
+# sourcing/loadtest.py — simulated recruiters against a running app.py server
+#
+# Drives a real `streamlit run` server over its websocket protocol (the same
+# BackMsg/ForwardMsg protobufs the browser sends), so reruns from concurrent
+# sessions contend exactly as they do in production. AppTest can't do this:
+# it runs one script at a time and swaps process-global runtime state.
+#
+# Each simulated recruiter loads the page, types a title, clicks Build, waits
+# for the background AI merge, toggles anchors and IC-only, and downloads the
+# export. Switching tabs is client-side in Streamlit (no rerun), so it costs
+# nothing here. The server is started with the mock LLM (LLM_PROVIDER=mock,
+# LLM_MOCK_LATENCY_S) unless --url points at one that is already running.
+#
+# The AI merge lands through the page's run_every fragment poller. In a browser,
+# timers send those fragment reruns. Session plays that part: it tracks the
+# auto_rerun / stop_auto_rerun messages and sends the fragment reruns at their
+# interval until the page stops polling. Each poll is an "ai_poll" sample. The
+# time from Build returning to the merged page is one "ai_merge" sample, so
+# --llm-latency shows up in "merge p95".
+#
+# Users ramp 1, 2, 4, … up to --max-users; each level reports rerun latency
+# percentiles, throughput, server RSS and RSS per session, and the saturation
+# point is the first level where p95 exceeds --slo-ms or throughput stops growing.
+#
+#   python -m sourcing.loadtest app.py --max-users 32 --llm-latency 1.5 [--json report.json]
+#
+# Needs the `websockets` package (installed with Streamlit's starlette server;
+# `pip install websockets` otherwise).
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from .memory import rss_mb
+
+TITLES = ["Senior Site Reliability Engineer", "Staff ML Engineer", "Backend Engineer", "Senior Data Scientist",
+          "Platform Engineer", "Principal Software Engineer", "DevOps Engineer", "Applied Scientist"]
+
+TITLE_INPUT = "Search by job title"
+BUILD_BUTTON = "✨ Build sourcing pack"
+ANCHORS = "Use must-have anchors (AND)"
+IC_ONLY = "IC-only (exclude managers)"
+DOWNLOAD = "Download pack (.txt)"
+
+
+class Sample(NamedTuple):
+    step: str
+    ms: float
+    ok: bool
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(p / 100 * len(s) + 0.5)) - 1))]
+
+
+class Server:
+    """`streamlit run app` on a free port with the mock LLM; use as a context manager."""
+
+    def __init__(self, app: str, llm_latency_s: float, extra_env: Optional[Dict[str, str]] = None) -> None:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._tmp = tempfile.TemporaryDirectory()
+        env = dict(os.environ, LLM_PROVIDER="mock", LLM_MOCK_LATENCY_S=str(llm_latency_s),
+                   DOCFREQ_FILE=os.path.join(self._tmp.name, "docfreq.bin"), **(extra_env or {}))
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.abspath(app), "--server.headless", "true",
+             "--server.port", str(self.port), "--browser.gatherUsageStats", "false"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.proc.pid
+
+    def __enter__(self) -> "Server":
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(self.url + "/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.25)
+        self.__exit__()
+        raise RuntimeError("streamlit server did not become healthy within 60s")
+
+    def __exit__(self, *exc: Any) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self._tmp.cleanup()
+
+
+class Session:
+    """One browser tab: keeps widget values across reruns and times each rerun."""
+
+    def __init__(self, base_url: str, timeout_s: float = 120.0) -> None:
+        self.base_url = base_url
+        self.timeout_s = timeout_s
+        self.widgets: Dict[Tuple[str, str], Any] = {}  # (element type, label) -> widget proto
+        self.values: Dict[str, WidgetState] = {}        # widget id -> state resent on every rerun
+        self.auto_reruns: Dict[str, float] = {}         # run_every fragment id -> interval, seconds
+        self.samples: List[Sample] = []
+        self.ws: Any = None
+
+    async def __aenter__(self) -> "Session":
+        import websockets
+        ws_url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.ws.close()
+
+    def _widget(self, kind: str, label: str) -> Any:
+        w = self.widgets.get((kind, label))
+        if w is None:
+            raise LookupError(f"{kind} {label!r} not on the page")
+        return w
+
+    async def rerun(self, step: str, triggers: Sequence[str] = (), fragment_id: str = "") -> float:
+        """Send one rerun (of the whole script, or of `fragment_id` as its timer would) and time it to completion."""
+        bm = BackMsg()
+        bm.rerun_script.query_string = ""
+        bm.rerun_script.widget_states.widgets.extend(self.values.values())
+        bm.rerun_script.widget_states.widgets.extend(WidgetState(id=i, trigger_value=True) for i in triggers)
+        if fragment_id:
+            bm.rerun_script.fragment_id = fragment_id
+            bm.rerun_script.is_auto_rerun = True
+        t0 = time.perf_counter()
+        ok = True
+        full = not fragment_id  # fragment runs get new_session too, but only full runs re-register pollers
+        await self.ws.send(bm.SerializeToString())
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout_s))
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                if full:
+                    self.auto_reruns.clear()  # a full run re-registers the pollers it still renders
+            elif kind == "auto_rerun":
+                self.auto_reruns[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+            elif kind == "stop_auto_rerun":
+                for fid in msg.stop_auto_rerun.fragment_ids:
+                    self.auto_reruns.pop(fid, None)
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                el = msg.delta.new_element
+                et = el.WhichOneof("type")
+                if et == "exception":
+                    ok = False
+                proto = getattr(el, et)
+                if getattr(proto, "id", "") and hasattr(proto, "label"):
+                    self.widgets[(et, proto.label)] = proto
+            elif kind == "script_finished":
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+                full = True  # st.rerun() ended this run early; a full run follows on the same request
+        ms = (time.perf_counter() - t0) * 1000
+        self.samples.append(Sample(step, ms, ok))
+        return ms
+
+    async def await_pollers(self, step: str) -> Optional[float]:
+        """Send fragment reruns at their run_every interval until the page stops polling; None if it wasn't."""
+        if not self.auto_reruns:
+            return None
+        t0 = time.perf_counter()
+        ok = True
+        while self.auto_reruns:
+            if time.perf_counter() - t0 > self.timeout_s:
+                ok = False
+                break
+            fid, interval = next(iter(self.auto_reruns.items()))
+            await asyncio.sleep(interval)
+            await self.rerun("ai_poll", fragment_id=fid)
+        ms = (time.perf_counter() - t0) * 1000
+        self.samples.append(Sample(step, ms, ok))
+        return ms
+
+    async def type_text(self, label: str, text: str) -> float:
+        w = self._widget("text_input", label)
+        self.values[w.id] = WidgetState(id=w.id, string_value=text)
+        return await self.rerun("type")
+
+    async def click(self, label: str, step: str) -> float:
+        return await self.rerun(step, [self._widget("button", label).id])
+
+    async def check(self, label: str, value: bool, step: str) -> float:
+        w = self._widget("checkbox", label)
+        self.values[w.id] = WidgetState(id=w.id, bool_value=value)
+        return await self.rerun(step)
+
+    async def download(self, label: str) -> float:
+        url = self.base_url + self._widget("download_button", label).url
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            await asyncio.to_thread(lambda: urllib.request.urlopen(url, timeout=self.timeout_s).read())
+        except OSError:
+            ok = False
+        ms = (time.perf_counter() - t0) * 1000
+        self.samples.append(Sample("download", ms, ok))
+        return ms
+
+
+async def recruiter(base_url: str, title: str, think_s: float, rng: random.Random) -> List[Sample]:
+    """Scripted session: load, type title, Build, wait for the AI merge, anchors on, IC-only on, download."""
+    async def think() -> None:
+        if think_s:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think_s)
+
+    async with Session(base_url) as s:
+        try:
+            await s.rerun("load")
+            await think()
+            await s.type_text(TITLE_INPUT, title)
+            await s.click(BUILD_BUTTON, "build")
+            await s.await_pollers("ai_merge")  # no-op when the AI pack was cached or AI is off
+            await think()
+            await s.check(ANCHORS, True, "anchors")
+            await think()
+            await s.check(IC_ONLY, True, "ic_only")
+            await think()  # tab switches happen here, in the browser only
+            await s.download(DOWNLOAD)
+        except (LookupError, asyncio.TimeoutError, OSError) as e:
+            s.samples.append(Sample(f"error:{type(e).__name__}", 0.0, False))
+        return s.samples
+
+
+class LevelReport(NamedTuple):
+    users: int
+    reruns: int
+    errors: int
+    seconds: float
+    reruns_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    build_p95_ms: float
+    ai_merge_p95_ms: float
+    rss_mb: Optional[float]
+    rss_per_session_mb: Optional[float]
+
+
+async def run_level(base_url: str, users: int, iterations: int, think_s: float, unique_titles: bool,
+                    pid: Optional[int], baseline_rss: Optional[float], seed: int) -> LevelReport:
+    peak = [rss_mb(pid)]
+    done = asyncio.Event()
+
+    async def sample_rss() -> None:
+        while not done.is_set():
+            r = rss_mb(pid)
+            if r is not None:
+                peak[0] = max(peak[0] or 0.0, r)
+            await asyncio.sleep(0.25)
+
+    async def user(u: int) -> List[Sample]:
+        rng = random.Random(seed * 1000 + u)
+        out: List[Sample] = []
+        for i in range(iterations):
+            title = rng.choice(TITLES) + (f" #{users}-{u}-{i}" if unique_titles else "")
+            out += await recruiter(base_url, title, think_s, rng)
+        return out
+
+    sampler = asyncio.create_task(sample_rss())
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(user(u) for u in range(users)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await sampler
+    samples = [s for r in results for s in r]
+    # user-driven reruns only: fragment polls are cheap and would flatter the percentiles
+    reruns = [s.ms for s in samples if s.ok and s.step not in ("download", "ai_poll", "ai_merge") and not s.step.startswith("error")]
+    builds = [s.ms for s in samples if s.ok and s.step == "build"]
+    merges = [s.ms for s in samples if s.ok and s.step == "ai_merge"]
+    errors = sum(1 for s in samples if not s.ok)
+    rss = peak[0]
+    per = (rss - baseline_rss) / users if rss is not None and baseline_rss is not None else None
+    return LevelReport(users, len(reruns), errors, round(elapsed, 2), round(len(reruns) / elapsed, 2) if elapsed else 0.0,
+                       round(percentile(reruns, 50), 1), round(percentile(reruns, 95), 1), round(percentile(reruns, 99), 1),
+                       round(percentile(builds, 95), 1), round(percentile(merges, 95), 1), None if rss is None else round(rss, 1),
+                       None if per is None else round(per, 2))
+
+
+def saturation_point(levels: Sequence[LevelReport], slo_ms: float, min_gain: float = 1.1) -> Optional[int]:
+    """First user count where p95 breaks the SLO, or where throughput grew by less than `min_gain`×."""
+    for prev, cur in zip([None, *levels], levels):
+        if cur.p95_ms > slo_ms or (prev is not None and cur.reruns_per_s < prev.reruns_per_s * min_gain):
+            return cur.users
+    return None
+
+
+def format_report(levels: Sequence[LevelReport], sat: Optional[int], slo_ms: float) -> str:
+    head = f"{'users':>5} {'reruns':>7} {'err':>4} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+           f"{'build p95':>9} {'merge p95':>9} {'RSS MB':>7} {'MB/sess':>7}"
+    lines = [head]
+    for r in levels:
+        lines.append(f"{r.users:>5} {r.reruns:>7} {r.errors:>4} {r.reruns_per_s:>8.2f} {r.p50_ms:>8.0f} {r.p95_ms:>8.0f} "
+                     f"{r.p99_ms:>8.0f} {r.build_p95_ms:>9.0f} {r.ai_merge_p95_ms:>9.0f} {r.rss_mb if r.rss_mb is not None else '-':>7} "
+                     f"{r.rss_per_session_mb if r.rss_per_session_mb is not None else '-':>7}")
+    lines.append(f"saturation: {sat} concurrent users (p95 > {slo_ms:.0f} ms or throughput flat)" if sat
+                 else f"no saturation up to {levels[-1].users if levels else 0} users (p95 SLO {slo_ms:.0f} ms)")
+    return "\n".join(lines)
+
+
+async def ramp(base_url: str, max_users: int, iterations: int, think_s: float, unique_titles: bool,
+               pid: Optional[int], slo_ms: float, stop_at_saturation: bool = True) -> List[LevelReport]:
+    await recruiter(base_url, TITLES[0], 0.0, random.Random(0))  # warm imports and process-wide caches
+    baseline = rss_mb(pid)
+    levels: List[LevelReport] = []
+    users = 1
+    while users <= max_users:
+        rep = await run_level(base_url, users, iterations, think_s, unique_titles, pid, baseline, seed=users)
+        levels.append(rep)
+        print(format_report(levels[-1:], None, slo_ms).splitlines()[1], file=sys.stderr)
+        if stop_at_saturation and saturation_point(levels, slo_ms) is not None and users > 1:
+            break
+        users *= 2
+    return levels
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Ramp simulated recruiter sessions against a Streamlit app.")
+    ap.add_argument("app", nargs="?", default="app.py")
+    ap.add_argument("--url", help="target an already running server instead of starting one (no mock LLM control)")
+    ap.add_argument("--pid", type=int, help="server pid for RSS when using --url")
+    ap.add_argument("--max-users", type=int, default=16)
+    ap.add_argument("--iterations", type=int, default=2, help="scripted sessions per user per level")
+    ap.add_argument("--think", type=float, default=0.5, help="mean think time between steps, seconds")
+    ap.add_argument("--llm-latency", type=float, default=1.0, help="mock LLM latency, seconds")
+    ap.add_argument("--unique-titles", action="store_true", help="defeat the AI cache: every Build calls the LLM")
+    ap.add_argument("--slo-ms", type=float, default=2000.0, help="p95 rerun latency considered saturated")
+    ap.add_argument("--full", action="store_true", help="keep ramping past saturation")
+    ap.add_argument("--json", help="write the report as JSON")
+    args = ap.parse_args(argv)
+    if importlib.util.find_spec("websockets") is None:
+        print("sourcing.loadtest needs the `websockets` package: pip install websockets", file=sys.stderr)
+        return 2
+
+    def go(base_url: str, pid: Optional[int]) -> List[LevelReport]:
+        return asyncio.run(ramp(base_url, args.max_users, args.iterations, args.think, args.unique_titles,
+                                pid, args.slo_ms, not args.full))
+
+    if args.url:
+        levels = go(args.url.rstrip("/"), args.pid)
+    else:
+        with Server(args.app, args.llm_latency) as srv:
+            levels = go(srv.url, srv.pid)
+    sat = saturation_point(levels, args.slo_ms)
+    print(format_report(levels, sat, args.slo_ms))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"levels": [r._asdict() for r in levels], "saturation_users": sat, "slo_ms": args.slo_ms}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+# sourcing/memory.py — memory accounting for caches and session state
+#
+# deep_sizeof() walks containers, arrays, NamedTuples and plain objects and
+# counts each object once, which is close enough to find the key or cache
+# that grows. SizedLRU is the bounded cache used for AI role packs: entries
+# are stored serialized, so the byte cap is exact, and both the entry and byte
+# limits can be changed while the process runs. process_caches() gathers the
+# other process-wide caches in one table.
+
+import hashlib
+import json
+import sys
+import threading
+import tracemalloc
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    import orjson  # Optional fast JSON
+except Exception:
+    orjson = None
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate bytes reachable from `obj`; shared objects are counted once."""
+    seen = set() if seen is None else seen
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, type(None), array)):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Resident set size of `pid` (default: this process) in MB; Linux /proc only, None elsewhere."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def text_digest(text: str) -> str:
+    """Short stable key for long text (e.g. an 8k-char JD) so cache keys stay small."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:24] if text else ""
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value) if orjson is not None else json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class SizedLRU:
+    """Thread-safe LRU of JSON-serializable values bounded by entry count and total bytes (0 = unbounded)."""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 << 20) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return _loads(data)  # a fresh copy per caller, like st.cache_data
+
+    def put(self, key: Hashable, value: Any) -> None:
+        data = _dumps(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._data[key] = data
+            self.nbytes += len(data)
+            self._evict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value, or compute() and store it; exceptions from compute() are not cached."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def resize(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> int:
+        """Change the caps; returns how many entries were evicted to fit."""
+        with self._lock:
+            before = self.evictions
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+            return self.evictions - before
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def _evict(self) -> None:
+        while self._data and ((self.max_entries and len(self._data) > self.max_entries)
+                              or (self.max_bytes and self.nbytes > self.max_bytes)):
+            _, data = self._data.popitem(last=False)
+            self.nbytes -= len(data)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "max_entries": self.max_entries, "bytes": self.nbytes,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+def session_key_sizes(states: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per session_state key across sessions: sessions holding it, total and max bytes; largest first."""
+    agg: Dict[str, List[int]] = {}
+    for state in states:
+        for k, v in state.items():
+            size = deep_sizeof(v)
+            a = agg.setdefault(str(k), [0, 0, 0])
+            a[0] += 1
+            a[1] += size
+            a[2] = max(a[2], size)
+    rows = [{"key": k, "sessions": n, "total_bytes": tot, "max_bytes": mx, "avg_bytes": tot // n}
+            for k, (n, tot, mx) in agg.items()]
+    rows.sort(key=lambda r: -r["total_bytes"])
+    return rows
+
+
+def process_caches() -> List[Dict[str, Any]]:
+    """Entries and approximate bytes of the process-wide caches in the sourcing package."""
+    from .companies import COMPANY_INDEX
+    from .core import TERM_CACHES
+    from .entities import normalize_company
+    from .render import card_header_html, hero_html, hint_html
+    from .terms import TERMS
+
+    rows: List[Dict[str, Any]] = []
+    cs = COMPANY_INDEX.stats()
+    rows.append({"cache": "company fragments", "entries": cs["entries"], "max_entries": cs["maxsize"],
+                 "bytes": deep_sizeof(COMPANY_INDEX._cache), "hit_rate": cs["hit_rate"]})
+    for name, cache in TERM_CACHES.items():
+        rows.append({"cache": name, "entries": len(cache), "max_entries": cache.maxsize, "bytes": deep_sizeof(cache),
+                     "hit_rate": None})
+    for name, fn in (("normalize_company", normalize_company), ("hero_html", hero_html),
+                     ("card_header_html", card_header_html), ("hint_html", hint_html)):
+        ci = fn.cache_info()
+        total = ci.hits + ci.misses
+        rows.append({"cache": name, "entries": ci.currsize, "max_entries": ci.maxsize, "bytes": None,
+                     "hit_rate": round(ci.hits / total, 3) if total else 0.0})
+    rows.append({"cache": "term table (refcounted)", "entries": len(TERMS), "max_entries": None,
+                 "bytes": deep_sizeof(TERMS._text) + TERMS.nbytes(), "hit_rate": None})
+    return rows
+
+
+def tracemalloc_start(frames: int = 10) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def tracemalloc_stop() -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def tracemalloc_top(limit: int = 15, group_by: str = "lineno") -> Tuple[int, List[Dict[str, Any]]]:
+    """(traced bytes, top allocation sites) while tracing; (0, []) otherwise."""
+    if not tracemalloc.is_tracing():
+        return 0, []
+    snap = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    stats = snap.statistics(group_by)
+    rows = []
+    for s in stats[:limit]:
+        frame = s.traceback[0]
+        rows.append({"site": f"{frame.filename}:{frame.lineno}", "bytes": s.size, "blocks": s.count})
+    return tracemalloc.get_traced_memory()[0], rows
@@ -0,0 +1,200 @@
+# sourcing/microbench.py — micro-benchmarks for the sourcing.core string builders
+#
+# Each function is timed in three versions:
+#   core        sourcing.core (what all three apps import)
+#   reference   sourcing.core before tuning (sourcing.reference)
+#   app         the inline helper app_pretty.py / app_wow.py used to define, where one existed
+#
+# The fixtures are realistic: ROLE_LIB terms, SMART_NOT and synonyms with case and
+# whitespace duplicates, a few quoted, hyphenated and parenthesised terms, real
+# titles, and a ~4 KB JD. The default "warm" mode repeats the same inputs, as
+# reruns do. "--cold" gives every call terms it has never seen and clears the
+# term caches before each pass, so cache misses are priced in.
+#
+# Versions are timed interleaved: each of --repeat rounds runs one pass of every
+# version back to back, in a rotated order, with GC off. The speedup is the
+# median over rounds of reference/core for passes from the same round. Load or
+# frequency drift between rounds cancels in each ratio. A round hit by another
+# process only moves the median if most rounds are hit. The reference is also
+# timed a second time as its own A/A control. How far that median ratio lands
+# from 1 ("noise") is the resolution of this run on this machine. The *_ns
+# columns are best passes, for scale.
+#
+# The inline app helpers have different semantics (no escaping, no synonyms,
+# substring skill counts), even where one fixture happens to come out the same
+# (app_same; tie order there follows the string hash seed), so they are timed
+# for scale only (vs_app). --check exits 1 when core returns something other
+# than the reference, or is slower than it by more than --tolerance plus the
+# measured noise.
+#
+#   python -m sourcing.microbench [--cold] [--repeat 21] [--check] [--json]
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import core, reference
+from .taxonomy import ROLE_LIB, SMART_NOT, SYNONYMS
+
+FUNCTIONS = ("unique_preserve", "canonicalize", "or_group", "map_title_to_category", "expand_titles",
+             "build_keywords", "build_keywords_two_tier", "jd_extract", "string_health_report")
+
+TITLES = ["Senior Software Engineer", "Staff Machine Learning Engineer", "Site Reliability Engineer II",
+          "Backend dev", "Principal Data Scientist, Ads", "DevOps Engineer", "Frontend Engineer (React)",
+          "GenAI Platform Engineer", "Engineering Manager", "Applied Scientist - Search"]
+
+_JD_PARAGRAPHS = [
+    "We are hiring a senior engineer to build distributed systems and microservices in Python and Go.",
+    "You will run Kubernetes and Docker on AWS and GCP, with Terraform for infrastructure and Prometheus and Grafana for monitoring.",
+    "Experience with PyTorch or TensorFlow, MLOps, model deployment, MLflow and SageMaker is a plus.",
+    "Nice to have: gRPC, GraphQL, feature store design, XGBoost and sklearn, and being part of an oncall incident response rotation.",
+    "This is not an intern or temporary contract role; no help desk or desktop support duties.",
+    "Benefits include remote-friendly work, learning budget and a “no meetings” Wednesday.",
+    "Bonus: JavaScript, Django and Google Cloud tooling, golang services, and internal mobility after a year.",
+]
+
+
+def _terms(tag: str = "") -> List[str]:
+    base = [t for r in ROLE_LIB.values() for t in r["titles"] + r["must"] + r["nice"]]
+    base += SMART_NOT + list(SYNONYMS)
+    base += ["  Kubernetes ", "PYTHON", "Full-Stack", 'say "hi"', "C++ (modern)", "node.js", "“quoted”", ""]
+    return [f"{t} {tag}" if tag and t else t for t in base]
+
+
+def _fixture(name: str, i: int, cold: bool) -> Tuple:
+    """Positional args for one call of `name`; call i gets unseen terms when cold."""
+    tag = f"x{i}" if cold else ""
+    terms = _terms(tag)
+    must, nice, nots = terms[:12], terms[12:30], terms[-24:]
+    if name in ("unique_preserve", "canonicalize", "or_group"):
+        return (terms,)
+    if name == "map_title_to_category":
+        return (TITLES[i % len(TITLES)] + (f" {tag}" if tag else ""),)
+    if name == "expand_titles":
+        return (ROLE_LIB["swe"]["titles"] + must, "swe")
+    if name == "build_keywords":
+        return (must, nice, nots)
+    if name == "build_keywords_two_tier":
+        return (must, nice, nots, ["remote", "enterprise"], 2)
+    if name == "jd_extract":
+        return ("\n\n".join(_JD_PARAGRAPHS * 6) + (f" {tag}" if tag else ""),)
+    if name == "string_health_report":
+        kw = reference.build_keywords(must, nice, nots)
+        return (kw + " AND (" + kw + ")",)
+    raise KeyError(name)
+
+
+def variants(name: str) -> Dict[str, Callable]:
+    out = {"core": getattr(core, name), "reference": getattr(reference, name)}
+    if name in reference.APP_VARIANTS:
+        app = reference.APP_VARIANTS[name]
+        if app is not out["reference"]:
+            out["app"] = app
+    return out
+
+
+def clear_caches() -> None:
+    for cache in core.TERM_CACHES.values():
+        cache.clear()
+    reference.safe_quote.cache_clear()
+
+
+def _pass(fn: Callable, calls: List[Tuple], cold: bool) -> float:
+    """Nanoseconds per call for one pass through `calls`."""
+    if cold:
+        clear_caches()
+    t0 = time.perf_counter_ns()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter_ns() - t0) / len(calls)
+
+
+def _time(impls: Dict[str, Callable], calls: List[Tuple], repeat: int, cold: bool) -> Dict[str, List[float]]:
+    """ns/call of every version in each of `repeat` interleaved rounds."""
+    labels = list(impls)
+    times: Dict[str, List[float]] = {label: [] for label in labels}
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for r in range(repeat):
+            for label in labels[r % len(labels):] + labels[:r % len(labels)]:
+                times[label].append(_pass(impls[label], calls, cold))
+    finally:
+        if enabled:
+            gc.enable()
+    return times
+
+
+def _ratio(slow: List[float], fast: List[float]) -> float:
+    """Median over rounds of slow/fast; both lists are indexed by round."""
+    return statistics.median(s / f for s, f in zip(slow, fast))
+
+
+def run(names: Sequence[str] = FUNCTIONS, repeat: int = 21, cold: bool = False, calls: int = 200) -> List[Dict[str, Any]]:
+    """One row per function: best ns/call per version, core's speedup over the reference (and over the
+    app helper, for scale), and the run's noise (how far an A/A ratio of the reference lands from 1)."""
+    rows = []
+    for name in names:
+        args = [_fixture(name, i, cold) for i in range(calls)] if cold else [_fixture(name, 0, False)] * calls
+        impls = variants(name)
+        expected = impls["core"](*args[0])  # also the warm-up / first cache fill
+        same = {label: fn(*args[0]) == expected for label, fn in impls.items()}
+        times = _time({**impls, "control": impls["reference"]}, args, repeat, cold)
+        control = times.pop("control")
+        rows.append({
+            "function": name, **{f"{k}_ns": round(min(v)) for k, v in times.items()},
+            "speedup": round(_ratio(times["reference"], times["core"]), 2),
+            "vs_app": round(_ratio(times["app"], times["core"]), 2) if "app" in times else None,
+            "noise": round(abs(_ratio(times["reference"], control) - 1), 2),
+            "same_output": same["reference"], "app_same": same.get("app"),
+        })
+    return rows
+
+
+def failures(rows: List[Dict[str, Any]], tolerance: float = 0.10) -> List[str]:
+    """Functions where core differs from the reference or is slower than tolerance + noise allows."""
+    return [r["function"] for r in rows
+            if not r["same_output"] or r["speedup"] < 1 - tolerance - r["noise"]]
+
+
+COLUMNS = ["function", "core_ns", "reference_ns", "app_ns", "app_same", "vs_app", "speedup", "noise", "same_output"]
+
+
+def format_rows(rows: List[Dict[str, Any]], cols: Sequence[str] = COLUMNS) -> str:
+    table = [["" if r.get(c) is None else str(r[c]) for c in cols] for r in rows]
+    width = [max(len(c), *(len(t[i]) for t in table)) for i, c in enumerate(cols)]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(cols, width))]
+    lines += ["  ".join(v.ljust(w) for v, w in zip(t, width)) for t in table]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Time sourcing.core against the pre-tuning and inline-app versions.")
+    ap.add_argument("functions", nargs="*", help=f"subset of: {', '.join(FUNCTIONS)}")
+    ap.add_argument("--cold", action="store_true", help="unseen terms on every call, caches cleared per pass")
+    ap.add_argument("--repeat", type=int, default=21, help="interleaved rounds (ratios are medians over rounds)")
+    ap.add_argument("--calls", type=int, default=200, help="calls per timed pass")
+    ap.add_argument("--check", action="store_true", help="exit 1 if core differs from the reference or is slower than it")
+    ap.add_argument("--tolerance", type=float, default=0.10,
+                    help="allowed slowdown for --check (0.10 = 10%%), on top of the measured noise")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    unknown = [f for f in args.functions if f not in FUNCTIONS]
+    if unknown:
+        ap.error(f"unknown function(s): {', '.join(unknown)}")
+    rows = run(args.functions or FUNCTIONS, args.repeat, args.cold, args.calls)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    if args.check:
+        bad = failures(rows, args.tolerance)
+        if bad:
+            print(f"core is slower than, or differs from, the reference for: {', '.join(bad)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
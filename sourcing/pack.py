@@ -0,0 +1,147 @@
+# sourcing/pack.py — incremental dependency graph over Boolean pack artifacts
+#
+#   raw_titles, level ─► titles ─► title_current / title_past
+#   must, nice, nots, qualifiers, two_tier, min_must ─► keywords ─► health, grade
+#   must, nice ─► skills_csv
+#   companies, company_source ─► companies_or
+#   role_title, location, ai_notes + all strings ─► pack_text
+#
+# Inputs are set with PackGraph.set(); a node is recomputed on get() only when
+# one of its dependencies changed since it was last computed. A recomputed node
+# whose value comes out equal keeps its version, so its dependents stay cached.
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .companies import COMPANY_INDEX
+from .core import (
+    apply_seniority, build_keywords, build_keywords_two_tier, or_group,
+    string_health_grade, string_health_report, unique_preserve,
+)
+
+PACK_INPUTS: Dict[str, Any] = {
+    "role_title": "",
+    "location": "",
+    "ai_notes": "",
+    "raw_titles": [],
+    "level": "All",
+    "must": [],
+    "nice": [],
+    "nots": [],
+    "qualifiers": [],
+    "two_tier": False,
+    "min_must": 2,
+    "companies": [],
+    "company_source": None,  # [segments, metro, extra, policy] when `companies` is COMPANY_INDEX.companies(*it) untrimmed
+}
+
+
+def pack_export_lines(role_title: str, location: str, companies_or: str, title_current: str, title_past: str,
+                      keywords: str, skills_csv: str, ai_notes: str = "") -> List[str]:
+    """Field set of the exported pack, shared by the .txt download and the export writers."""
+    lines: List[str] = []
+    lines.append("ROLE: " + (role_title or ""))
+    lines.append("LOCATION: " + (location or ""))
+    lines.append("")
+    lines.append("COMPANIES (OR):")
+    lines.append(companies_or)
+    lines.append("")
+    lines.append("TITLE (CURRENT):")
+    lines.append(title_current)
+    lines.append("")
+    lines.append("TITLE (PAST):")
+    lines.append(title_past)
+    lines.append("")
+    lines.append("KEYWORDS:")
+    lines.append(keywords)
+    lines.append("")
+    lines.append("SKILLS (CSV):")
+    lines.append(skills_csv)
+    if ai_notes:
+        lines.append("")
+        lines.append("AI NOTES:")
+        lines.append(ai_notes)
+    return lines
+
+
+def _keywords(must, nice, nots, qualifiers, two_tier, min_must) -> str:
+    if two_tier:
+        return build_keywords_two_tier(must, nice, nots, qualifiers=qualifiers, min_must=min_must)
+    return build_keywords(must, nice, nots, qualifiers=qualifiers)
+
+
+def _companies_or(companies, company_source) -> str:
+    # The index splices the per-user extras onto the pre-quoted segment + metro fragment
+    # every session with the same selection shares; equal to or_group(companies).
+    if company_source:
+        return COMPANY_INDEX.companies_or(*company_source)
+    return or_group(companies)
+
+
+PACK_NODES: List[Tuple[str, Tuple[str, ...], Callable[..., Any]]] = [
+    ("titles", ("raw_titles", "level"), apply_seniority),
+    ("title_current", ("titles",), or_group),
+    ("title_past", ("titles",), lambda titles: or_group(titles[: min(20, len(titles))])),
+    ("keywords", ("must", "nice", "nots", "qualifiers", "two_tier", "min_must"), _keywords),
+    ("health", ("keywords",), string_health_report),
+    ("grade", ("keywords",), string_health_grade),
+    ("skills_csv", ("must", "nice"), lambda must, nice: ", ".join(unique_preserve(must + nice))),
+    ("companies_or", ("companies", "company_source"), _companies_or),
+    ("pack_text", ("role_title", "location", "companies_or", "title_current", "title_past", "keywords", "skills_csv", "ai_notes"),
+     lambda *a: "\n".join(pack_export_lines(*a))),
+]
+
+# Fields of an exported pack, in pack_text order (the export writers use the same set)
+EXPORT_FIELDS: Tuple[str, ...] = next(deps for name, deps, _ in PACK_NODES if name == "pack_text")
+
+
+class PackGraph:
+    def __init__(self, nodes: Optional[Sequence[Tuple[str, Tuple[str, ...], Callable[..., Any]]]] = None,
+                 inputs: Optional[Dict[str, Any]] = None) -> None:
+        self._nodes = {name: (deps, fn) for name, deps, fn in (nodes or PACK_NODES)}
+        self._values: Dict[str, Any] = {}
+        self._versions: Dict[str, int] = {}
+        self._seen: Dict[str, Tuple[int, ...]] = {}  # node -> dep versions at last compute
+        self.recomputes: Dict[str, int] = {name: 0 for name in self._nodes}
+        self.set(**dict(PACK_INPUTS if inputs is None else inputs))
+
+    def set(self, **inputs: Any) -> List[str]:
+        """Update inputs; returns the names that actually changed."""
+        changed = []
+        for k, v in inputs.items():
+            if k in self._nodes:
+                raise KeyError(f"{k!r} is a derived node, not an input")
+            if isinstance(v, tuple):
+                v = list(v)
+            if k not in self._values or self._values[k] != v:
+                self._values[k] = list(v) if isinstance(v, list) else v
+                self._versions[k] = self._versions.get(k, 0) + 1
+                changed.append(k)
+        return changed
+
+    def get(self, name: str) -> Any:
+        if name not in self._nodes:
+            return self._values[name]
+        deps, fn = self._nodes[name]
+        args = [self.get(d) for d in deps]
+        stamp = tuple(self._versions[d] for d in deps)
+        if self._seen.get(name) != stamp:
+            value = fn(*args)
+            self.recomputes[name] += 1
+            self._seen[name] = stamp
+            if name not in self._values or self._values[name] != value:
+                self._values[name] = value
+                self._versions[name] = self._versions.get(name, 0) + 1
+        return self._values[name]
+
+    def snapshot(self, names: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        return {n: self.get(n) for n in (names or list(self._nodes))}
+
+    def fork(self) -> "PackGraph":
+        """Cheap copy for variant iteration: shares cached values until an input diverges."""
+        g = PackGraph.__new__(PackGraph)
+        g._nodes = self._nodes
+        g._values = dict(self._values)
+        g._versions = dict(self._versions)
+        g._seen = dict(self._seen)
+        g.recomputes = {name: 0 for name in self._nodes}
+        return g
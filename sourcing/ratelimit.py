@@ -0,0 +1,308 @@
+# sourcing/ratelimit.py — one request queue for the shared OpenAI key
+#
+# Every session in a server process (and, with a shared state file, every
+# process on the host) draws from the same two token buckets: requests per
+# minute and tokens per minute. Each bucket holds up to one minute's quota and
+# refills continuously. A call reserves 1 request plus its estimated tokens
+# (prompt + expected completion) before it goes out. settle() then corrects
+# the token bucket to the real usage.
+#
+# Waiting calls queue by priority (INTERACTIVE before BATCH). Within a
+# priority, sessions take turns round-robin, FIFO within a session. Only the
+# head of the queue may draw from the buckets, so one session's burst can't
+# starve another's first request. A 429 from the provider calls backoff(),
+# which empties both buckets for the Retry-After period so queued calls wait
+# instead of piling more 429s onto the key.
+#
+# LocalBuckets keep state in memory (one process). SQLiteBuckets keep it in
+# a small SQLite file updated in BEGIN IMMEDIATE transactions, so several
+# server processes or a CLI batch job share one quota. The fair queue itself
+# is per process.
+#
+#   AI_RPM / AI_TPM                  limits (0 = unlimited; both 0 disables the limiter)
+#   AI_RATE_FILE                     SQLite state file for a cross-process quota
+#   AI_RATE_MAX_WAIT_S               longest a call may queue before failing (default 60)
+#   AI_RATE_COMPLETION_TOKENS        expected completion size when reserving (default 800)
+#
+#   python -m sourcing.ratelimit status      # bucket levels in AI_RATE_FILE
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence
+
+INTERACTIVE, BATCH = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+RPM, TPM = "rpm", "tpm"
+
+
+class RateLimitTimeout(Exception):
+    """A call waited longer than max_wait_s for the shared quota."""
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LocalBuckets:
+    """Per-minute token buckets in memory; callers serialize access."""
+
+    def __init__(self, limits: Dict[str, float]) -> None:
+        self.limits = {k: float(v) for k, v in limits.items() if v > 0}
+        now = time.time()
+        self._state = {k: [cap, now] for k, cap in self.limits.items()}
+
+    def _load(self, now: float) -> Dict[str, List[float]]:
+        for name, st in self._state.items():
+            cap = self.limits[name]
+            st[0] = min(cap, st[0] + (now - st[1]) * cap / 60.0)
+            st[1] = now
+        return self._state
+
+    def _store(self, state: Dict[str, List[float]]) -> None:
+        pass
+
+    def _abort(self) -> None:
+        pass
+
+    @contextmanager
+    def _update(self, now: float) -> Iterator[Dict[str, List[float]]]:
+        """Refilled state to modify in place; stored on exit, discarded if the body raises."""
+        state = self._load(now)
+        try:
+            yield state
+        except BaseException:
+            self._abort()
+            raise
+        self._store(state)
+
+    def take(self, costs: Dict[str, float], now: Optional[float] = None) -> float:
+        """Draw `costs` if every bucket covers them and return 0; else draw nothing and return seconds to wait."""
+        now = time.time() if now is None else now
+        wait = 0.0
+        with self._update(now) as state:
+            for name, cost in costs.items():
+                if name in state:
+                    cost = min(cost, self.limits[name])  # a call bigger than a minute's quota waits for a full bucket
+                    if state[name][0] < cost:
+                        wait = max(wait, (cost - state[name][0]) * 60.0 / self.limits[name])
+            if wait <= 0:
+                for name, cost in costs.items():
+                    if name in state:
+                        state[name][0] -= min(cost, self.limits[name])
+        return wait
+
+    def adjust(self, name: str, delta: float) -> None:
+        """Add (refund) or remove tokens; the level may go negative after an underestimate."""
+        if name not in self.limits:
+            return  # e.g. settle() with only an RPM limit: nothing to correct, so no transaction either
+        with self._update(time.time()) as state:
+            state[name][0] = min(self.limits[name], state[name][0] + delta)
+
+    def drain(self, seconds: float) -> None:
+        """Empty every bucket so nothing is drawn for about `seconds`."""
+        with self._update(time.time()) as state:
+            for name, st in state.items():
+                st[0] = min(st[0], -seconds * self.limits[name] / 60.0)
+
+    def levels(self) -> Dict[str, float]:
+        return {name: st[0] for name, st in self._load(time.time()).items()}
+
+
+class SQLiteBuckets(LocalBuckets):
+    """Buckets shared by every process using the same file."""
+
+    def __init__(self, limits: Dict[str, float], path: str) -> None:
+        super().__init__(limits)
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _load(self, now: float) -> Dict[str, List[float]]:
+        # opens a write transaction: every caller ends it with _store (COMMIT) or _abort (ROLLBACK)
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict((name, [level, updated]) for name, level, updated in self._db.execute("SELECT name, level, updated FROM buckets"))
+        except BaseException:
+            self._abort()
+            raise
+        self._state = {name: rows.get(name, [cap, now]) for name, cap in self.limits.items()}
+        return super()._load(now)
+
+    def _store(self, state: Dict[str, List[float]]) -> None:
+        try:
+            self._db.executemany("INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                                 [(name, st[0], st[1]) for name, st in state.items()])
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._abort()
+            raise
+
+    def _abort(self) -> None:
+        if self._db.in_transaction:
+            self._db.execute("ROLLBACK")
+
+    def levels(self) -> Dict[str, float]:
+        state = self._load(time.time())
+        self._abort()  # read only
+        return {name: st[0] for name, st in state.items()}
+
+
+class _Waiter:
+    __slots__ = ("session", "priority", "tokens", "since")
+
+    def __init__(self, session: str, priority: int, tokens: float) -> None:
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.since = time.time()
+
+
+class Ticket:
+    """A granted reservation; settle() once the real token count is known."""
+
+    def __init__(self, limiter: "RateLimiter", tokens: float, waited_s: float) -> None:
+        self.limiter = limiter
+        self.tokens = tokens
+        self.waited_s = waited_s
+
+    def settle(self, actual_tokens: float) -> None:
+        if actual_tokens != self.tokens:
+            with self.limiter._cond:
+                self.limiter.buckets.adjust(TPM, self.tokens - actual_tokens)
+                self.limiter._cond.notify_all()
+        self.tokens = actual_tokens
+
+
+class RateLimiter:
+    """RPM + TPM token buckets behind a priority queue that is fair across sessions."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, path: Optional[str] = None, max_wait_s: float = 60.0,
+                 completion_tokens: int = 800) -> None:
+        limits = {RPM: rpm, TPM: tpm}
+        self.buckets = SQLiteBuckets(limits, path) if path else LocalBuckets(limits)
+        self.rpm, self.tpm = rpm, tpm
+        self.max_wait_s = max_wait_s
+        self.completion_tokens = completion_tokens
+        self._cond = threading.Condition()
+        # priority -> session -> FIFO of waiters; session order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self._waits: Deque[float] = deque(maxlen=500)
+        self.granted = 0
+        self.timeouts = 0
+        self.backoffs = 0
+
+    def _head(self) -> Optional[_Waiter]:
+        for prio in sorted(self._queues):
+            for fifo in self._queues[prio].values():
+                return fifo[0]
+        return None
+
+    def _remove(self, w: _Waiter, served: bool) -> None:
+        sessions = self._queues[w.priority]
+        fifo = sessions[w.session]
+        fifo.remove(w)
+        if not fifo:
+            del sessions[w.session]
+        elif served:
+            sessions.move_to_end(w.session)  # next turn goes to the next session
+
+    def acquire(self, tokens: float, session: str = "", priority: int = INTERACTIVE,
+                max_wait_s: Optional[float] = None) -> Ticket:
+        """Block until this call may go out; raises RateLimitTimeout after max_wait_s."""
+        priority = priority if priority in self._queues else BATCH
+        deadline = time.time() + (self.max_wait_s if max_wait_s is None else max_wait_s)
+        w = _Waiter(session, priority, tokens)
+        with self._cond:
+            self._queues[priority].setdefault(session, deque()).append(w)
+            try:
+                while True:
+                    now = time.time()
+                    wait = None
+                    if self._head() is w:
+                        wait = self.buckets.take({RPM: 1, TPM: tokens}, now)
+                        if wait <= 0:
+                            self._remove(w, served=True)
+                            self._cond.notify_all()
+                            waited = now - w.since
+                            self._waits.append(waited)
+                            self.granted += 1
+                            return Ticket(self, tokens, waited)
+                    if now >= deadline:
+                        self._remove(w, served=False)
+                        self._cond.notify_all()
+                        self.timeouts += 1
+                        raise RateLimitTimeout(f"queued {now - w.since:.0f}s for the shared AI quota; try again shortly")
+                    self._cond.wait(min(wait if wait is not None else deadline - now, deadline - now))
+            except BaseException:
+                if w in self._queues[priority].get(session, ()):
+                    self._remove(w, served=False)
+                    self._cond.notify_all()
+                raise
+
+    def backoff(self, seconds: float) -> None:
+        """The provider answered 429: hold every queued call for `seconds`."""
+        with self._cond:
+            self.buckets.drain(seconds)
+            self.backoffs += 1
+            self._cond.notify_all()
+
+    def depth(self, session: Optional[str] = None) -> int:
+        with self._cond:
+            return sum(len(fifo) for sessions in self._queues.values()
+                       for s, fifo in sessions.items() if session is None or s == session)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per priority, wait-time percentiles and bucket levels, for the UI."""
+        with self._cond:
+            queued = {PRIORITY_NAMES[p]: sum(len(f) for f in sessions.values()) for p, sessions in self._queues.items()}
+            waiting_s = max((time.time() - f[0].since for sessions in self._queues.values() for f in sessions.values()), default=0.0)
+            waits = sorted(self._waits)
+            levels = self.buckets.levels()
+        return {
+            "queued": queued, "oldest_wait_s": round(waiting_s, 2),
+            "wait_p50_s": round(_percentile(waits, 0.5), 2), "wait_p95_s": round(_percentile(waits, 0.95), 2),
+            "granted": self.granted, "timeouts": self.timeouts, "backoffs": self.backoffs,
+            "rpm_left": round(levels.get(RPM, 0.0), 1) if self.rpm else None, "rpm": self.rpm or None,
+            "tpm_left": round(levels.get(TPM, 0.0)) if self.tpm else None, "tpm": self.tpm or None,
+        }
+
+
+def limiter_from_env(env: Optional[Dict[str, str]] = None) -> Optional[RateLimiter]:
+    """RateLimiter from AI_RPM / AI_TPM / AI_RATE_FILE, or None when neither limit is set."""
+    env = os.environ if env is None else env
+    rpm = float(env.get("AI_RPM") or 0)
+    tpm = float(env.get("AI_TPM") or 0)
+    if rpm <= 0 and tpm <= 0:
+        return None
+    return RateLimiter(rpm, tpm, env.get("AI_RATE_FILE") or None, float(env.get("AI_RATE_MAX_WAIT_S") or 60),
+                       int(env.get("AI_RATE_COMPLETION_TOKENS") or 800))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Shared AI rate-limit state.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="print bucket levels from AI_RATE_FILE")
+    ap.parse_args(argv)
+    limiter = limiter_from_env()
+    if limiter is None:
+        print("error: set AI_RPM and/or AI_TPM", file=sys.stderr)
+        return 1
+    print(json.dumps(limiter.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# sourcing/reference.py — frozen copies of the string builders as they were before sourcing.core was tuned
+#
+# Two generations are kept:
+#   app_*   the naive helpers app_pretty.py and app_wow.py each defined inline
+#           (no escaping, `jd.count` over every term, a paren scan that
+#           counts parens inside quotes)
+#   plain   sourcing.core before optimization (same names as core)
+#
+# Nothing in the apps imports this module. sourcing.microbench times core
+# against the fastest variant here, and a tuned core function must return
+# exactly what the plain reference of the same name returns.
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+from .taxonomy import ROLE_LIB, SYNONYMS
+
+# ============================ sourcing.core, pre-optimization ============================
+def unique_preserve(seq: List[str]) -> List[str]:
+    seen, out = set(), []
+    for x in seq:
+        x2 = (x or "").strip()
+        if not x2:
+            continue
+        key = x2.lower()
+        if key not in seen:
+            seen.add(key)
+            out.append(x2)
+    return out
+
+def canonicalize(tokens: List[str]) -> List[str]:
+    out, seen = [], set()
+    for t in tokens:
+        c = SYNONYMS.get((t or "").lower(), t or "").strip()
+        k = c.lower()
+        if k and k not in seen:
+            seen.add(k)
+            out.append(c)
+    return out
+
+def normalize_quotes(s: str) -> str:
+    return (s or "").replace("“", '"').replace("”", '"').replace("’", "'").replace("‘", "'")
+
+@lru_cache(maxsize=8192)
+def safe_quote(token: str) -> str:
+    t = normalize_quotes((token or "").strip())
+    if not t:
+        return ""
+    t = t.replace('"', r'\"')
+    if re.search(r"\s|\(|\)|-", t):
+        return f'"{t}"'
+    return t
+
+def or_group(items: List[str]) -> str:
+    toks = [safe_quote(i) for i in items if i and i.strip()]
+    toks = unique_preserve([t for t in toks if t])
+    return f"({ ' OR '.join(toks) })" if toks else ""
+
+def not_group(items: List[str]) -> str:
+    toks = [safe_quote(i) for i in items if i and i.strip()]
+    toks = unique_preserve([t for t in toks if t])
+    return f"({ ' OR '.join(toks) })" if toks else ""
+
+def map_title_to_category(title: str) -> str:
+    s = (title or "").lower()
+    if any(t in s for t in ["sre", "site reliability", "reliab", "devops", "platform reliability", "production engineer"]):
+        return "sre"
+    if any(t in s for t in [
+        "machine learning", "ml engineer", "applied scientist", "data scientist", "ai engineer",
+        "genai", "llm", "deep learning", " ml ", "ml-", "ml/"
+    ]):
+        return "ml"
+    return "swe"
+
+def expand_titles(base_titles: List[str], cat: str) -> List[str]:
+    extra: List[str] = []
+    if cat == "swe":
+        extra = ["Software Eng", "Software Dev", "Full-Stack Engineer", "Backend Developer", "Frontend Developer"]
+    elif cat == "ml":
+        extra = ["ML Eng", "Machine Learning Specialist", "Applied ML Engineer", "ML Research Engineer"]
+    elif cat == "sre":
+        extra = ["Reliability Eng", "DevOps SRE", "Platform SRE", "Production Engineer"]
+    return unique_preserve(base_titles + extra)
+
+def build_keywords(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None) -> str:
+    core = or_group(unique_preserve(canonicalize(must) + canonicalize(nice) + canonicalize(qualifiers or [])))
+    if not core:
+        return ""
+    ng = not_group(unique_preserve(canonicalize(nots)))
+    return f"{core} NOT {ng}" if ng else core
+
+def build_keywords_two_tier(must: List[str], nice: List[str], nots: List[str], qualifiers: List[str] = None, min_must: int = 2) -> str:
+    must = canonicalize(must)
+    anchors, rest = must[:max(0, min_must)], must[max(0, min_must):]
+    left = " AND ".join(or_group([a]) for a in anchors) if anchors else ""
+    right = or_group(unique_preserve(rest + canonicalize(nice) + canonicalize(qualifiers or [])))
+    core = " AND ".join([p for p in [left, right] if p])
+    ng = not_group(unique_preserve(canonicalize(nots)))
+    return f"{core} NOT {ng}" if ng else core
+
+def jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
+    jd = normalize_quotes((jd_text or "").lower())
+    pool = {s.lower() for role in ROLE_LIB.values() for s in (role["must"] + role["nice"])}
+
+    def count_term(term: str) -> int:
+        if " " in term or "/" in term or "-" in term:
+            return jd.count(term)
+        return len(re.findall(rf"\b{re.escape(term)}\b", jd))
+
+    ranked = [t for t in sorted(pool, key=lambda x: count_term(x), reverse=True) if count_term(t) > 0]
+    must_ex, nice_ex = ranked[:8], ranked[8:16]
+    auto_not_terms = ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]
+    auto_not = [kw for kw in auto_not_terms if re.search(rf"\b{re.escape(kw)}\b", jd)]
+    return must_ex, nice_ex, auto_not
+
+def string_health_report(s: str) -> List[str]:
+    issues: List[str] = []
+    if not s:
+        return ["Keywords are empty — add must/nice skills."]
+    if len(s) > 900:
+        issues.append("Keywords look long (>900 chars); consider trimming.")
+    if s.count(" OR ") > 80:
+        issues.append("High OR count; remove niche/redundant terms.")
+    unquoted = re.sub(r'"[^"]*"', "", s)
+    depth = 0
+    ok = True
+    for ch in unquoted:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                ok = False
+                break
+    if depth != 0 or not ok:
+        issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
+    return issues
+
+# ============================ app_pretty.py / app_wow.py inline helpers ============================
+def app_or_group(items: List[str]) -> str:
+    items = [i.strip() for i in items if i and i.strip()]
+    if not items:
+        return ""
+    quoted = []
+    for i in items:
+        if " " in i and not i.startswith('"'):
+            quoted.append('"' + i + '"')
+        else:
+            quoted.append(i)
+    return "(" + " OR ".join(quoted) + ")"
+
+def app_map_title_to_category(title: str) -> str:
+    s = (title or "").lower()
+    sre_terms = ["sre", "site reliability", "reliab", "devops", "platform reliability"]
+    if any(t in s for t in sre_terms):
+        return "sre"
+    ml_terms = [
+        "machine learning", "ml engineer", "applied scientist",
+        "data scientist", "ai engineer", " ml ", "ml-", "ml/"
+    ]
+    if any(t in s for t in ml_terms):
+        return "ml"
+    return "swe"
+
+def app_build_keywords(must: List[str], nice: List[str], nots: List[str]) -> str:
+    core = app_or_group(unique_preserve(must + nice))
+    if not core:
+        return ""
+    nots2 = unique_preserve(nots)
+    if nots2:
+        return core + " NOT (" + " OR ".join(nots2) + ")"
+    return core
+
+def app_jd_extract(jd_text: str) -> Tuple[List[str], List[str], List[str]]:
+    jd = (jd_text or "").lower()
+    pool = set()
+    for role in ROLE_LIB.values():
+        for s in role["must"] + role["nice"]:
+            pool.add(s.lower())
+    counts = {s: jd.count(s) for s in pool}
+    ranked = [s for s, c in sorted(counts.items(), key=lambda x: x[1], reverse=True) if c > 0]
+    must_ex = ranked[:8]
+    nice_ex = ranked[8:16]
+    auto_not = []
+    for kw in ["intern", "contract", "temporary", "help desk", "desktop support", "qa tester", "graphic designer"]:
+        if kw in jd:
+            auto_not.append(kw)
+    return must_ex, nice_ex, auto_not
+
+def app_string_health_report(s: str) -> List[str]:
+    issues: List[str] = []
+    if not s:
+        return ["Keywords are empty — add must/nice skills."]
+    if len(s) > 900:
+        issues.append("Keywords look long (>900 chars); consider trimming.")
+    if s.count(" OR ") > 80:
+        issues.append("High OR count; remove niche/redundant terms.")
+    depth = 0
+    ok = True
+    for ch in s:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                ok = False
+                break
+    if depth != 0 or not ok:
+        issues.append("Unbalanced parentheses; copy fresh strings or simplify.")
+    return issues
+
+# app_* versions of unique_preserve and expand_titles were identical to the plain ones above
+APP_VARIANTS = {
+    "unique_preserve": unique_preserve,
+    "or_group": app_or_group,
+    "map_title_to_category": app_map_title_to_category,
+    "expand_titles": expand_titles,
+    "build_keywords": app_build_keywords,
+    "jd_extract": app_jd_extract,
+    "string_health_report": app_string_health_report,
+}
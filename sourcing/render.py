@@ -0,0 +1,53 @@
+# sourcing/render.py — prebuilt stylesheets and memoized HTML fragments
+#
+# Streamlit clears any element a rerun doesn't re-emit, so the CSS and card
+# markup still go out on every rerun. What this layer removes is the work and
+# the extra deltas: each theme × density stylesheet is built and minified once,
+# identical fragments come from a memo instead of being re-concatenated, and a
+# hero or card header is one markdown payload instead of several.
+
+import html
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+_WS = re.compile(r"\s+")
+_PUNCT_WS = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """Collapse whitespace; keeps values like `0 6px 24px` intact."""
+    return _PUNCT_WS.sub(r"\1", _WS.sub(" ", css)).strip()
+
+
+def build_stylesheets(builder: Callable[..., str], themes: Dict[str, Dict[str, str]],
+                      densities: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[Tuple[str, ...], str]:
+    """Every theme (× density) stylesheet, minified, keyed by (theme,) or (theme, density)."""
+    if not densities:
+        return {(name,): minify_css(builder(t)) for name, t in themes.items()}
+    return {(name, dname): minify_css(builder(t, d)) for name, t in themes.items() for dname, d in densities.items()}
+
+
+@lru_cache(maxsize=512)
+def hero_html(job_title: str, category: str, location: str) -> str:
+    chips = []
+    if job_title:
+        chips.append("<span class='chip'>🎯 " + html.escape(job_title) + "</span>")
+    if category:
+        chips.append("<span class='chip'>🧠 " + html.escape(category.upper()) + "</span>")
+    if location:
+        chips.append("<span class='chip'>📍 " + html.escape(location) + "</span>")
+    out = "<div class='hero'><h1>AI Sourcing Assistant</h1>"
+    if chips:
+        out += "<div class='chips'>" + "".join(chips) + "</div>"
+    return out + "</div>"
+
+
+@lru_cache(maxsize=256)
+def card_header_html(title: str, style: str = "margin:0 0 6px 0;font-size:14px;color:var(--muted);") -> str:
+    return "<h3 style='" + style + "'>" + title + "</h3>" if style else "<h3>" + title + "</h3>"
+
+
+@lru_cache(maxsize=256)
+def hint_html(hint: str) -> str:
+    return "<div class='hint'>" + hint + "</div>"
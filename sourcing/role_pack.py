@@ -0,0 +1,167 @@
+# sourcing/role_pack.py — the AI role-pack contract: prompt, schema and parsing
+#
+# Shared by the app's AI call and the model benchmark (sourcing.usage bench)
+# so both ask the same question and judge the answer the same way.
+
+import json
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+try:
+    import orjson  # Optional fast JSON parser
+except Exception:
+    orjson = None
+
+ROLE_PACK_SYSTEM = (
+    "You are a senior technical sourcer. Given a role title and optional JD text, "
+    "output a compact JSON object to drive boolean sourcing. Focus on precision."
+)
+
+# Mirrors the prompt in role_pack_messages
+ROLE_CATEGORIES = [
+    "eng", "data", "product", "design", "marketing", "sales", "ops", "finance",
+    "hr", "legal", "it", "healthcare", "hardware", "security", "other",
+]
+
+# field -> (kind, required, min_items, max_items). Item counts are a target, not a contract: a pack is
+# rejected for a missing field or a wrong type, while over-long lists are trimmed and short ones kept
+# with a warning.
+ROLE_PACK_SCHEMA: Dict[str, Tuple[str, bool, int, int]] = {
+    "role_category":    ("enum", True, 0, 0),
+    "titles":           ("list", True, 10, 24),
+    "must_have":        ("list", True, 6, 12),
+    "nice_to_have":     ("list", True, 6, 10),
+    "negatives":        ("list", True, 6, 12),
+    "qualifiers":       ("list", False, 0, 20),
+    "target_companies": ("list", True, 15, 40),
+    "notes":            ("str", False, 0, 0),
+}
+
+
+class SchemaError(NamedTuple):
+    field: str
+    message: str
+    warning: bool = False  # the pack is still usable (item counts, blank items)
+
+
+def _compile_schema(schema: Dict[str, Tuple[str, bool, int, int]]) -> List[Callable[[Dict[str, Any]], List[SchemaError]]]:
+    """Turn the schema table into one check closure per field (built once at import)."""
+    checks: List[Callable[[Dict[str, Any]], List[SchemaError]]] = []
+    enum = frozenset(ROLE_CATEGORIES)
+    for field, (kind, required, lo, hi) in schema.items():
+        def check(d: Dict[str, Any], field=field, kind=kind, required=required, lo=lo, hi=hi) -> List[SchemaError]:
+            if field not in d or d[field] is None:
+                return [SchemaError(field, "missing")] if required else []
+            v = d[field]
+            if kind == "enum":
+                if not isinstance(v, str) or v.strip().lower() not in enum:
+                    return [SchemaError(field, f"expected one of {ROLE_CATEGORIES}, got {v!r}")]
+                return []
+            if kind == "str":
+                return [] if isinstance(v, str) else [SchemaError(field, f"expected string, got {type(v).__name__}")]
+            if not isinstance(v, list):
+                return [SchemaError(field, f"expected array, got {type(v).__name__}")]
+            errs = [SchemaError(f"{field}[{i}]", f"expected string, got {type(x).__name__}") for i, x in enumerate(v) if not isinstance(x, str)]
+            errs += [SchemaError(f"{field}[{i}]", "expected non-empty string", True) for i, x in enumerate(v) if isinstance(x, str) and not x.strip()]
+            if not (lo <= len(v) <= hi):
+                errs.append(SchemaError(field, f"expected {lo}-{hi} items, got {len(v)}", True))
+            return errs
+        checks.append(check)
+    return checks
+
+
+_ROLE_PACK_CHECKS = _compile_schema(ROLE_PACK_SCHEMA)
+
+
+def validate_role_pack(data: Any) -> List[SchemaError]:
+    if not isinstance(data, dict):
+        return [SchemaError("$", f"expected object, got {type(data).__name__}")]
+    errs: List[SchemaError] = []
+    for check in _ROLE_PACK_CHECKS:
+        errs.extend(check(data))
+    return errs
+
+
+def fatal(errors: List[SchemaError]) -> List[SchemaError]:
+    """The errors that make a pack unusable (missing fields, wrong types)."""
+    return [e for e in errors if not e.warning]
+
+
+def trim_role_pack(data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[SchemaError]]:
+    """Copy of `data` with blank list items dropped and lists cut to their max_items, plus what changed."""
+    out, changed = dict(data), []
+    for field, (kind, _, _, hi) in ROLE_PACK_SCHEMA.items():
+        v = out.get(field)
+        if kind != "list" or not isinstance(v, list):
+            continue
+        kept = [x for x in v if not isinstance(x, str) or x.strip()]
+        if len(kept) > hi:
+            changed.append(SchemaError(field, f"trimmed {len(kept)} items to {hi}", True))
+            kept = kept[:hi]
+        if len(kept) != len(v):
+            out[field] = kept
+    return out, changed
+
+
+def _json_loads(raw: str) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def parse_json_safely(text: str) -> Dict[str, Any]:
+    if not text:
+        return {}
+    # Fast path: JSON mode normally returns a bare object
+    try:
+        data = _json_loads(text)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        pass
+    # Strip prose/code fences around the outermost object
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    raw = text[start:end + 1]
+    try:
+        data = _json_loads(raw)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        pass
+    # Last resort: tolerant repair (smart quotes, trailing commas)
+    raw2 = re.sub(r",\s*([}\]])", r"\1", raw.replace("“", '"').replace("”", '"'))
+    try:
+        data = json.loads(raw2)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def role_pack_messages(title: str, location: str, jd_text: str, level: str, env: str, size: str) -> List[Dict[str, str]]:
+    user = f"""
+Title: {title}
+Location: {location or ""}
+Seniority: {level}
+Work setting: {env}
+Company size: {size}
+
+Job description (optional):\n{(jd_text or '').strip()[:8000]}
+
+Return STRICT JSON with keys:
+- role_category: one of [eng, data, product, design, marketing, sales, ops, finance, hr, legal, it, healthcare, hardware, security, other]
+- titles: array of 10-24 synonyms/nearby titles (include seniority variants relevant to Seniority)
+- must_have: array of 6-12 anchor skills/keywords (technology or function-specific)
+- nice_to_have: array of 6-10 optional skills
+- negatives: array of 6-12 NOT terms (avoid overlap with target function)
+- qualifiers: array of optional keywords like industry or environment (e.g., remote, enterprise)
+- target_companies: array of 15-40 companies relevant to this role (mix of leaders + adjacent)
+- notes: short string with 2–3 tips on narrowing the search
+"""
+    return [
+        {"role": "system", "content": ROLE_PACK_SYSTEM},
+        {"role": "user", "content": user},
+    ]
+
+
+def fix_messages(messages: List[Dict[str, str]], data: Dict[str, Any], errors: List[SchemaError]) -> List[Dict[str, str]]:
+    """One corrective re-request carrying the structured validation errors."""
+    fix = "Your JSON failed validation:\n" + "\n".join(f"- {e.field}: {e.message}" for e in errors[:10]) + "\nReturn the corrected STRICT JSON only."
+    return messages + [{"role": "assistant", "content": json.dumps(data)}, {"role": "user", "content": fix}]
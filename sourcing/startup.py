@@ -0,0 +1,129 @@
+# sourcing/startup.py — cold-start profiling and time-to-first-render budget
+#
+# The app calls mark_first_render() at the end of each script run; the first
+# call in a process logs how long the first render took and, with
+# STARTUP_PROFILE=1, an `-X importtime` digest collected in a background thread.
+#
+# The digest imports what the app imports at module level, read from the app
+# script itself, so a module added to app.py is timed without touching this file.
+#
+#   python -m sourcing.startup [--app app.py] [--budget-ms 1500]   # print the digest, exit 1 if over budget
+
+import argparse
+import ast
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+log = logging.getLogger("sourcing.startup")
+if not log.handlers:  # streamlit only configures its own loggers; make the boot report visible
+    _h = logging.StreamHandler()
+    _h.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log.addHandler(_h)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+_first_render_ms: Optional[float] = None
+_lock = threading.Lock()
+
+
+def boot_modules(app: str = APP) -> List[str]:
+    """Modules `app` imports at module level, in order; imports inside functions (the SDK, tools) stay lazy."""
+    with open(app, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), app)
+    found: List[str] = []
+    stack = list(reversed(tree.body))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Import):
+            found += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            found.append(node.module)
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):  # still run at import time
+            blocks = [node.body, getattr(node, "orelse", []), getattr(node, "finalbody", [])]
+            blocks += [h.body for h in getattr(node, "handlers", [])]
+            stack += [n for block in reversed(blocks) for n in reversed(block)]
+    return list(dict.fromkeys(found))
+
+
+def importtime_digest(modules: Optional[Sequence[str]] = None, top: int = 15) -> Tuple[float, List[Tuple[str, float]]]:
+    """Import `modules` (default: the app's boot modules) in a fresh interpreter; returns (total_ms, [(module, cumulative_ms)]) slowest first."""
+    modules = boot_modules() if modules is None else modules
+    code = "import " + ", ".join(modules)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=ROOT)
+    total_ms = (time.perf_counter() - t0) * 1000
+    rows: List[Tuple[str, float]] = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cum, name = line[len("import time:"):].split("|")
+            if not name.startswith("  "):  # top-level imports only; nested ones are in their parent's total
+                rows.append((name.strip(), int(cum) / 1000))
+        except ValueError:
+            continue
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return total_ms, rows[:top]
+
+
+def format_digest(total_ms: float, rows: List[Tuple[str, float]]) -> str:
+    lines = [f"cold import of boot modules: {total_ms:.0f} ms wall"]
+    lines += [f"  {ms:8.1f} ms  {name}" for name, ms in rows]
+    return "\n".join(lines)
+
+
+def _log_digest() -> None:
+    try:
+        log.info("\n%s", format_digest(*importtime_digest()))
+    except Exception as e:  # profiling must never break the app
+        log.warning("importtime digest failed: %s", e)
+
+
+def budget_ms() -> float:
+    return float(os.getenv("STARTUP_BUDGET_MS", "1500") or 1500)
+
+
+def mark_first_render(script_start: float) -> Optional[float]:
+    """Record time-to-first-render once per process; later calls are no-ops returning None."""
+    global _first_render_ms
+    with _lock:
+        if _first_render_ms is not None:
+            return None
+        _first_render_ms = (time.perf_counter() - script_start) * 1000
+    over = _first_render_ms > budget_ms()
+    (log.warning if over else log.info)(
+        "first render took %.0f ms (budget %.0f ms)%s", _first_render_ms, budget_ms(), " — OVER BUDGET" if over else "")
+    if os.getenv("STARTUP_PROFILE", "") == "1":
+        threading.Thread(target=_log_digest, name="importtime-digest", daemon=True).start()
+    return _first_render_ms
+
+
+def first_render_ms() -> Optional[float]:
+    return _first_render_ms
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Cold-import profile of the sourcing app.")
+    ap.add_argument("--app", default=APP, help="app script whose module-level imports are timed")
+    ap.add_argument("--budget-ms", type=float, default=budget_ms(), help="fail if the cold import exceeds this")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args(argv)
+    total_ms, rows = importtime_digest(boot_modules(args.app), top=args.top)
+    print(format_digest(total_ms, rows))
+    if total_ms > args.budget_ms:
+        print(f"over budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
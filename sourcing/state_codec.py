@@ -0,0 +1,244 @@
+# sourcing/state_codec.py — the edited pack as a short, shareable token
+#
+# Token layout (then base64url, no padding):
+#   byte 0     format version (SNAPSHOT_VERSION)
+#   byte 1     compression: 0 none, 1 zlib, 2 zstd (when `zstandard` is installed)
+#   bytes 2-3  fingerprint of the term vocabulary the IDs refer to
+#   rest       compressed compact JSON of the snapshot
+#
+# Snapshot fields use one- or two-letter keys, and fields at their default are
+# left out. Term lists (titles, skills, NOTs, companies) store a
+# taxonomy term as its integer ID in vocabulary() and anything else as a
+# string. A typical edited pack is a few hundred characters. Past
+# `max_chars` the compressed blob goes to a content-addressed SnapshotStore
+# and the token becomes "~" + its key.
+#
+#   python -m sourcing.state_codec decode <token>      # print the snapshot as JSON
+#   python -m sourcing.state_codec encode pack.json    # print a token
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .core import IC_ONLY_NOT, expand_titles
+from .taxonomy import COMPANY_SETS, METRO_COMPANIES, ROLE_LIB, SMART_NOT, SYNONYMS
+
+try:
+    import zstandard  # Optional: ~10-20% smaller tokens
+except Exception:
+    zstandard = None
+
+SNAPSHOT_VERSION = 1
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "snapshots")
+
+# long name -> (short key, default); list fields in TERM_FIELDS are term-ID encoded
+SNAPSHOT_FIELDS: Dict[str, Tuple[str, Any]] = {
+    "role_title": ("t", ""),
+    "location": ("l", ""),
+    "level": ("lv", "All"),
+    "env": ("e", "Any"),
+    "size": ("s", "Any"),
+    "metro": ("m", "Any"),
+    "theme": ("th", "Sky"),
+    "extra_not": ("x", ""),
+    "category": ("c", ""),
+    "ai_notes": ("n", ""),
+    "titles": ("T", []),
+    "must": ("M", []),
+    "nice": ("N", []),
+    "not_terms": ("X", []),
+    "companies_seed": ("C", []),
+    "custom_companies": ("cc", ""),
+    "segments": ("g", None),
+    "company_policy": ("p", "alias"),
+    "max_company_chars": ("mx", 0),
+    "ic_only": ("ic", False),
+    "two_tier": ("tt", False),
+    "min_must": ("mm", 2),
+    "env_size_as_keywords": ("ek", False),
+}
+TERM_FIELDS = frozenset({"titles", "must", "nice", "not_terms", "companies_seed", "segments"})
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def vocabulary() -> Tuple[List[str], Dict[str, int], bytes]:
+    """(terms, term -> id, 2-byte fingerprint); deterministic for a given taxonomy."""
+    terms: set = set(SMART_NOT) | set(IC_ONLY_NOT) | set(SYNONYMS) | set(SYNONYMS.values()) | set(COMPANY_SETS)
+    for cat, role in ROLE_LIB.items():
+        terms.update(role["titles"], role["must"], role["nice"], expand_titles(role["titles"], cat))
+    for names in list(COMPANY_SETS.values()) + list(METRO_COMPANIES.values()):
+        terms.update(names)
+    ordered = sorted(terms)
+    fp = hashlib.blake2b("\n".join(ordered).encode("utf-8"), digest_size=2).digest()
+    return ordered, {t: i for i, t in enumerate(ordered)}, fp
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(token: str) -> bytes:
+    return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+
+
+def _compact(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    _, ids, _ = vocabulary()
+    out: Dict[str, Any] = {}
+    for name, (key, default) in SNAPSHOT_FIELDS.items():
+        v = snapshot.get(name, default)
+        if v == default or v is None:
+            continue
+        if name in TERM_FIELDS:
+            v = [ids.get(t, t) for t in v]
+        out[key] = v
+    return out
+
+
+def _expand(compact: Dict[str, Any]) -> Dict[str, Any]:
+    terms, _, _ = vocabulary()
+    out: Dict[str, Any] = {}
+    for name, (key, default) in SNAPSHOT_FIELDS.items():
+        v = compact.get(key, default)
+        if name in TERM_FIELDS and v is not None:
+            v = [x if isinstance(x, str) else terms[x] if 0 <= x < len(terms) else None for x in v]
+            if None in v:
+                raise IndexError(name)
+        out[name] = list(v) if isinstance(v, list) else v
+    return out
+
+
+def encode_blob(snapshot: Dict[str, Any]) -> bytes:
+    raw = json.dumps(_compact(snapshot), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if zstandard is not None:
+        method, body = 2, zstandard.ZstdCompressor(level=19).compress(raw)
+    else:
+        method, body = 1, zlib.compress(raw, 9)
+    if len(body) >= len(raw):
+        method, body = 0, raw
+    return bytes([SNAPSHOT_VERSION, method]) + vocabulary()[2] + body
+
+
+def decode_blob(blob: bytes) -> Dict[str, Any]:
+    if len(blob) < 4:
+        raise SnapshotError("token is truncated")
+    version, method, fp, body = blob[0], blob[1], blob[2:4], blob[4:]
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"token format v{version} is not supported (expected v{SNAPSHOT_VERSION})")
+    if fp != vocabulary()[2]:
+        raise SnapshotError("token was made with a different term library; rebuild the pack to get a new link")
+    try:
+        if method == 2:
+            if zstandard is None:
+                raise SnapshotError("token needs the `zstandard` package to decode")
+            raw = zstandard.ZstdDecompressor().decompress(body)
+        elif method == 1:
+            raw = zlib.decompress(body)
+        elif method == 0:
+            raw = body
+        else:
+            raise SnapshotError(f"unknown compression {method}")
+        compact = json.loads(raw)
+    except SnapshotError:
+        raise
+    except Exception as e:
+        raise SnapshotError(f"token is corrupt ({type(e).__name__})") from e
+    try:
+        return _expand(compact)
+    except (IndexError, TypeError, AttributeError) as e:
+        raise SnapshotError("token refers to unknown terms") from e
+
+
+class SnapshotStore:
+    """Content-addressed blobs on disk (identical packs share one file)."""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        if not key.isalnum():
+            raise SnapshotError("bad snapshot key")
+        return os.path.join(self.root, key[:2], key + ".bin")
+
+    def put(self, blob: bytes) -> str:
+        key = hashlib.blake2b(blob, digest_size=9).hexdigest()
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise SnapshotError("saved pack not found on this server") from None
+
+
+def open_snapshot_store(env: Optional[Dict[str, str]] = None) -> SnapshotStore:
+    env = os.environ if env is None else env
+    return SnapshotStore(env.get("SNAPSHOT_DIR") or DEFAULT_STORE_DIR)
+
+
+def blob_token(blob: bytes, store: Optional[SnapshotStore] = None, max_chars: int = 1500) -> str:
+    """Token for an already-encoded blob (see encode_token)."""
+    token = _b64(blob)
+    if len(token) > max_chars and store is not None:
+        return "~" + store.put(blob)
+    return token
+
+
+def encode_token(snapshot: Dict[str, Any], store: Optional[SnapshotStore] = None, max_chars: int = 1500) -> str:
+    return blob_token(encode_blob(snapshot), store, max_chars)
+
+
+def decode_token(token: str, store: Optional[SnapshotStore] = None) -> Dict[str, Any]:
+    token = (token or "").strip()
+    if token.startswith("~"):
+        if store is None:
+            raise SnapshotError("token refers to a server-side snapshot but no store is configured")
+        return decode_blob(store.get(token[1:]))
+    try:
+        blob = _unb64(token)
+    except (ValueError, TypeError) as e:
+        raise SnapshotError("token is not valid base64url") from e
+    return decode_blob(blob)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Encode/decode shareable pack tokens.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("decode")
+    d.add_argument("token")
+    e = sub.add_parser("encode")
+    e.add_argument("path", help="JSON file with snapshot fields (see SNAPSHOT_FIELDS)")
+    e.add_argument("--max-chars", type=int, default=1500)
+    args = ap.parse_args(argv)
+    store = open_snapshot_store()
+    try:
+        if args.cmd == "decode":
+            print(json.dumps(decode_token(args.token, store), indent=2, ensure_ascii=False))
+        else:
+            with open(args.path, encoding="utf-8") as f:
+                print(encode_token(json.load(f), store, args.max_chars))
+    except SnapshotError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
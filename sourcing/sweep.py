@@ -0,0 +1,76 @@
+# sourcing/sweep.py — every keyword/title variant of a pack in one pass
+#
+# The grid is seniority level × anchors (off, 1, 2, 3) × IC-only × env/size
+# qualifiers. Keyword strings don't depend on seniority and title strings only
+# depend on it, so each is built once per distinct input and the grid is the
+# cross product. Terms are canonicalized once up front, and safe_quote is
+# memoized, so quoting is shared by every variant.
+#
+# The strings come from the app's PackGraph. Each variant forks the previous
+# one along its axis and changes one input. A variant whose keywords (or
+# titles) come out unchanged keeps its health and grade (or title string)
+# without recomputing them. For example, 3 anchors with only 2 must-haves is
+# the same string as 2 anchors, and IC-only may add nothing new.
+
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence
+
+from .core import IC_ONLY_NOT, canonicalize, env_size_qualifiers, unique_preserve
+from .pack import PackGraph
+
+LEVELS = ["All", "Associate", "Mid", "Senior+", "Staff/Principal"]
+ANCHOR_OPTIONS = [0, 1, 2, 3]  # 0 = two-tier off
+
+
+def sweep_variants(raw_titles: List[str], must: List[str], nice: List[str], nots: List[str],
+                   env: str = "Any", size: str = "Any", levels: Optional[Sequence[str]] = None,
+                   anchors: Sequence[int] = ANCHOR_OPTIONS) -> List[Dict[str, Any]]:
+    """One row per variant with the strings plus length, OR count and grade."""
+    must_c, nice_c = canonicalize(must), canonicalize(nice)
+    not_sets = {False: canonicalize(nots), True: canonicalize(unique_preserve(list(nots) + IC_ONLY_NOT))}
+    qual_sets = {False: [], True: canonicalize(env_size_qualifiers(env, size))}
+
+    base = PackGraph()
+    base.set(raw_titles=raw_titles, must=must_c, nice=nice_c)
+
+    titles_by_level: Dict[str, str] = {}
+    g = base
+    for lvl in (levels or LEVELS):
+        g = g.fork()
+        g.set(level=lvl)
+        titles_by_level[lvl] = g.get("title_current")
+
+    keywords: Dict[tuple, Dict[str, Any]] = {}
+    for ic_only, use_qual in product((False, True), (False, True)):
+        g = base.fork()
+        g.set(nots=not_sets[ic_only], qualifiers=qual_sets[use_qual])
+        for n_anchor in anchors:
+            g = g.fork()
+            g.set(two_tier=bool(n_anchor), min_must=n_anchor or 2)
+            kw = g.snapshot(["keywords", "grade", "health"])
+            keywords[(n_anchor, ic_only, use_qual)] = {
+                "keywords": kw["keywords"],
+                "kw_len": len(kw["keywords"]),
+                "or_count": kw["keywords"].count(" OR "),
+                "grade": kw["grade"],
+                "issues": len(kw["health"]),
+            }
+
+    rows: List[Dict[str, Any]] = []
+    for lvl, title_str in titles_by_level.items():
+        for n_anchor, ic_only, use_qual in product(anchors, (False, True), (False, True)):
+            kw = keywords[(n_anchor, ic_only, use_qual)]
+            rows.append({
+                "level": lvl,
+                "anchors": n_anchor,
+                "ic_only": ic_only,
+                "env_size_keywords": use_qual,
+                "grade": kw["grade"],
+                "kw_len": kw["kw_len"],
+                "or_count": kw["or_count"],
+                "issues": kw["issues"],
+                "title_len": len(title_str),
+                "keywords": kw["keywords"],
+                "title_current": title_str,
+            })
+    return rows
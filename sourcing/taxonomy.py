@@ -0,0 +1,121 @@
+# sourcing/taxonomy.py — static role, company and synonym data
+
+from typing import Dict, List
+
+# ============================ Role Library (fallback when AI is off/unavailable) ============================
+ROLE_LIB: Dict[str, Dict[str, List[str]]] = {
+    "swe": {
+        "titles": [
+            "Software Engineer", "Software Developer", "SDE", "SDE I", "SDE II",
+            "Senior Software Engineer", "Full Stack Engineer", "Backend Engineer",
+            "Frontend Engineer", "Platform Engineer"
+        ],
+        "must": ["python", "java", "go", "microservices", "distributed systems"],
+        "nice": ["kubernetes", "docker", "graphql", "gRPC", "aws"],
+    },
+    "ml": {
+        "titles": [
+            "Machine Learning Engineer", "ML Engineer", "ML Scientist",
+            "Applied Scientist", "Data Scientist", "AI Engineer"
+        ],
+        "must": ["python", "pytorch", "tensorflow", "mlops", "model deployment"],
+        "nice": ["sklearn", "xgboost", "feature store", "mlflow", "sagemaker"],
+    },
+    "sre": {
+        "titles": [
+            "Site Reliability Engineer", "SRE", "Reliability Engineer",
+            "DevOps Engineer", "Platform Reliability Engineer"
+        ],
+        "must": ["kubernetes", "terraform", "prometheus", "grafana", "incident response"],
+        "nice": ["golang", "python", "aws", "gcp", "oncall"],
+    },
+}
+
+SMART_NOT = [
+    "intern", "internship", "fellow", "bootcamp", "student", "professor",
+    "sales", "marketing", "hr", "talent acquisition", "recruiter",
+    "customer support", "help desk", "desktop support", "qa tester", "graphic designer"
+]
+
+# ============================ Company Sets (seed lists; AI can add more) ============================
+COMPANY_SETS: Dict[str, List[str]] = {
+    "faang_plus": [
+        "Google", "Meta", "Apple", "Amazon", "Netflix", "Microsoft",
+        "NVIDIA", "Uber", "Airbnb", "Stripe", "Dropbox", "LinkedIn"
+    ],
+    "cloud_infra": [
+        "AWS", "Azure", "Google Cloud", "Cloudflare", "Snowflake", "Datadog",
+        "Fastly", "Akamai", "HashiCorp", "DigitalOcean", "Twilio", "MongoDB"
+    ],
+    "ai_first": [
+        "OpenAI", "Anthropic", "DeepMind", "Hugging Face", "Stability AI",
+        "Cohere", "Scale AI", "Character AI", "Perplexity AI", "xAI"
+    ],
+    "devtools_data": [
+        "Databricks", "Confluent", "Elastic", "Snyk", "GitHub", "GitLab",
+        "JetBrains", "CircleCI", "PagerDuty", "New Relic", "Grafana Labs", "Postman"
+    ],
+    "enterprise_saas": [
+        "Salesforce", "ServiceNow", "Workday", "Atlassian", "Slack",
+        "Notion", "Asana", "Zoom", "Box", "Dropbox"
+    ],
+    "consumer_social": [
+        "YouTube", "Instagram", "WhatsApp", "Snap", "TikTok", "Pinterest",
+        "Reddit", "Spotify", "Discord"
+    ],
+    "fintech": [
+        "Stripe", "Square", "Plaid", "Coinbase", "Robinhood", "Brex",
+        "Ramp", "Affirm", "Chime", "SoFi"
+    ],
+    "marketplaces": [
+        "Uber", "Lyft", "DoorDash", "Instacart", "Airbnb", "Etsy",
+        "Amazon Marketplace", "Shopify"
+    ],
+    "high_growth": [
+        "Rippling", "Figma", "Canva", "Retool", "Glean", "Snowflake",
+        "Databricks", "Cloudflare", "Notion", "Scale AI"
+    ],
+}
+
+METRO_COMPANIES: Dict[str, List[str]] = {
+    "Any": [],
+    "Bay Area": ["Google", "Meta", "Apple", "Netflix", "NVIDIA", "Airbnb", "Stripe", "Uber", "Databricks", "Snowflake", "DoorDash"],
+    "New York": ["Google", "Meta", "Amazon", "Spotify", "Datadog", "MongoDB", "Ramp", "Plaid", "Etsy"],
+    "Seattle": ["Amazon", "Microsoft", "AWS", "Azure", "Tableau"],
+    "Remote-first": ["GitLab", "Automattic", "Zapier", "Stripe", "Dropbox", "Doist"],
+}
+
+ROLE_TO_GROUPS: Dict[str, List[str]] = {
+    "swe": ["faang_plus", "devtools_data", "enterprise_saas", "cloud_infra", "consumer_social", "fintech", "marketplaces", "high_growth"],
+    "ml":  ["ai_first", "faang_plus", "cloud_infra", "devtools_data", "enterprise_saas", "consumer_social", "high_growth"],
+    "sre": ["cloud_infra", "faang_plus", "devtools_data", "enterprise_saas", "marketplaces", "high_growth"],
+}
+
+# ============================ Synonyms (canonicalization) ============================
+SYNONYMS: Dict[str, str] = {
+    "golang": "go",
+    "k8s": "kubernetes",
+    "llm": "large language model",
+    "tf": "tensorflow",
+    "py": "python",
+}
+
+# ============================ Company entities (aliases + parent companies) ============================
+# canonical name -> aliases (same entity) and subsidiaries (separate brand, same parent)
+COMPANY_ENTITIES: Dict[str, Dict[str, List[str]]] = {
+    "Google": {"aliases": ["Alphabet", "Google LLC", "Alphabet Inc"], "subsidiaries": ["Google Cloud", "YouTube", "DeepMind", "Waymo"]},
+    "Google Cloud": {"aliases": ["GCP", "Google Cloud Platform"], "subsidiaries": []},
+    "DeepMind": {"aliases": ["Google DeepMind"], "subsidiaries": []},
+    "Meta": {"aliases": ["Facebook", "Meta Platforms", "Facebook Inc"], "subsidiaries": ["Instagram", "WhatsApp", "Oculus"]},
+    "Amazon": {"aliases": ["Amazon.com", "Amazon Marketplace"], "subsidiaries": ["AWS", "Twitch", "Zappos"]},
+    "AWS": {"aliases": ["Amazon Web Services"], "subsidiaries": []},
+    "Microsoft": {"aliases": ["MSFT", "Microsoft Corporation"], "subsidiaries": ["Azure", "LinkedIn", "GitHub"]},
+    "Azure": {"aliases": ["Microsoft Azure"], "subsidiaries": []},
+    "Salesforce": {"aliases": ["salesforce.com"], "subsidiaries": ["Slack", "Tableau", "MuleSoft"]},
+    "Square": {"aliases": ["Block", "Block Inc"], "subsidiaries": []},
+    "Snap": {"aliases": ["Snapchat", "Snap Inc"], "subsidiaries": []},
+    "TikTok": {"aliases": ["ByteDance"], "subsidiaries": []},
+    "xAI": {"aliases": ["X.AI"], "subsidiaries": []},
+    "Apple": {"aliases": ["Apple Inc"], "subsidiaries": []},
+    "NVIDIA": {"aliases": ["Nvidia Corporation"], "subsidiaries": []},
+}
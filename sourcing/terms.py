@@ -0,0 +1,131 @@
+# sourcing/terms.py — process-wide interned term table
+#
+# Sessions keep titles/skills/companies as TermIds: an array('I') of term IDs
+# (4 bytes per entry) instead of lists of str; text is materialized only when
+# rendering. Every distinct term is stored once per process, whoever typed it
+# or whichever AI pack or JD it came from.
+#
+# The table is bounded by what live sessions hold. Each slot is refcounted by
+# the TermIds that contain it; a TermIds takes its references when the table
+# builds it and drops them when it is garbage-collected (replaced by a newer
+# list, or dropped with its session). A slot nobody holds is freed and its ID
+# reused. Taxonomy terms (role titles and skills, NOT terms, synonyms, company
+# lists) are pinned, so their IDs never change.
+#
+# Case folding is a reference too: each slot points at the slot of its
+# lowercase spelling (itself, if already lowercase), so dedupe is an integer
+# set lookup.
+
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from .core import IC_ONLY_NOT
+from .taxonomy import COMPANY_SETS, METRO_COMPANIES, ROLE_LIB, SMART_NOT, SYNONYMS
+
+
+class TermIds(array):
+    """array('I') of term IDs that holds a reference to each of its terms in TERMS."""
+
+    __slots__ = ("_owned",)
+
+    def __del__(self) -> None:
+        if getattr(self, "_owned", False):
+            TERMS.release(self)
+
+    def __reduce__(self):
+        # IDs are only meaningful in this process; a copy that leaves it carries the text
+        return TERMS.encode, (TERMS.decode(self),)
+
+
+class TermTable:
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._text: List[Optional[str]] = []  # None marks a free slot
+        self._fold = array("I")   # id -> id of its lowercase spelling
+        self._refs = array("I")   # id -> TermIds entries (and lowercase spellings) holding it
+        self._free: List[int] = []
+        self._lock = threading.RLock()  # RLock: TermIds.__del__ may run while this thread holds it
+
+    def __len__(self) -> int:
+        """Live terms."""
+        return len(self._ids)
+
+    def _acquire(self, term: str) -> int:
+        i = self._ids.get(term)
+        if i is None:
+            lower = term.lower()
+            fold = self._acquire(lower) if lower != term else -1
+            if self._free:
+                i = self._free.pop()
+                self._text[i], self._refs[i] = term, 0
+                self._fold[i] = i if fold < 0 else fold
+            else:
+                i = len(self._text)
+                self._text.append(term)
+                self._refs.append(0)
+                self._fold.append(i if fold < 0 else fold)
+            self._ids[term] = i
+        self._refs[i] += 1
+        return i
+
+    def _release(self, i: int) -> None:
+        refs = self._refs[i] - 1
+        self._refs[i] = refs
+        if not refs:
+            del self._ids[self._text[i]]
+            self._text[i] = None
+            self._free.append(i)
+            if self._fold[i] != i:
+                self._release(self._fold[i])
+
+    def _owned(self, ids: Iterable[int]) -> TermIds:
+        out = TermIds("I", ids)
+        out._owned = True
+        return out
+
+    def encode(self, terms: Iterable[str]) -> TermIds:
+        with self._lock:
+            return self._owned(self._acquire(t2) for t2 in ((t or "").strip() for t in terms) if t2)
+
+    def release(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            for i in ids:
+                self._release(i)
+
+    def pin(self, terms: Iterable[str]) -> None:
+        """Keep `terms` for the life of the process."""
+        with self._lock:
+            for t in terms:
+                t2 = (t or "").strip()
+                if t2:
+                    self._acquire(t2)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        text = self._text
+        return [text[i] for i in ids]
+
+    def unique(self, ids: Iterable[int]) -> TermIds:
+        """unique_preserve on IDs: first spelling wins, case-insensitive."""
+        fold, refs, seen, out = self._fold, self._refs, set(), []
+        with self._lock:
+            for i in ids:
+                f = fold[i]
+                if f not in seen:
+                    seen.add(f)
+                    refs[i] += 1  # now, while `ids` still holds i: a temporary may be freed as it is consumed
+                    out.append(i)
+            return self._owned(out)
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self._fold, self._refs))
+
+
+TERMS = TermTable()
+for _role in ROLE_LIB.values():
+    TERMS.pin(_role["titles"] + _role["must"] + _role["nice"])
+TERMS.pin(SMART_NOT + IC_ONLY_NOT)
+TERMS.pin(list(SYNONYMS) + list(SYNONYMS.values()))
+for _names in list(COMPANY_SETS.values()) + list(METRO_COMPANIES.values()):
+    TERMS.pin(_names)
+EMPTY_IDS = array("I")
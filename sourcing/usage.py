@@ -0,0 +1,327 @@
+# sourcing/usage.py — AI call accounting, budgets and model benchmarks
+#
+# UsageLedger keeps one row per AI lookup: network calls with their model,
+# provider, prompt/completion tokens, latency and cost, plus cache hits,
+# errors and budget fallbacks at zero cost. The rows live in SQLite (WAL,
+# shared by every server process), so daily totals survive restarts.
+# summary() rolls them up per model, day, session or provider, with
+# p50/p95 latency.
+#
+# Budgets are USD caps per day, per session, and per model per day (0 = no
+# cap). over_budget() names the first cap already reached. The app then
+# serves a cached pack for the same title, or falls back to the ROLE_LIB
+# heuristic pack, instead of calling the model.
+#
+# bench replays a fixed title set against several models. It reports latency,
+# tokens and cost alongside quality proxies: schema-valid rate, how many
+# ROLE_LIB skills for the title's category the model recalls, and
+# must-have agreement with the first model. Every call is pinned to a provider
+# that serves the benchmarked model (see ProviderRouter.route); a model no
+# provider serves stops the run instead of being measured under another name.
+#
+#   python -m sourcing.usage report --by model --days 7
+#   python -m sourcing.usage bench --models gpt-4o-mini,gpt-4o [--titles titles.txt] [--repeats 2]
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+DEFAULT_USAGE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ai_usage.sqlite3")
+
+# status of a recorded lookup
+CALL, HIT, ERROR, FALLBACK = "call", "hit", "error", "fallback"
+GROUP_BY = {"model": "model", "day": "day", "session": "session", "provider": "provider"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    session TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    provider TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS calls_day ON calls(day, model);
+CREATE INDEX IF NOT EXISTS calls_session ON calls(session);
+"""
+
+
+def today(ts: Optional[float] = None) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Budgets(NamedTuple):
+    day_usd: float = 0.0
+    session_usd: float = 0.0
+    model_day_usd: Dict[str, float] = {}
+
+    def active(self) -> bool:
+        return bool(self.day_usd or self.session_usd or self.model_day_usd)
+
+
+def budgets_from_env(env: Optional[Dict[str, str]] = None) -> Budgets:
+    """AI_BUDGET_DAY_USD, AI_BUDGET_SESSION_USD and AI_BUDGET_MODEL_DAY_USD ("gpt-4o=2,gpt-4o-mini=0.5")."""
+    env = os.environ if env is None else env
+    per_model: Dict[str, float] = {}
+    for item in (env.get("AI_BUDGET_MODEL_DAY_USD") or "").split(","):
+        model, _, usd = item.strip().partition("=")
+        try:
+            per_model[model.strip()] = float(usd)
+        except ValueError:
+            continue
+    return Budgets(float(env.get("AI_BUDGET_DAY_USD") or 0), float(env.get("AI_BUDGET_SESSION_USD") or 0), per_model)
+
+
+class UsageLedger:
+    """Per-call AI usage in SQLite; safe to share across threads."""
+
+    def __init__(self, path: str = DEFAULT_USAGE_FILE) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def record(self, model: str, status: str = CALL, session: str = "", provider: str = "", prompt_tokens: int = 0,
+               completion_tokens: int = 0, latency_ms: float = 0.0, cost_usd: float = 0.0) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO calls (ts, day, session, model, provider, status, prompt_tokens, completion_tokens,"
+                " latency_ms, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, today(now), session, model, provider, status, prompt_tokens, completion_tokens, latency_ms, cost_usd))
+
+    def spent(self, day: Optional[str] = None, model: Optional[str] = None, session: Optional[str] = None) -> float:
+        """USD spent, filtered by any of day / model / session."""
+        where, args = [], []
+        for col, val in (("day", day), ("model", model), ("session", session)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        sql = "SELECT COALESCE(SUM(cost_usd), 0) FROM calls" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._lock:
+            return float(self._db.execute(sql, args).fetchone()[0])
+
+    def summary(self, by: str = "model", days: int = 7, session: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One row per model / day / session / provider over the last `days` days; most expensive first."""
+        col = GROUP_BY[by]
+        where, args = ["day >= ?"], [today(time.time() - max(0, days - 1) * 86400)]
+        if session is not None:
+            where.append("session = ?")
+            args.append(session)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {col}, status, prompt_tokens, completion_tokens, latency_ms, cost_usd FROM calls"
+                f" WHERE {' AND '.join(where)}", args).fetchall()
+        agg: Dict[str, Dict[str, Any]] = {}
+        lat: Dict[str, List[float]] = {}
+        for key, status, p_tok, c_tok, ms, cost in rows:
+            a = agg.setdefault(key, {by: key, "lookups": 0, "calls": 0, "cache_hits": 0, "errors": 0, "fallbacks": 0,
+                                     "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+            a["lookups"] += 1
+            a[{CALL: "calls", HIT: "cache_hits", ERROR: "errors", FALLBACK: "fallbacks"}.get(status, "calls")] += 1
+            a["prompt_tokens"] += p_tok
+            a["completion_tokens"] += c_tok
+            a["cost_usd"] += cost
+            if status == CALL:
+                lat.setdefault(key, []).append(ms)
+        out = []
+        for key, a in agg.items():
+            ms = sorted(lat.get(key, []))
+            a["hit_rate"] = round(a["cache_hits"] / a["lookups"], 3)
+            a["avg_latency_ms"] = round(sum(ms) / len(ms), 1) if ms else 0.0
+            a["p50_latency_ms"] = round(_percentile(ms, 0.5), 1)
+            a["p95_latency_ms"] = round(_percentile(ms, 0.95), 1)
+            a["cost_usd"] = round(a["cost_usd"], 6)
+            out.append(a)
+        out.sort(key=lambda r: (-r["cost_usd"], -r["lookups"]))
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_ledger(env: Optional[Dict[str, str]] = None) -> UsageLedger:
+    """Ledger at AI_USAGE_FILE (default data/ai_usage.sqlite3)."""
+    env = os.environ if env is None else env
+    return UsageLedger(env.get("AI_USAGE_FILE") or DEFAULT_USAGE_FILE)
+
+
+def over_budget(ledger: UsageLedger, budgets: Budgets, model: str, session: str = "") -> Optional[str]:
+    """Which cap is already reached for this model/session today, or None."""
+    if not budgets.active():
+        return None
+    day = today()
+    if budgets.day_usd and ledger.spent(day=day) >= budgets.day_usd:
+        return f"daily AI budget of ${budgets.day_usd:g} reached"
+    cap = budgets.model_day_usd.get(model)
+    if cap is not None and ledger.spent(day=day, model=model) >= cap:
+        return f"daily budget of ${cap:g} for {model} reached"
+    if budgets.session_usd and session and ledger.spent(session=session) >= budgets.session_usd:
+        return f"session AI budget of ${budgets.session_usd:g} reached"
+    return None
+
+
+# ---- Benchmark ----
+
+BENCH_TITLES = [
+    "Senior Software Engineer", "Site Reliability Engineer", "Staff Machine Learning Engineer", "Data Engineer",
+    "Product Manager", "Product Designer", "Security Engineer", "Payroll Manager", "Account Executive",
+    "VP of Customer Success", "Creative Director", "Registered Nurse",
+]
+
+
+def _recall(got: Sequence[str], expected: Sequence[str]) -> float:
+    exp = {e.lower() for e in expected}
+    return len(exp & {g.lower() for g in got}) / len(exp) if exp else 0.0
+
+
+def _jaccard(a: Sequence[str], b: Sequence[str]) -> float:
+    sa, sb = {x.lower() for x in a}, {x.lower() for x in b}
+    return len(sa & sb) / len(sa | sb) if sa | sb else 1.0
+
+
+def benchmark(router: Any, models: Sequence[str], titles: Sequence[str] = BENCH_TITLES, repeats: int = 1,
+              ledger: Optional[UsageLedger] = None) -> List[Dict[str, Any]]:
+    """Replay `titles` against each model (uncached, one call each, no retry); one summary row per model.
+
+    Each model must be served as itself: raises ProviderError when no provider serves it, or when an
+    answer comes back from a different model, rather than report one model under another's name.
+    """
+    from .core import map_title_to_category
+    from .llm import ProviderError
+    from .ratelimit import BATCH
+    from .role_pack import parse_json_safely, role_pack_messages, validate_role_pack
+    from .taxonomy import ROLE_LIB
+
+    first_must: Dict[str, List[str]] = {}
+    rows = []
+    for model in models:
+        if not router.route([], model):
+            raise ProviderError(f"no configured provider serves {model!r} (providers: {', '.join(router.providers)})")
+    for m_idx, model in enumerate(models):
+        lat: List[float] = []
+        providers = set()
+        r = {"model": model, "calls": 0, "errors": 0, "valid": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "cost_usd": 0.0, "skill_recall": 0.0, "agreement": 0.0}
+        agree_n = 0
+        for _ in range(max(1, repeats)):
+            for title in titles:
+                r["calls"] += 1
+                try:
+                    c = router.complete(role_pack_messages(title, "", "", "All", "Any", "Any"), model=model,
+                                        session="bench", priority=BATCH)
+                except ProviderError:
+                    r["errors"] += 1
+                    if ledger:
+                        ledger.record(model, ERROR, session="bench")
+                    continue
+                if c.model != model:
+                    raise ProviderError(f"asked for {model!r} but {c.provider} answered as {c.model!r}")
+                providers.add(c.provider)
+                lat.append(c.latency_s * 1000)
+                r["prompt_tokens"] += c.usage.get("prompt_tokens", 0)
+                r["completion_tokens"] += c.usage.get("completion_tokens", 0)
+                r["cost_usd"] += c.cost_usd
+                if ledger:
+                    ledger.record(c.model, CALL, "bench", c.provider, c.usage.get("prompt_tokens", 0),
+                                  c.usage.get("completion_tokens", 0), c.latency_s * 1000, c.cost_usd)
+                data = parse_json_safely(c.text)
+                r["valid"] += not validate_role_pack(data)
+                must = [x for x in (data.get("must_have") or []) if isinstance(x, str)]
+                nice = [x for x in (data.get("nice_to_have") or []) if isinstance(x, str)]
+                r["skill_recall"] += _recall(must + nice, ROLE_LIB[map_title_to_category(title)]["must"])
+                if m_idx == 0:
+                    first_must.setdefault(title, must)
+                elif title in first_must:
+                    r["agreement"] += _jaccard(must, first_must[title])
+                    agree_n += 1
+        ok = r["calls"] - r["errors"]
+        lat.sort()
+        rows.append({
+            "model": model, "provider": ",".join(sorted(providers)), "calls": r["calls"], "errors": r["errors"],
+            "valid_rate": round(r["valid"] / ok, 3) if ok else 0.0,
+            "skill_recall": round(r["skill_recall"] / ok, 3) if ok else 0.0,
+            "agreement": round(r["agreement"] / agree_n, 3) if agree_n else None,
+            "avg_latency_ms": round(sum(lat) / len(lat), 1) if lat else 0.0,
+            "p50_latency_ms": round(_percentile(lat, 0.5), 1), "p95_latency_ms": round(_percentile(lat, 0.95), 1),
+            "prompt_tokens": r["prompt_tokens"], "completion_tokens": r["completion_tokens"],
+            "cost_usd": round(r["cost_usd"], 6),
+        })
+    return rows
+
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        print("(no rows)")
+        return
+    cols = list(rows[0])
+    width = {c: max(len(c), *(len(str(r.get(c))) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(width[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r.get(c)).ljust(width[c]) for c in cols))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="AI usage reports and model benchmarks.")
+    ap.add_argument("--file", default=None, help="ledger path (default: $AI_USAGE_FILE or data/ai_usage.sqlite3)")
+    ap.add_argument("--json", action="store_true")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rep = sub.add_parser("report")
+    rep.add_argument("--by", choices=list(GROUP_BY), default="model")
+    rep.add_argument("--days", type=int, default=7)
+    b = sub.add_parser("bench")
+    b.add_argument("--models", required=True, help="comma-separated; the first is the agreement reference")
+    b.add_argument("--titles", help="file with one title per line (default: a fixed set of 12)")
+    b.add_argument("--repeats", type=int, default=1)
+    b.add_argument("--record", action="store_true", help="also record the calls in the ledger (session 'bench')")
+    args = ap.parse_args(argv)
+    ledger = UsageLedger(args.file) if args.file else open_ledger()
+    if args.cmd == "report":
+        rows = ledger.summary(args.by, args.days)
+    else:
+        from .llm import ProviderError, router_from_env
+
+        titles = BENCH_TITLES
+        if args.titles:
+            with open(args.titles, encoding="utf-8") as f:
+                titles = [t.strip() for t in f if t.strip()]
+        try:
+            router = router_from_env(os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        except ProviderError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        try:
+            rows = benchmark(router, [m.strip() for m in args.models.split(",") if m.strip()], titles, args.repeats,
+                             ledger if args.record else None)
+        except ProviderError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import pytest
+
+from sourcing.ratelimit import RPM, TPM, RateLimiter
+
+
+def test_rpm_only_settle_leaves_no_open_transaction(tmp_path):
+    limiter = RateLimiter(rpm=100, tpm=0, path=str(tmp_path / "rate.db"))
+    limiter.acquire(500).settle(321)  # no TPM bucket: nothing to adjust
+    assert not limiter.buckets._db.in_transaction
+    limiter.acquire(500)
+    assert limiter.granted == 2
+
+
+def test_failed_update_rolls_back_and_releases_the_lock(tmp_path):
+    path = str(tmp_path / "rate.db")
+    limiter = RateLimiter(rpm=100, tpm=10_000, path=path)
+    limiter.acquire(100)
+    with pytest.raises(TypeError):
+        limiter.buckets.take({RPM: 1, TPM: None})
+    assert not limiter.buckets._db.in_transaction
+    other = RateLimiter(rpm=100, tpm=10_000, path=path, max_wait_s=1)  # another process on the same file
+    other.acquire(100)
+    limiter.acquire(100)
+    assert round(limiter.buckets.levels()[RPM]) == 97